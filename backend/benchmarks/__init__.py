@@ -0,0 +1,3 @@
+"""
+ベンチマーク・負荷試験用のツール（疑似note.comサーバーと計測ハーネス）
+"""
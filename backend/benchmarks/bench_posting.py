@@ -0,0 +1,174 @@
+"""
+下書き投稿のベンチマーク
+疑似note.comサーバー（benchmarks.fake_note_server）を起動し、本番と同じプール・実行キュー・再試行で
+NoteService.login/post_draftを実行して、手順ごとの所要時間・スループット・失敗からの回復を集計する
+
+    cd backend
+    python -m benchmarks.bench_posting --posts 20 --accounts 4 --latency-ms 50 --fail save=0.2
+
+ログイン状態・セレクターキャッシュは一時ディレクトリに保存し、本番の設定には影響しない。
+"""
+from typing import Dict, List
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from benchmarks.fake_note_server import (
+    FakeNoteServer,
+    add_server_arguments,
+    config_from_args,
+    server_url,
+    start_server,
+)
+
+BENCH_PASSWORD = "benchmark-password"
+
+
+def _make_article(index: int, body_chars: int) -> Dict:
+    paragraph = "これはベンチマーク用の本文です。長い記事の入力と保存にかかる時間を測ります。"
+    lines = []
+    length = 0
+    while length < body_chars:
+        lines.append(paragraph)
+        lines.append("")
+        length += len(paragraph)
+    return {"id": index, "title": f"ベンチマーク記事 {index}", "content": "\n".join(lines)[:body_chars]}
+
+
+def _configure_environment(base_url: str, work_dir: str, args):
+    """NoteServiceはimport時・初回使用時に環境変数を読むので、import前に設定する"""
+    os.environ["NOTE_BASE_URL"] = base_url
+    os.environ["NOTE_EDITOR_URL_TEMPLATE"] = f"{base_url}/editor/notes/{{key}}/edit"
+    os.environ.setdefault("HEADLESS_MODE", "true")
+    os.environ["NOTE_STATE_PERSIST"] = "false" if args.no_state else "true"
+    os.environ["NOTE_STATE_DIR"] = os.path.join(work_dir, "note_state")
+    os.environ["NOTE_STATE_KEY_FILE"] = os.path.join(work_dir, "note_state.key")
+    os.environ["NOTE_SELECTOR_CACHE_FILE"] = os.path.join(work_dir, "selectors.json")
+    os.environ.setdefault("NOTE_DIAGNOSTICS", "off")
+    os.environ.setdefault("NOTE_TIMEOUT_SAVE_MS", str(args.save_timeout_ms))
+
+
+async def _post_with_retries(executor, account: str, article: Dict, retries: int, retry_delay: float, checkpoint_cls) -> Dict:
+    """main.pyの下書き投稿と同じく、チェックポイントを引き継いで再試行する"""
+    checkpoint = checkpoint_cls()
+    started = time.perf_counter()
+    error = None
+    for attempt in range(1, retries + 1):
+        try:
+            await executor.post_draft(account, BENCH_PASSWORD, article["title"], article["content"], checkpoint=checkpoint)
+            return {"success": True, "attempts": attempt, "resumed_from": checkpoint.stage, "wall_ms": (time.perf_counter() - started) * 1000}
+        except Exception as e:
+            error = str(e)
+            if attempt < retries:
+                await asyncio.sleep(retry_delay)
+    return {"success": False, "attempts": retries, "error": error, "wall_ms": (time.perf_counter() - started) * 1000}
+
+
+def _percentile(values: List[float], q: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+async def run_benchmark(args) -> Dict:
+    server = FakeNoteServer(config_from_args(args))
+    server.config.password = BENCH_PASSWORD
+    runner = await start_server(server)
+    work_dir = tempfile.mkdtemp(prefix="note_bench_")
+    try:
+        base_url = server_url(runner)
+        _configure_environment(base_url, work_dir, args)
+        print(f"[ベンチマーク] 疑似note.com: {base_url}")
+
+        from metrics import registry
+        from services.note_service import DraftCheckpoint
+        from services.note_session_pool import NoteSessionPool
+        from services.note_post_executor import NotePostExecutor
+
+        registry.reset()
+        pool = NoteSessionPool(max_idle_per_account=1)
+        executor = NotePostExecutor(pool, max_browsers=args.max_browsers)
+        accounts = [f"bench{i}@example.com" for i in range(args.accounts)]
+        articles = [_make_article(i, args.body_chars) for i in range(args.posts)]
+
+        started = time.perf_counter()
+        try:
+            results = await asyncio.gather(*[
+                _post_with_retries(executor, accounts[i % len(accounts)], article, args.retries, args.retry_delay, DraftCheckpoint)
+                for i, article in enumerate(articles)
+            ])
+        finally:
+            await pool.close_all()
+        elapsed = time.perf_counter() - started
+
+        succeeded = [r for r in results if r["success"]]
+        server_stats = server.get_stats()
+        wall_times = [r["wall_ms"] for r in results]
+        return {
+            "config": {
+                "posts": args.posts,
+                "accounts": args.accounts,
+                "max_browsers": executor.max_browsers,
+                "body_chars": args.body_chars,
+                "latency_ms": args.latency_ms,
+                "fail": args.fail or [],
+                "hang": args.hang or []
+            },
+            "elapsed_s": round(elapsed, 2),
+            "throughput_posts_per_min": round(len(succeeded) / elapsed * 60, 2) if elapsed > 0 else None,
+            "post_wall_ms": {"p50": _percentile(wall_times, 0.5), "p95": _percentile(wall_times, 0.95), "max": _percentile(wall_times, 1.0)},
+            "recovery": {
+                "succeeded": len(succeeded),
+                "failed": len(results) - len(succeeded),
+                "first_attempt": sum(1 for r in succeeded if r["attempts"] == 1),
+                "recovered_by_retry": sum(1 for r in succeeded if r["attempts"] > 1),
+                "total_attempts": sum(r["attempts"] for r in results),
+                # 開いたが保存されなかった下書き（再試行で新しい下書きを作ると増える）
+                "orphan_drafts": server_stats["drafts"] - server_stats["saved_drafts"]
+            },
+            "server": server_stats,
+            "stages": registry.snapshot(recent=0)["stages"]
+        }
+    finally:
+        await runner.cleanup()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(report: Dict):
+    print("")
+    print(f"[ベンチマーク] {report['config']}")
+    print(f"所要時間: {report['elapsed_s']}秒  スループット: {report['throughput_posts_per_min']}件/分")
+    print(f"投稿ごとの所要時間(ms): {report['post_wall_ms']}")
+    print(f"失敗からの回復: {report['recovery']}")
+    print(f"疑似サーバー: {report['server']}")
+    print("")
+    print(f"{'手順':<20}{'件数':>6}{'失敗':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}")
+    for stage, summary in report["stages"].items():
+        print(f"{stage:<20}{summary['count']:>6}{summary['errors']:>6}{summary['p50_ms'] or '-':>10}{summary['p95_ms'] or '-':>10}{summary['max_ms'] or '-':>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="疑似note.comに対する下書き投稿のベンチマーク")
+    parser.add_argument("--posts", type=int, default=10, help="投稿する記事数")
+    parser.add_argument("--accounts", type=int, default=1, help="記事を振り分けるアカウント数")
+    parser.add_argument("--max-browsers", type=int, default=None, help="ブラウザの同時実行数の上限（省略時はメモリから算出）")
+    parser.add_argument("--body-chars", type=int, default=3000, help="本文の文字数")
+    parser.add_argument("--retries", type=int, default=3, help="1記事あたりの最大試行回数")
+    parser.add_argument("--retry-delay", type=float, default=0.5, help="再試行までの待ち時間（秒）")
+    parser.add_argument("--save-timeout-ms", type=int, default=5000, help="保存APIの応答を待つ時間")
+    parser.add_argument("--no-state", action="store_true", help="ログイン状態を保存しない（毎回フォームからログイン）")
+    parser.add_argument("--json", metavar="PATH", help="結果をJSONで保存するパス")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[ベンチマーク] 結果を保存しました: {args.json}")
@@ -0,0 +1,191 @@
+"""
+トレンド表の抽出のベンチマーク（保存したページに対して、旧方式と現在の方式を比較する）
+
+- browser_per_row: 以前の方式（行ごとに query_selector_all / inner_text / query_selector を呼び、
+  キーワードの重複を毎回リストを作り直して確認する）
+- browser_evaluate: 現在の方式（EXTRACT_TRENDS_JS の1回のevaluateとbuild_trendsのset）
+- http_parser: HTTP取得時の方式（parse_trends_html）
+
+    cd backend
+    python -m benchmarks.bench_trend_extract --html saved_twittrend.html --repeat 20
+    python -m benchmarks.bench_trend_extract --rows 50 --no-browser
+
+--html を省略した場合は、twittrend.jpと同じ構造の表（--rows行）を生成して使う。
+"""
+from typing import Callable, Dict, List, Optional
+from html import escape
+from urllib.parse import quote
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from services.trend_fetcher import _SKIP_KEYWORDS, _TrendTableParser, build_trends, parse_trends_html
+from services.trend_scraper import EXTRACT_TRENDS_JS, TREND_FETCH_LIMIT
+
+_TWEET_COUNT_PATTERN = re.compile(r'(\d+(?:,\d+)*)\s*件のツイート')
+
+
+def sample_page(rows: int) -> str:
+    """twittrend.jpと同じ構造（日本列の各セルに検索リンクとツイート数）のページを生成"""
+    lines = ['<table class="table"><tr><th>日本</th><th>東京</th><th>大阪</th></tr>']
+    for i in range(rows):
+        keyword = f"#トレンド{i}" if i % 3 == 0 else f"キーワード{i}"
+        link = f'<a href="https://twitter.com/search?q={quote(keyword)}">{escape(keyword)}</a>'
+        count = f"<br>{(rows - i) * 1234:,}件のツイート" if i % 2 == 0 else ""
+        lines.append(f"<tr><td>{i + 1}. {link}{count}</td><td>{link}</td><td>-</td></tr>")
+    lines.append("</table>")
+    return f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"></head><body>{"".join(lines)}</body></html>'
+
+
+def _dedupe_with_list(rows: List[Optional[Dict]], links: List[str], limit: int) -> List[Dict]:
+    """以前の重複確認（行ごとにキーワードのリストを作り直す）"""
+    trends: List[Dict] = []
+    for row in rows:
+        if not row or not row.get("link_text"):
+            continue
+        keyword = row["link_text"].replace('#', '').strip()
+        tweet_count = None
+        match = _TWEET_COUNT_PATTERN.search(row.get("cell_text") or "")
+        if match:
+            tweet_count = int(match.group(1).replace(',', ''))
+        if keyword and keyword not in [t['keyword'] for t in trends]:
+            trends.append({"keyword": keyword, "tweet_count": tweet_count})
+            if len(trends) >= limit:
+                break
+    if len(trends) < limit:
+        for link_text in links:
+            keyword = link_text.replace('#', '').strip()
+            if not keyword or len(keyword) > 100 or keyword in _SKIP_KEYWORDS:
+                continue
+            if keyword not in [t['keyword'] for t in trends]:
+                trends.append({"keyword": keyword, "tweet_count": None})
+                if len(trends) >= limit:
+                    break
+    return trends
+
+
+async def _extract_per_row(page, limit: int) -> Dict:
+    """以前の方式（要素ごとにブラウザとやりとりする）。やりとりの回数も数える"""
+    calls = 1
+    rows = []
+    links = []
+    for row in (await page.query_selector_all('table tr'))[1:]:
+        cells = await row.query_selector_all('td')
+        calls += 1
+        if not cells:
+            rows.append(None)
+            continue
+        cell_text = (await cells[0].inner_text()).strip()
+        link = await cells[0].query_selector('a[href*="twitter.com/search"]')
+        calls += 2
+        link_text = None
+        if link:
+            link_text = (await link.inner_text()).strip()
+            calls += 1
+        rows.append({"cell_text": cell_text, "link_text": link_text})
+    trends = _dedupe_with_list(rows, [], limit)
+    if len(trends) < limit:
+        calls += 1
+        for link in await page.query_selector_all('a[href*="twitter.com/search"]'):
+            links.append((await link.inner_text()).strip())
+            calls += 1
+        trends = _dedupe_with_list(rows, links, limit)
+    return {"trends": trends, "calls": calls}
+
+
+async def _extract_evaluate(page, limit: int) -> Dict:
+    extracted = await page.evaluate(EXTRACT_TRENDS_JS)
+    return {"trends": build_trends(extracted["rows"], extracted["links"], limit), "calls": 1}
+
+
+def _summary(samples: List[float]) -> Dict:
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "min_ms": round(samples[0], 3),
+        "max_ms": round(samples[-1], 3)
+    }
+
+
+def _time_sync(func: Callable[[], object], repeat: int) -> Dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return _summary(samples)
+
+
+async def _time_browser(html: str, limit: int, repeat: int) -> Dict:
+    from playwright.async_api import async_playwright
+
+    results = {}
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=True)
+        try:
+            page = await browser.new_page()
+            await page.set_content(html, wait_until="domcontentloaded")
+            for name, extract in (("browser_per_row", _extract_per_row), ("browser_evaluate", _extract_evaluate)):
+                await extract(page, limit)  # 1回目は計測しない
+                samples = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    outcome = await extract(page, limit)
+                    samples.append((time.perf_counter() - started) * 1000)
+                results[name] = {**_summary(samples), "round_trips": outcome["calls"], "count": len(outcome["trends"])}
+            # 同じページから同じトレンドを抽出できていること
+            per_row = (await _extract_per_row(page, limit))["trends"]
+            evaluated = (await _extract_evaluate(page, limit))["trends"]
+            results["same_result"] = per_row == evaluated
+        finally:
+            await browser.close()
+    return results
+
+
+def run_benchmark(args) -> Dict:
+    if args.html:
+        with open(args.html, encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = sample_page(args.rows)
+
+    rows = parse_trends_html(html, args.limit)
+    report = {
+        "config": {"html": args.html or f"生成した{args.rows}行の表", "bytes": len(html.encode("utf-8")), "limit": args.limit, "repeat": args.repeat},
+        "http_parser": {**_time_sync(lambda: parse_trends_html(html, args.limit), args.repeat), "count": len(rows)},
+    }
+
+    # 重複確認だけの比較（ブラウザとのやりとりを除いたPython側の処理）
+    parser = _TrendTableParser()
+    parser.feed(html)
+    parser.close()
+    table_rows, links = parser.rows[1:], parser.links
+    report["dedupe_list"] = _time_sync(lambda: _dedupe_with_list(table_rows, links, args.limit), args.repeat)
+    report["dedupe_set"] = _time_sync(lambda: build_trends(table_rows, links, args.limit), args.repeat)
+    report["dedupe_same_result"] = _dedupe_with_list(table_rows, links, args.limit) == build_trends(table_rows, links, args.limit)
+
+    if not args.no_browser:
+        try:
+            report.update(asyncio.run(_time_browser(html, args.limit, args.repeat)))
+        except Exception as e:
+            report["browser_error"] = str(e).splitlines()[0]
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="トレンド表の抽出のベンチマーク")
+    parser.add_argument("--html", help="保存したtwittrend.jpのページ（省略時は生成した表）")
+    parser.add_argument("--rows", type=int, default=50, help="生成する表の行数")
+    parser.add_argument("--limit", type=int, default=TREND_FETCH_LIMIT, help="抽出する件数")
+    parser.add_argument("--repeat", type=int, default=20, help="計測の繰り返し回数")
+    parser.add_argument("--no-browser", action="store_true", help="ブラウザを使う計測を行わない")
+    parser.add_argument("--json", metavar="PATH", help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
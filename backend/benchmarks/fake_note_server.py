@@ -0,0 +1,295 @@
+"""
+note.comの疑似サーバー（ベンチマーク・負荷試験用）
+ログイン・トップページ・/mypage/notes/new・エディタ・下書き保存APIだけを再現し、
+応答の遅延と失敗（エラー応答・応答なし）を設定で注入できる
+
+    python -m benchmarks.fake_note_server --port 8765 --latency-ms 50 --fail save=0.2
+"""
+from typing import Dict, Optional
+from html import escape
+import argparse
+import asyncio
+import json
+import random
+import secrets
+
+from aiohttp import web
+
+# 失敗を注入できる手順
+FAULT_STAGES = ("login", "top", "editor", "save", "current_user")
+
+SESSION_COOKIE = "fake_note_session"
+
+_PAGE = """<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>{title}</title></head>
+<body>{body}</body></html>"""
+
+_EDITOR_SCRIPT = """
+<script>
+const body = document.querySelector('.ProseMirror');
+body.addEventListener('paste', (event) => {
+    event.preventDefault();
+    const text = event.clipboardData.getData('text/plain');
+    const selection = window.getSelection();
+    if (selection.rangeCount > 0 && body.contains(selection.anchorNode)) {
+        selection.deleteFromDocument();
+    }
+    for (const line of text.split('\\n')) {
+        const paragraph = document.createElement('p');
+        if (line) {
+            paragraph.textContent = line;
+        } else {
+            paragraph.appendChild(document.createElement('br'));
+        }
+        body.appendChild(paragraph);
+    }
+});
+document.querySelector('#save').addEventListener('click', async () => {
+    const status = document.querySelector('#status');
+    status.textContent = '保存中...';
+    const response = await fetch(document.querySelector('#save').dataset.saveUrl, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({name: document.querySelector('#title').value, body: body.innerText})
+    });
+    status.textContent = response.ok ? '下書きを保存しました' : '保存に失敗しました';
+    status.className = response.ok ? 'saved' : 'error';
+});
+</script>
+"""
+
+
+class FakeNoteConfig:
+    def __init__(
+        self,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        fail_rates: Optional[Dict[str, float]] = None,
+        hang_rates: Optional[Dict[str, float]] = None,
+        hang_ms: float = 60000,
+        password: Optional[str] = None,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            latency_ms: すべての応答に加える遅延
+            jitter_ms: 遅延に加えるランダムな揺らぎの最大値
+            fail_rates: 手順ごとにエラー応答（500）を返す確率
+            hang_rates: 手順ごとに応答を返さない（hang_ms待たせる）確率
+            hang_ms: 応答を返さない場合の待ち時間
+            password: ログインを許可するパスワード（Noneなら何でも許可）
+            seed: 乱数のシード（同じ値なら同じ順序で失敗する）
+        """
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rates = dict(fail_rates or {})
+        self.hang_rates = dict(hang_rates or {})
+        self.hang_ms = hang_ms
+        self.password = password
+        self.random = random.Random(seed)
+
+
+class FakeNoteServer:
+    """疑似サーバーの状態（セッション・下書き）と集計"""
+
+    def __init__(self, config: Optional[FakeNoteConfig] = None):
+        self.config = config or FakeNoteConfig()
+        self.sessions: Dict[str, str] = {}
+        self.drafts: Dict[str, Dict] = {}
+        self.stats = {
+            "requests": 0,
+            "logins": 0,
+            "drafts_created": 0,
+            "saves": 0,
+            "injected_errors": 0,
+            "injected_hangs": 0
+        }
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._latency_middleware])
+        app.router.add_get("/login", self.login_page)
+        app.router.add_post("/login", self.login_submit)
+        app.router.add_get("/", self.top_page)
+        app.router.add_get("/api/v2/current_user", self.current_user)
+        app.router.add_get("/mypage/notes/new", self.new_note)
+        app.router.add_get("/editor/notes/{key}/edit", self.editor_page)
+        app.router.add_post("/api/v1/text_notes/{key}/draft_save", self.draft_save)
+        app.router.add_get("/__stats", self.stats_page)
+        return app
+
+    @web.middleware
+    async def _latency_middleware(self, request: web.Request, handler):
+        self.stats["requests"] += 1
+        delay = self.config.latency_ms + self.config.random.uniform(0, self.config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        return await handler(request)
+
+    async def _inject(self, stage: str):
+        """設定した確率で失敗を注入（応答なしは待たせてから500を返す）"""
+        if self.config.random.random() < self.config.hang_rates.get(stage, 0):
+            self.stats["injected_hangs"] += 1
+            await asyncio.sleep(self.config.hang_ms / 1000)
+            raise web.HTTPInternalServerError(text=f"injected hang: {stage}")
+        if self.config.random.random() < self.config.fail_rates.get(stage, 0):
+            self.stats["injected_errors"] += 1
+            raise web.HTTPInternalServerError(text=f"injected error: {stage}")
+
+    def _user(self, request: web.Request) -> Optional[str]:
+        return self.sessions.get(request.cookies.get(SESSION_COOKIE, ""))
+
+    @staticmethod
+    def _html(title: str, body: str) -> web.Response:
+        return web.Response(text=_PAGE.format(title=escape(title), body=body), content_type="text/html")
+
+    def _login_form(self, error: str = "") -> web.Response:
+        alert = f'<div class="error" role="alert">{escape(error)}</div>' if error else ""
+        return self._html("ログイン", f"""
+<form method="post" action="/login">
+  {alert}
+  <input type="email" name="email" placeholder="メールアドレス">
+  <input type="password" name="password" placeholder="パスワード">
+  <button type="submit">ログイン</button>
+</form>""")
+
+    async def login_page(self, request: web.Request) -> web.Response:
+        await self._inject("login")
+        return self._login_form()
+
+    async def login_submit(self, request: web.Request) -> web.Response:
+        await self._inject("login")
+        form = await request.post()
+        email = form.get("email", "")
+        if not email or (self.config.password is not None and form.get("password") != self.config.password):
+            return self._login_form("メールアドレスまたはパスワードが正しくありません")
+        token = secrets.token_hex(16)
+        self.sessions[token] = email
+        self.stats["logins"] += 1
+        response = web.HTTPFound("/")
+        response.set_cookie(SESSION_COOKIE, token, httponly=True)
+        raise response
+
+    async def top_page(self, request: web.Request) -> web.Response:
+        await self._inject("top")
+        if self._user(request) is None:
+            raise web.HTTPFound("/login")
+        return self._html("note", """
+<header><nav><a href="/mypage">マイページ</a> <a href="/mypage/notes/new">投稿</a></nav></header>
+<main><h1>おすすめ</h1></main>""")
+
+    async def current_user(self, request: web.Request) -> web.Response:
+        await self._inject("current_user")
+        user = self._user(request)
+        if user is None:
+            return web.json_response({"data": None}, status=401)
+        return web.json_response({"data": {"urlname": user.split("@")[0]}})
+
+    async def new_note(self, request: web.Request) -> web.Response:
+        await self._inject("editor")
+        user = self._user(request)
+        if user is None:
+            raise web.HTTPFound("/login")
+        key = f"n{secrets.token_hex(6)}"
+        self.drafts[key] = {"user": user, "name": "", "body": "", "saves": 0}
+        self.stats["drafts_created"] += 1
+        raise web.HTTPFound(f"/editor/notes/{key}/edit")
+
+    async def editor_page(self, request: web.Request) -> web.Response:
+        await self._inject("editor")
+        draft = self.drafts.get(request.match_info["key"])
+        if self._user(request) is None:
+            raise web.HTTPFound("/login")
+        if draft is None:
+            raise web.HTTPNotFound()
+        paragraphs = "".join(f"<p>{escape(line)}</p>" if line else "<p><br></p>" for line in draft["body"].split("\n")) if draft["body"] else ""
+        return self._html("記事の編集", f"""
+<div class="editor">
+  <button id="save" type="button" data-save-url="/api/v1/text_notes/{escape(request.match_info["key"])}/draft_save">下書き保存</button> <span id="status"></span>
+  <textarea id="title" placeholder="記事タイトル">{escape(draft["name"])}</textarea>
+  <div class="ProseMirror" contenteditable="true" role="textbox" data-placeholder="ご自由にお書きください。">{paragraphs}</div>
+</div>{_EDITOR_SCRIPT}""")
+
+    async def draft_save(self, request: web.Request) -> web.Response:
+        draft = self.drafts.get(request.match_info["key"])
+        if self._user(request) is None or draft is None:
+            return web.json_response({"error": "not found"}, status=404)
+        await self._inject("save")
+        payload = await request.json()
+        draft["name"] = payload.get("name", "")
+        draft["body"] = payload.get("body", "")
+        draft["saves"] += 1
+        self.stats["saves"] += 1
+        return web.json_response({"data": {"key": request.match_info["key"]}})
+
+    async def stats_page(self, request: web.Request) -> web.Response:
+        return web.json_response(self.get_stats())
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "drafts": len(self.drafts), "saved_drafts": sum(1 for d in self.drafts.values() if d["saves"] > 0)}
+
+
+async def start_server(server: FakeNoteServer, host: str = "127.0.0.1", port: int = 0) -> web.AppRunner:
+    """疑似サーバーを起動（port=0なら空いているポートを使う）し、起動済みのrunnerを返す"""
+    runner = web.AppRunner(server.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    return runner
+
+
+def server_url(runner: web.AppRunner) -> str:
+    host, port = runner.addresses[0][:2]
+    return f"http://{host}:{port}"
+
+
+def parse_rates(values) -> Dict[str, float]:
+    """["save=0.2", "login=0.1"] 形式の指定を手順ごとの確率に変換"""
+    rates: Dict[str, float] = {}
+    for value in values or []:
+        stage, _, rate = value.partition("=")
+        if stage not in FAULT_STAGES:
+            raise argparse.ArgumentTypeError(f"不明な手順です: {stage}（{', '.join(FAULT_STAGES)}）")
+        rates[stage] = float(rate)
+    return rates
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=0, help="すべての応答に加える遅延")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="遅延のランダムな揺らぎ")
+    parser.add_argument("--fail", action="append", metavar="STAGE=RATE", help="エラー応答を返す確率（例: save=0.2）")
+    parser.add_argument("--hang", action="append", metavar="STAGE=RATE", help="応答を返さない確率（例: save=0.1）")
+    parser.add_argument("--hang-ms", type=float, default=60000, help="応答を返さない場合の待ち時間")
+    parser.add_argument("--seed", type=int, default=None, help="失敗注入の乱数シード")
+
+
+def config_from_args(args) -> FakeNoteConfig:
+    return FakeNoteConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fail_rates=parse_rates(args.fail),
+        hang_rates=parse_rates(args.hang),
+        hang_ms=args.hang_ms,
+        seed=args.seed
+    )
+
+
+async def _serve(args):
+    server = FakeNoteServer(config_from_args(args))
+    runner = await start_server(server, args.host, args.port)
+    print(f"[疑似note] {server_url(runner)} で起動しました（NOTE_BASE_URLに指定してください）")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        print(f"[疑似note] 集計: {json.dumps(server.get_stats(), ensure_ascii=False)}")
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="note.comの疑似サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_server_arguments(parser)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
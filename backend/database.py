@@ -1,22 +1,128 @@
 """
 SQLiteデータベース管理（セッション別データ分離）
+
+記事とスケジュールはセッションごとのJSONカラムではなく、
+(session_id, article_id) / (session_id, schedule_id) をキーとする専用テーブルに1行ずつ保存する。
 """
 import sqlite3
 import json
-from typing import Dict, Optional, List
+import re
+import threading
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional, List, Tuple, Iterator, Callable, Any
 from datetime import datetime
+from cache import TTLCache
 
 DB_FILE = "user_data.db"
 
-def init_db():
-    """データベースを初期化"""
-    conn = sqlite3.connect(DB_FILE)
+# コネクション設定（WALで読み込みが書き込みをブロックしないようにする）
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # 約16MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=30000",
+)
+SQLITE_CACHED_STATEMENTS = 256  # スレッドごとのプリペアドステートメントキャッシュ
+
+# セッション設定・プロンプト設定の読み込みキャッシュ（更新時に無効化。複数プロセス間の反映はTTLまで遅れうる）
+SETTINGS_CACHE_MAX_ENTRIES = 1024
+SETTINGS_CACHE_TTL_SECONDS = 60
+_settings_cache = TTLCache(max_entries=SETTINGS_CACHE_MAX_ENTRIES, ttl_seconds=SETTINGS_CACHE_TTL_SECONDS)
+# 読み込み中のセッションごとの [読み込み中の数, 世代]（読み込み中に無効化されたら世代を進め、古い値をキャッシュしない）
+# 読み込みが終われば削除するので、件数は同時に読み込んでいるセッション数までしか増えない
+_settings_reads: Dict[str, List[int]] = {}
+_settings_reads_lock = threading.Lock()
+
+# 記事の全文検索（FTS5 trigram、日本語にも対応）。init_dbで利用可否を判定する
+# trigramで扱えない2文字以下の語は、2文字ずつ区切った副インデックス（articles_bigram）で検索する
+_fts_enabled = False
+SEARCH_SNIPPET_TOKENS = 24
+_BIGRAM_RUN_PATTERN = re.compile(r"[^\W_]+")  # unicode61の区切りと揃えるため _ は語に含めない
+
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+
+# 非同期API用のDB専用スレッド（イベントループ上でsqlite3を直接呼ばないようにする）
+DB_THREAD_COUNT = 4
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREAD_COUNT, thread_name_prefix="db")
+
+# articlesテーブルで専用カラムとして保持するキー（それ以外はextraにJSONで保存）
+ARTICLE_COLUMNS = ("title", "content", "theme", "trend_keyword", "posted", "posted_at")
+
+# 記事一覧で指定可能なフィールド -> SELECT式（excerptは本文の先頭のみ）
+ARTICLE_LIST_FIELDS = {
+    "id": "article_id",
+    "title": "title",
+    "content": "content",
+    "excerpt": "substr(content, 1, 200)",
+    "theme": "theme",
+    "trend_keyword": "trend_keyword",
+    "posted": "posted",
+    "posted_at": "posted_at",
+}
+
+def get_connection() -> sqlite3.Connection:
+    """スレッドごとの長寿命コネクションを取得（初回のみ接続してPRAGMAを設定）"""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "db_file", None) == DB_FILE:
+        return conn
+
+    # isolation_level=None: トランザクションは _transaction() で明示的に開始する
+    conn = sqlite3.connect(
+        DB_FILE,
+        timeout=30,
+        isolation_level=None,
+        cached_statements=SQLITE_CACHED_STATEMENTS,
+        check_same_thread=False
+    )
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    _local.conn = conn
+    _local.db_file = DB_FILE
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+@contextmanager
+def _transaction() -> Iterator[sqlite3.Cursor]:
+    """書き込みトランザクション（BEGIN IMMEDIATEで書き込みロックを取得、成功時にコミット、例外時にロールバック）"""
+    conn = get_connection()
     cursor = conn.cursor()
-    
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        yield cursor
+    except BaseException:
+        cursor.execute("ROLLBACK")
+        raise
+    cursor.execute("COMMIT")
+
+def close_db():
+    """全スレッドのコネクションを閉じる（サーバー停止時）"""
+    with _connections_lock:
+        for conn in _connections:
+            try:
+                conn.close()
+            except Exception as e:
+                print(f"[DB] コネクションクローズエラー: {str(e)}")
+        _connections.clear()
+    _local.__dict__.clear()
+
+def init_db():
+    """データベースを初期化（スキーマ確認・移行はここで1回だけ行う）"""
+    with _transaction() as cursor:
+        _init_schema(cursor)
+
+def _init_schema(cursor: sqlite3.Cursor):
+    """テーブル作成・カラム追加・旧JSONカラムからの移行"""
     # 既存のテーブル構造を確認
     cursor.execute("PRAGMA table_info(user_data)")
     columns = [col[1] for col in cursor.fetchall()]
-    
+
     # テーブルが存在しない場合は作成
     if not columns:
         cursor.execute("""
@@ -26,6 +132,7 @@ def init_db():
                 prompt_settings TEXT,
                 articles TEXT,
                 schedules TEXT,
+                last_article_id INTEGER NOT NULL DEFAULT 0,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -34,9 +141,212 @@ def init_db():
         # schedulesカラムが存在しない場合は追加
         if 'schedules' not in columns:
             cursor.execute("ALTER TABLE user_data ADD COLUMN schedules TEXT")
-    
-    conn.commit()
-    conn.close()
+        # 記事IDのシーケンス（セッションごとに単調増加、削除後も再利用しない）
+        if 'last_article_id' not in columns:
+            cursor.execute("ALTER TABLE user_data ADD COLUMN last_article_id INTEGER NOT NULL DEFAULT 0")
+
+    # 記事テーブル（1記事1行）
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+            session_id TEXT NOT NULL,
+            article_id INTEGER NOT NULL,
+            title TEXT,
+            content TEXT,
+            theme TEXT,
+            trend_keyword TEXT,
+            posted INTEGER NOT NULL DEFAULT 0,
+            posted_at TEXT,
+            extra TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, article_id)
+        )
+    """)
+
+    # スケジュールテーブル（1スケジュール1行）
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schedules (
+            session_id TEXT NOT NULL,
+            schedule_id TEXT NOT NULL,
+            status TEXT,
+            data TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (session_id, schedule_id)
+        )
+    """)
+    # 記事一覧のフィルタ + after_idカーソル用インデックス
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_theme ON articles (session_id, theme, article_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_trend ON articles (session_id, trend_keyword, article_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_articles_posted ON articles (session_id, posted, article_id)")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_schedules_status ON schedules (status)")
+
+    # 移行した記事もarticles_bigramに登録されるよう、検索インデックスを先に用意する
+    _init_search_index(cursor)
+    _migrate_json_columns(cursor)
+
+    # シーケンスが既存の記事IDより小さい場合は追いつかせる
+    cursor.execute("""
+        UPDATE user_data SET last_article_id = (
+            SELECT MAX(article_id) FROM articles WHERE articles.session_id = user_data.session_id
+        )
+        WHERE last_article_id < (
+            SELECT COALESCE(MAX(article_id), 0) FROM articles WHERE articles.session_id = user_data.session_id
+        )
+    """)
+
+def _init_search_index(cursor: sqlite3.Cursor):
+    """
+    記事の全文検索インデックスを用意する
+    - articles_fts: タイトル・本文のFTS5 trigram（articlesを外部コンテンツとして参照、3文字以上の語とスニペット用）
+    - articles_bigram: タイトル・本文を2文字ずつ区切った語のFTS5（2文字以下の語用）
+    どちらもsession_idを索引に含め、MATCHの中でセッションを絞り込む。
+
+    articles_ftsはトリガーで差分更新する。articles_bigramの語の分割はPythonで行うため、
+    トリガーは削除・更新時に古い行を消すだけで、登録はこのモジュールの書き込み関数（_index_bigrams）が行う。
+    sqlite3 CLIなど別の手段でarticlesに挿入・更新した記事は、rebuild_search_index() を実行するまで
+    2文字以下の語で検索されない（書き込み自体は失敗しない）。
+    ※ articlesのrowidを参照するため、VACUUM後も rebuild_search_index() で作り直すこと
+    """
+    global _fts_enabled
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_bigram'")
+    exists = cursor.fetchone() is not None
+    # 以前のトリガーはアプリが登録するSQL関数（fts_bigrams）を呼んでいたため作り直す
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND sql LIKE '%fts_bigrams%'")
+    exists = exists and cursor.fetchone() is None
+    if not exists:
+        try:
+            # session_idを含まない旧インデックスは作り直す
+            for trigger in ("articles_fts_ai", "articles_fts_ad", "articles_fts_au"):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            cursor.execute("DROP TABLE IF EXISTS articles_fts")
+            cursor.execute("DROP TABLE IF EXISTS articles_bigram")
+            cursor.execute("""
+                CREATE VIRTUAL TABLE articles_fts USING fts5(
+                    session_id, title, content,
+                    content='articles', content_rowid='rowid',
+                    tokenize='trigram'
+                )
+            """)
+            cursor.execute("""
+                CREATE VIRTUAL TABLE articles_bigram USING fts5(
+                    session_id, title, content,
+                    tokenize='unicode61'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            # FTS5/trigramが使えないSQLiteではLIKE検索にフォールバック
+            print(f"[DB] 全文検索インデックスを作成できません（LIKE検索を使用します）: {str(e)}")
+            _fts_enabled = False
+            return
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts (rowid, session_id, title, content) VALUES (new.rowid, new.session_id, new.title, new.content);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, session_id, title, content)
+            VALUES ('delete', old.rowid, old.session_id, old.title, old.content);
+            DELETE FROM articles_bigram WHERE rowid = old.rowid;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, content ON articles
+        WHEN old.title IS NOT new.title OR old.content IS NOT new.content BEGIN
+            INSERT INTO articles_fts (articles_fts, rowid, session_id, title, content)
+            VALUES ('delete', old.rowid, old.session_id, old.title, old.content);
+            INSERT INTO articles_fts (rowid, session_id, title, content) VALUES (new.rowid, new.session_id, new.title, new.content);
+            DELETE FROM articles_bigram WHERE rowid = old.rowid;
+        END
+    """)
+
+    if not exists:
+        _rebuild_search_index(cursor)
+        print("[DB] 全文検索インデックスを作成しました")
+    _fts_enabled = True
+
+def _rebuild_search_index(cursor: sqlite3.Cursor):
+    cursor.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+    cursor.execute("DELETE FROM articles_bigram")
+    rows = cursor.connection.execute("SELECT rowid, session_id, title, content FROM articles")
+    cursor.executemany(
+        "INSERT INTO articles_bigram (rowid, session_id, title, content) VALUES (?, ?, ?, ?)",
+        ((rowid, session_id, _bigram_text(title), _bigram_text(content)) for rowid, session_id, title, content in rows)
+    )
+
+def _index_bigrams(cursor: sqlite3.Cursor, rowid: int, session_id: str, title: Optional[str], content: Optional[str]):
+    """articles_bigramに1記事を登録（articlesへの挿入、タイトル・本文の更新の後に同じトランザクションで呼ぶ）"""
+    if not _fts_enabled:
+        return
+    cursor.execute("DELETE FROM articles_bigram WHERE rowid = ?", (rowid,))
+    cursor.execute(
+        "INSERT INTO articles_bigram (rowid, session_id, title, content) VALUES (?, ?, ?, ?)",
+        (rowid, session_id, _bigram_text(title), _bigram_text(content))
+    )
+
+def rebuild_search_index():
+    """全文検索インデックスをarticlesテーブルから作り直す"""
+    if not _fts_enabled:
+        return
+    with _transaction() as cursor:
+        _rebuild_search_index(cursor)
+
+def _bigram_text(text: Optional[str]) -> str:
+    """
+    articles_bigramに登録する語（文字・数字の連続ごとに2文字ずつずらして区切り、末尾の1文字も加える）
+    例: "東京都" -> "東京 京都 都"
+    """
+    tokens = []
+    for run in _BIGRAM_RUN_PATTERN.findall(text or ""):
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        tokens.append(run[-1])
+    return " ".join(tokens)
+
+def _migrate_json_columns(cursor: sqlite3.Cursor):
+    """user_data.articles / user_data.schedules のJSONを専用テーブルへ移行（1回のみ）"""
+    cursor.execute("""
+        SELECT session_id, articles, schedules FROM user_data
+        WHERE articles IS NOT NULL OR schedules IS NOT NULL
+    """)
+    rows = cursor.fetchall()
+    if not rows:
+        return
+
+    article_count = 0
+    schedule_count = 0
+    for session_id, articles_json, schedules_json in rows:
+        articles = json.loads(articles_json) if articles_json else []
+        # 旧実装の len(articles)+1 で重複・欠落したIDだけを、既存の最大IDより後ろに振り直す
+        # （重複していないIDはスケジュール等から参照されているため変更しない）
+        next_id = max((a.get("id") for a in articles if _is_legacy_id(a.get("id"))), default=0) + 1
+        used_ids = set()
+        for article in articles:
+            article = dict(article)
+            article_id = article.get("id")
+            if not _is_legacy_id(article_id) or article_id in used_ids:
+                print(f"[DB移行] セッション {session_id[:8]}... の記事ID {article_id} を {next_id} に振り直しました")
+                article_id = next_id
+                next_id += 1
+            used_ids.add(article_id)
+            article["id"] = article_id
+            _insert_article_row(cursor, session_id, article)
+            article_count += 1
+
+        schedules = json.loads(schedules_json) if schedules_json else []
+        for schedule in schedules:
+            if not schedule.get("schedule_id"):
+                continue
+            _insert_schedule_row(cursor, session_id, schedule)
+            schedule_count += 1
+
+    cursor.execute("UPDATE user_data SET articles = NULL, schedules = NULL")
+    print(f"[DB移行] 記事{article_count}件、スケジュール{schedule_count}件を専用テーブルに移行しました")
+
+def _is_legacy_id(article_id: Any) -> bool:
+    """旧JSONの記事IDとしてそのまま使える値か（boolはintのサブクラスなので除く）"""
+    return isinstance(article_id, int) and not isinstance(article_id, bool)
 
 def get_default_data() -> Dict:
     """デフォルトデータを返す"""
@@ -56,34 +366,82 @@ def get_default_data() -> Dict:
         "schedules": []
     }
 
+def _ensure_user_row(cursor: sqlite3.Cursor, session_id: str):
+    """user_dataにセッション行がなければデフォルト設定で作成"""
+    default_data = get_default_data()
+    cursor.execute("""
+        INSERT OR IGNORE INTO user_data (session_id, settings, prompt_settings)
+        VALUES (?, ?, ?)
+    """, (
+        session_id,
+        json.dumps(default_data["settings"], ensure_ascii=False),
+        json.dumps(default_data["prompt_settings"], ensure_ascii=False)
+    ))
+
+def _article_to_row(article: Dict) -> Tuple:
+    """記事dictをarticlesテーブルのカラム値に変換"""
+    extra = {k: v for k, v in article.items() if k != "id" and k not in ARTICLE_COLUMNS}
+    return (
+        article.get("title"),
+        article.get("content"),
+        article.get("theme"),
+        article.get("trend_keyword"),
+        1 if article.get("posted") else 0,
+        article.get("posted_at"),
+        json.dumps(extra, ensure_ascii=False) if extra else None
+    )
+
+def _row_to_article(row: Tuple) -> Dict:
+    """articlesテーブルの行 (article_id, title, content, theme, trend_keyword, posted, posted_at, extra) を記事dictに変換"""
+    article_id, title, content, theme, trend_keyword, posted, posted_at, extra = row
+    article = {
+        "id": article_id,
+        "title": title,
+        "content": content,
+        "theme": theme
+    }
+    if trend_keyword is not None:
+        article["trend_keyword"] = trend_keyword
+    if posted:
+        article["posted"] = True
+        article["posted_at"] = posted_at
+    if extra:
+        article.update(json.loads(extra))
+    return article
+
+_ARTICLE_SELECT = "SELECT article_id, title, content, theme, trend_keyword, posted, posted_at, extra FROM articles"
+
+def _insert_article_row(cursor: sqlite3.Cursor, session_id: str, article: Dict):
+    row = _article_to_row(article)
+    cursor.execute("""
+        INSERT INTO articles (session_id, article_id, title, content, theme, trend_keyword, posted, posted_at, extra)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (session_id, article["id"], *row))
+    _index_bigrams(cursor, cursor.lastrowid, session_id, row[0], row[1])
+
+def _insert_schedule_row(cursor: sqlite3.Cursor, session_id: str, schedule: Dict):
+    cursor.execute("""
+        INSERT OR REPLACE INTO schedules (session_id, schedule_id, status, data)
+        VALUES (?, ?, ?, ?)
+    """, (
+        session_id,
+        schedule["schedule_id"],
+        schedule.get("status"),
+        json.dumps(schedule, ensure_ascii=False)
+    ))
+
 def get_user_data(session_id: str) -> Dict:
     """ユーザーデータを取得（なければデフォルトを作成）"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # カラム数を確認して適切なSELECT文を構築
-    cursor.execute("PRAGMA table_info(user_data)")
-    columns = [col[1] for col in cursor.fetchall()]
-    
-    if 'schedules' in columns:
-        cursor.execute("SELECT settings, prompt_settings, articles, schedules FROM user_data WHERE session_id = ?", (session_id,))
-    else:
-        cursor.execute("SELECT settings, prompt_settings, articles FROM user_data WHERE session_id = ?", (session_id,))
-    
-    row = cursor.fetchone()
-    conn.close()
-    
+    conn = get_connection()
+    row = conn.execute("SELECT settings, prompt_settings FROM user_data WHERE session_id = ?", (session_id,)).fetchone()
+
     if row and row[0]:
-        result = {
+        return {
             "settings": json.loads(row[0]) if row[0] else get_default_data()["settings"],
             "prompt_settings": json.loads(row[1]) if row[1] else get_default_data()["prompt_settings"],
-            "articles": json.loads(row[2]) if row[2] else []
+            "articles": get_user_articles(session_id),
+            "schedules": get_user_schedules(session_id)
         }
-        if len(row) > 3 and row[3]:
-            result["schedules"] = json.loads(row[3]) if row[3] else []
-        else:
-            result["schedules"] = []
-        return result
     else:
         # 新規ユーザー - デフォルトデータを作成
         default_data = get_default_data()
@@ -91,104 +449,433 @@ def get_user_data(session_id: str) -> Dict:
         return default_data
 
 def save_user_data(session_id: str, data: Dict):
-    """ユーザーデータを保存"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # カラム数を確認
-    cursor.execute("PRAGMA table_info(user_data)")
-    columns = [col[1] for col in cursor.fetchall()]
-    
-    if 'schedules' in columns:
-        cursor.execute("""
-            INSERT OR REPLACE INTO user_data (session_id, settings, prompt_settings, articles, schedules, updated_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (
-            session_id,
-            json.dumps(data.get("settings", {}), ensure_ascii=False),
-            json.dumps(data.get("prompt_settings", {}), ensure_ascii=False),
-            json.dumps(data.get("articles", []), ensure_ascii=False),
-            json.dumps(data.get("schedules", []), ensure_ascii=False)
-        ))
-    else:
+    """ユーザーデータを保存（articles / schedules を含む場合はそのセッションの行を置き換える）"""
+    with _transaction() as cursor:
         cursor.execute("""
-            INSERT OR REPLACE INTO user_data (session_id, settings, prompt_settings, articles, updated_at)
-            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            INSERT INTO user_data (session_id, settings, prompt_settings, updated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(session_id) DO UPDATE SET
+                settings = excluded.settings,
+                prompt_settings = excluded.prompt_settings,
+                updated_at = CURRENT_TIMESTAMP
         """, (
             session_id,
             json.dumps(data.get("settings", {}), ensure_ascii=False),
-            json.dumps(data.get("prompt_settings", {}), ensure_ascii=False),
-            json.dumps(data.get("articles", []), ensure_ascii=False)
+            json.dumps(data.get("prompt_settings", {}), ensure_ascii=False)
         ))
-    
-    conn.commit()
-    conn.close()
+
+        if "articles" in data:
+            cursor.execute("DELETE FROM articles WHERE session_id = ?", (session_id,))
+            for article in data["articles"]:
+                _insert_article_row(cursor, session_id, article)
+            max_id = max((a["id"] for a in data["articles"]), default=0)
+            cursor.execute(
+                "UPDATE user_data SET last_article_id = MAX(last_article_id, ?) WHERE session_id = ?",
+                (max_id, session_id)
+            )
+
+        if "schedules" in data:
+            cursor.execute("DELETE FROM schedules WHERE session_id = ?", (session_id,))
+            for schedule in data["schedules"]:
+                _insert_schedule_row(cursor, session_id, schedule)
+    _invalidate_settings_cache(session_id)
+
+def ensure_user_data(session_id: str):
+    """セッションのuser_data行を作成（既にあれば何もしない）"""
+    with _transaction() as cursor:
+        _ensure_user_row(cursor, session_id)
+
+def _get_settings_column(session_id: str, column: str) -> Dict:
+    """user_dataのsettings / prompt_settingsカラムだけを読み込む（キャッシュ経由、なければデフォルトを作成）"""
+    cached = _settings_cache.get((session_id, column))
+    if cached is not None:
+        return dict(cached)
+
+    with _settings_reads_lock:
+        reading = _settings_reads.setdefault(session_id, [0, 0])
+        reading[0] += 1
+        generation = reading[1]
+    try:
+        conn = get_connection()
+        row = conn.execute(f"SELECT {column} FROM user_data WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            with _transaction() as cursor:
+                _ensure_user_row(cursor, session_id)
+        value = json.loads(row[0]) if row and row[0] else get_default_data()[column]
+        with _settings_reads_lock:
+            # 読み込みの後に無効化されていれば、読んだ値は古い可能性があるのでキャッシュしない
+            if reading[1] == generation:
+                _settings_cache.set((session_id, column), value)
+        return dict(value)
+    finally:
+        with _settings_reads_lock:
+            reading[0] -= 1
+            if reading[0] == 0:
+                del _settings_reads[session_id]
+
+def _invalidate_settings_cache(session_id: str):
+    with _settings_reads_lock:
+        reading = _settings_reads.get(session_id)
+        if reading is not None:
+            reading[1] += 1
+        _settings_cache.delete((session_id, "settings"))
+        _settings_cache.delete((session_id, "prompt_settings"))
+
+def get_user_settings(session_id: str) -> Dict:
+    """設定のみを取得（記事・スケジュールは読み込まない）"""
+    return _get_settings_column(session_id, "settings")
+
+def get_user_prompt_settings(session_id: str) -> Dict:
+    """プロンプト設定のみを取得（記事・スケジュールは読み込まない）"""
+    return _get_settings_column(session_id, "prompt_settings")
+
+def session_exists(session_id: str) -> bool:
+    """セッションIDがデータベースに存在するか"""
+    conn = get_connection()
+    row = conn.execute("SELECT 1 FROM user_data WHERE session_id = ?", (session_id,)).fetchone()
+    return row is not None
 
 def update_user_settings(session_id: str, settings: Dict):
     """設定のみを更新"""
     print(f"[DB] update_user_settings called for session: {session_id[:8]}...")
-    data = get_user_data(session_id)
-    print(f"[DB] 現在のデータ: {data['settings']}")
-    data["settings"] = settings
-    print(f"[DB] 更新後のデータ: {data['settings']}")
-    save_user_data(session_id, data)
+    with _transaction() as cursor:
+        _ensure_user_row(cursor, session_id)
+        cursor.execute(
+            "UPDATE user_data SET settings = ?, updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+            (json.dumps(settings, ensure_ascii=False), session_id)
+        )
+    _invalidate_settings_cache(session_id)
     print(f"[DB] データベースに保存しました")
 
 def update_user_prompt_settings(session_id: str, prompt_settings: Dict):
     """プロンプト設定のみを更新"""
-    data = get_user_data(session_id)
-    data["prompt_settings"] = prompt_settings
-    save_user_data(session_id, data)
+    with _transaction() as cursor:
+        _ensure_user_row(cursor, session_id)
+        cursor.execute(
+            "UPDATE user_data SET prompt_settings = ?, updated_at = CURRENT_TIMESTAMP WHERE session_id = ?",
+            (json.dumps(prompt_settings, ensure_ascii=False), session_id)
+        )
+    _invalidate_settings_cache(session_id)
 
-def add_user_article(session_id: str, article: Dict):
-    """記事を追加"""
-    data = get_user_data(session_id)
-    data["articles"].append(article)
-    save_user_data(session_id, data)
+def _next_article_id(cursor: sqlite3.Cursor, session_id: str) -> int:
+    """セッションの記事IDシーケンスを進めて新しいIDを返す（_transaction内で呼ぶこと）"""
+    cursor.execute("UPDATE user_data SET last_article_id = last_article_id + 1 WHERE session_id = ?", (session_id,))
+    cursor.execute("SELECT last_article_id FROM user_data WHERE session_id = ?", (session_id,))
+    return cursor.fetchone()[0]
+
+def add_user_article(session_id: str, article: Dict) -> Dict:
+    """記事を追加（IDは書き込みトランザクション内でセッションごとのシーケンスから採番し、articleに反映する）"""
+    with _transaction() as cursor:
+        _ensure_user_row(cursor, session_id)
+        article["id"] = _next_article_id(cursor, session_id)
+        _insert_article_row(cursor, session_id, article)
+    return article
 
 def get_user_articles(session_id: str) -> list:
     """ユーザーの記事一覧を取得"""
-    data = get_user_data(session_id)
-    return data["articles"]
+    conn = get_connection()
+    rows = conn.execute(f"{_ARTICLE_SELECT} WHERE session_id = ? ORDER BY article_id", (session_id,)).fetchall()
+    return [_row_to_article(row) for row in rows]
+
+def list_user_articles(
+    session_id: str,
+    limit: Optional[int] = None,
+    after_id: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    theme: Optional[str] = None,
+    trend_keyword: Optional[str] = None,
+    posted: Optional[bool] = None
+) -> Tuple[List[Dict], Optional[int]]:
+    """
+    記事一覧をID順にページングして取得
+
+    Args:
+        limit: 最大件数（Noneの場合は全件）
+        after_id: このIDより後の記事から取得（カーソル）
+        fields: 返すフィールド（ARTICLE_LIST_FIELDSのキー、Noneの場合は記事全体）
+        theme / trend_keyword / posted: 絞り込み条件
+
+    Returns:
+        (記事のリスト, 次ページのafter_id（最終ページならNone）)
+    """
+    where = ["session_id = ?"]
+    params: List[Any] = [session_id]
+    if after_id is not None:
+        where.append("article_id > ?")
+        params.append(after_id)
+    if theme is not None:
+        where.append("theme = ?")
+        params.append(theme)
+    if trend_keyword is not None:
+        where.append("trend_keyword = ?")
+        params.append(trend_keyword)
+    if posted is not None:
+        where.append("posted = ?")
+        params.append(1 if posted else 0)
+
+    if fields:
+        unknown = [f for f in fields if f not in ARTICLE_LIST_FIELDS]
+        if unknown:
+            raise ValueError(f"不明なフィールドです: {', '.join(unknown)}")
+        # カーソル計算のためidは常に取得する
+        selected = ["id"] + [f for f in fields if f != "id"]
+        select = "SELECT " + ", ".join(ARTICLE_LIST_FIELDS[f] for f in selected) + " FROM articles"
+    else:
+        selected = None
+        select = _ARTICLE_SELECT
+
+    sql = f"{select} WHERE {' AND '.join(where)} ORDER BY article_id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
+
+    conn = get_connection()
+    rows = conn.execute(sql, params).fetchall()
+
+    next_after_id = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_after_id = rows[-1][0]
+
+    if selected is None:
+        return [_row_to_article(row) for row in rows], next_after_id
+
+    articles = []
+    for row in rows:
+        article = dict(zip(selected, row))
+        if "posted" in article:
+            article["posted"] = bool(article["posted"])
+        if "id" not in fields:
+            del article["id"]
+        articles.append(article)
+    return articles, next_after_id
+
+def _fts_phrase(text: str) -> str:
+    """文字列をFTS5のフレーズに変換（記号をクエリ構文として解釈させない）"""
+    return '"' + text.replace('"', '""') + '"'
+
+def _fts_query(terms: List[str]) -> str:
+    """検索語をarticles_fts（trigram）の検索式に変換（空白区切りでAND）"""
+    return " AND ".join(_fts_phrase(term) for term in terms)
+
+def _bigram_query(terms: List[str]) -> str:
+    """
+    検索語をarticles_bigramの検索式に変換（2文字以上は2文字ずつの語の連続、1文字は前方一致）
+    記号だけの語などで検索式にできない場合は空文字列
+    """
+    parts = []
+    for term in terms:
+        for run in _BIGRAM_RUN_PATTERN.findall(term):
+            if len(run) == 1:
+                parts.append(_fts_phrase(run) + "*")
+            else:
+                parts.append(_fts_phrase(" ".join(run[i:i + 2] for i in range(len(run) - 1))))
+    return " AND ".join(parts)
+
+def _make_snippet(text: str, terms: List[str], width: int = 60) -> str:
+    """LIKE検索用：最初にヒットした語の前後を切り出す"""
+    text = text or ""
+    lowered = text.lower()
+    pos = min((p for p in (lowered.find(t.lower()) for t in terms) if p >= 0), default=0)
+    start = max(0, pos - width // 2)
+    snippet = text[start:start + width]
+    return ("…" if start > 0 else "") + snippet + ("…" if start + width < len(text) else "")
+
+def search_user_articles(session_id: str, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    """
+    記事をタイトル・本文で全文検索（関連度順）
+
+    bm25でランク付けし、タイトルの一致を本文より重視する。セッションの絞り込みもMATCHの中で行う。
+    3文字以上の語だけならFTS5（trigram）、2文字以下の語を含む場合は2文字ずつ区切った副インデックスを使う。
+    FTS5が使えない環境ではLIKE検索（新しい順、scoreはNone）になる。
+
+    Returns:
+        [{"id", "title", "theme", "trend_keyword", "posted", "posted_at", "snippet", "score"}]
+    """
+    terms = query.split()
+    if not terms:
+        return []
+
+    conn = get_connection()
+    bigram_query = _bigram_query(terms) if _fts_enabled else ""
+    # MATCHの中でセッションの記事に絞り込み、CROSS JOINで索引側から結合させる（フレーズは部分一致しうるため、結合後に完全一致も確認する）
+    # trigramではセッションIDも3文字以上でないと一致しない
+    if _fts_enabled and len(session_id) >= 3 and all(len(term) >= 3 for term in terms):
+        match = f"{{session_id}} : {_fts_phrase(session_id)} AND {{title content}} : ({_fts_query(terms)})"
+        rows = conn.execute(f"""
+            SELECT a.article_id, a.title, a.theme, a.trend_keyword, a.posted, a.posted_at,
+                   snippet(articles_fts, 2, '[', ']', '…', {SEARCH_SNIPPET_TOKENS}),
+                   bm25(articles_fts, 0.0, 10.0, 1.0) AS score
+            FROM articles_fts
+            CROSS JOIN articles a ON a.rowid = articles_fts.rowid
+            WHERE articles_fts MATCH ? AND a.session_id = ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        """, (match, session_id, limit, offset)).fetchall()
+    elif bigram_query:
+        match = f"{{session_id}} : {_fts_phrase(session_id)} AND {{title content}} : ({bigram_query})"
+        rows = conn.execute("""
+            SELECT a.article_id, a.title, a.theme, a.trend_keyword, a.posted, a.posted_at, a.content,
+                   bm25(articles_bigram, 0.0, 10.0, 1.0) AS score
+            FROM articles_bigram
+            CROSS JOIN articles a ON a.rowid = articles_bigram.rowid
+            WHERE articles_bigram MATCH ? AND a.session_id = ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        """, (match, session_id, limit, offset)).fetchall()
+        # articles_bigramは内容を持たないため、スニペットは本文から切り出す
+        rows = [(*row[:6], _make_snippet(row[6], terms), row[7]) for row in rows]
+    else:
+        where = " AND ".join("(title LIKE ? ESCAPE '\\' OR content LIKE ? ESCAPE '\\')" for _ in terms)
+        params: List[Any] = [session_id]
+        for term in terms:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            params.extend([pattern, pattern])
+        rows = conn.execute(f"""
+            SELECT article_id, title, theme, trend_keyword, posted, posted_at, content, NULL
+            FROM articles
+            WHERE session_id = ? AND {where}
+            ORDER BY article_id DESC
+            LIMIT ? OFFSET ?
+        """, (*params, limit, offset)).fetchall()
+        rows = [(*row[:6], _make_snippet(row[6], terms), None) for row in rows]
+
+    return [
+        {
+            "id": row[0],
+            "title": row[1],
+            "theme": row[2],
+            "trend_keyword": row[3],
+            "posted": bool(row[4]),
+            "posted_at": row[5],
+            "snippet": row[6],
+            "score": -row[7] if row[7] is not None else None
+        }
+        for row in rows
+    ]
 
 def get_user_article(session_id: str, article_id: int) -> Optional[Dict]:
     """特定の記事を取得"""
-    articles = get_user_articles(session_id)
-    return next((a for a in articles if a.get("id") == article_id), None)
+    conn = get_connection()
+    row = conn.execute(f"{_ARTICLE_SELECT} WHERE session_id = ? AND article_id = ?", (session_id, article_id)).fetchone()
+    return _row_to_article(row) if row else None
 
 def update_user_article(session_id: str, article_id: int, updates: Dict):
     """記事を更新"""
-    data = get_user_data(session_id)
-    articles = data["articles"]
-    for i, article in enumerate(articles):
-        if article.get("id") == article_id:
-            articles[i] = {**article, **updates}
-            break
-    data["articles"] = articles
-    save_user_data(session_id, data)
+    with _transaction() as cursor:
+        cursor.execute(f"{_ARTICLE_SELECT} WHERE session_id = ? AND article_id = ?", (session_id, article_id))
+        row = cursor.fetchone()
+        if row:
+            article = {**_row_to_article(row), **updates, "id": article_id}
+            values = _article_to_row(article)
+            cursor.execute("""
+                UPDATE articles
+                SET title = ?, content = ?, theme = ?, trend_keyword = ?, posted = ?, posted_at = ?, extra = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE session_id = ? AND article_id = ?
+            """, (*values, session_id, article_id))
+            if values[0] != row[1] or values[1] != row[2]:
+                # タイトル・本文が変わった場合はトリガーが消したarticles_bigramの行を登録し直す
+                cursor.execute("SELECT rowid FROM articles WHERE session_id = ? AND article_id = ?", (session_id, article_id))
+                _index_bigrams(cursor, cursor.fetchone()[0], session_id, values[0], values[1])
 
 def delete_user_article(session_id: str, article_id: int):
     """記事を削除"""
-    data = get_user_data(session_id)
-    data["articles"] = [a for a in data["articles"] if a.get("id") != article_id]
-    save_user_data(session_id, data)
+    with _transaction() as cursor:
+        cursor.execute("DELETE FROM articles WHERE session_id = ? AND article_id = ?", (session_id, article_id))
 
 def get_user_schedules(session_id: str) -> List[Dict]:
     """ユーザーのスケジュール一覧を取得"""
-    data = get_user_data(session_id)
-    return data.get("schedules", [])
+    conn = get_connection()
+    rows = conn.execute("SELECT data FROM schedules WHERE session_id = ? ORDER BY created_at, rowid", (session_id,)).fetchall()
+    return [json.loads(row[0]) for row in rows]
+
+def get_user_schedule(session_id: str, schedule_id: str) -> Optional[Dict]:
+    """特定のスケジュールを取得"""
+    conn = get_connection()
+    row = conn.execute("SELECT data FROM schedules WHERE session_id = ? AND schedule_id = ?", (session_id, schedule_id)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def get_active_schedules() -> List[Tuple[str, Dict]]:
+    """全セッションの有効なスケジュールを (session_id, schedule) のリストで取得（起動時の再登録用）"""
+    conn = get_connection()
+    rows = conn.execute("SELECT session_id, data FROM schedules WHERE status = 'active' ORDER BY created_at, rowid").fetchall()
+    return [(row[0], json.loads(row[1])) for row in rows]
 
 def add_user_schedule(session_id: str, schedule: Dict):
     """スケジュールを追加"""
-    data = get_user_data(session_id)
-    if "schedules" not in data:
-        data["schedules"] = []
-    data["schedules"].append(schedule)
-    save_user_data(session_id, data)
+    with _transaction() as cursor:
+        _ensure_user_row(cursor, session_id)
+        _insert_schedule_row(cursor, session_id, schedule)
 
 def delete_user_schedule(session_id: str, schedule_id: str):
     """スケジュールを削除"""
-    data = get_user_data(session_id)
-    data["schedules"] = [s for s in data.get("schedules", []) if s.get("schedule_id") != schedule_id]
-    save_user_data(session_id, data)
+    with _transaction() as cursor:
+        cursor.execute("DELETE FROM schedules WHERE session_id = ? AND schedule_id = ?", (session_id, schedule_id))
+
+# ---- 非同期API（FastAPIのasyncハンドラーから使用） ----
+
+async def run_in_db_thread(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """DB専用スレッドで同期関数を実行し、結果を待つ"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, functools.partial(func, *args, **kwargs))
+
+async def session_exists_async(session_id: str) -> bool:
+    return await run_in_db_thread(session_exists, session_id)
+
+async def get_user_data_async(session_id: str) -> Dict:
+    return await run_in_db_thread(get_user_data, session_id)
+
+async def get_user_settings_async(session_id: str) -> Dict:
+    cached = _settings_cache.get((session_id, "settings"))
+    if cached is not None:
+        return dict(cached)
+    return await run_in_db_thread(get_user_settings, session_id)
+
+async def get_user_prompt_settings_async(session_id: str) -> Dict:
+    cached = _settings_cache.get((session_id, "prompt_settings"))
+    if cached is not None:
+        return dict(cached)
+    return await run_in_db_thread(get_user_prompt_settings, session_id)
+
+async def update_user_settings_async(session_id: str, settings: Dict):
+    await run_in_db_thread(update_user_settings, session_id, settings)
+
+async def update_user_prompt_settings_async(session_id: str, prompt_settings: Dict):
+    await run_in_db_thread(update_user_prompt_settings, session_id, prompt_settings)
+
+async def add_user_article_async(session_id: str, article: Dict) -> Dict:
+    return await run_in_db_thread(add_user_article, session_id, article)
+
+async def get_user_articles_async(session_id: str) -> list:
+    return await run_in_db_thread(get_user_articles, session_id)
+
+async def list_user_articles_async(session_id: str, **kwargs) -> Tuple[List[Dict], Optional[int]]:
+    return await run_in_db_thread(list_user_articles, session_id, **kwargs)
+
+async def search_user_articles_async(session_id: str, query: str, limit: int = 20, offset: int = 0) -> List[Dict]:
+    return await run_in_db_thread(search_user_articles, session_id, query, limit, offset)
+
+async def get_user_article_async(session_id: str, article_id: int) -> Optional[Dict]:
+    return await run_in_db_thread(get_user_article, session_id, article_id)
+
+async def update_user_article_async(session_id: str, article_id: int, updates: Dict):
+    await run_in_db_thread(update_user_article, session_id, article_id, updates)
+
+async def delete_user_article_async(session_id: str, article_id: int):
+    await run_in_db_thread(delete_user_article, session_id, article_id)
+
+async def get_user_schedules_async(session_id: str) -> List[Dict]:
+    return await run_in_db_thread(get_user_schedules, session_id)
+
+async def get_user_schedule_async(session_id: str, schedule_id: str) -> Optional[Dict]:
+    return await run_in_db_thread(get_user_schedule, session_id, schedule_id)
+
+async def get_active_schedules_async() -> List[Tuple[str, Dict]]:
+    return await run_in_db_thread(get_active_schedules)
+
+async def add_user_schedule_async(session_id: str, schedule: Dict):
+    await run_in_db_thread(add_user_schedule, session_id, schedule)
 
+async def delete_user_schedule_async(session_id: str, schedule_id: str):
+    await run_in_db_thread(delete_user_schedule, session_id, schedule_id)
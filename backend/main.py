@@ -1,20 +1,28 @@
 from fastapi import FastAPI, HTTPException, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from pathlib import Path
 import os
+import json
 import uuid
-import sqlite3
 import sys
 import asyncio
 import asyncio.subprocess
 import time
 from dotenv import load_dotenv
+from session_store import SessionStore
+from metrics import get_metrics
 from agents import ThemeAgent, TrendAgent, XPostAgent
-from services.note_service import NoteService
 from services.auto_post_service import AutoPostService
-from database import init_db, get_user_data, save_user_data, update_user_settings, update_user_prompt_settings, add_user_article, get_user_articles, get_user_article, update_user_article, delete_user_article, get_user_schedules, add_user_schedule, delete_user_schedule
+from services.note_service import DraftCheckpoint
+from services.note_post_executor import create_executor_from_env
+from services.note_session_pool import create_pool_from_env
+from services.resource_blocker import get_all_stats as get_resource_block_stats
+from services.selector_cache import get_default_selector_cache
+from database import init_db, close_db, session_exists, ensure_user_data, get_user_settings, get_user_prompt_settings, update_user_settings, update_user_prompt_settings, add_user_article, list_user_articles, search_user_articles, get_user_article, delete_user_article, get_user_schedules, get_user_schedule, delete_user_schedule
+from database import run_in_db_thread, get_user_settings_async, get_user_prompt_settings_async, add_user_article_async, get_user_article_async, update_user_article_async, add_user_schedule_async, get_active_schedules_async
 
 # Windows環境でのasyncio問題を修正
 if sys.platform == 'win32':
@@ -27,6 +35,12 @@ init_db()
 
 app = FastAPI(title="Note下書き投稿システム")
 auto_post_service = AutoPostService()
+# note.comアカウントごとのログイン済みブラウザのプール
+note_session_pool = create_pool_from_env()
+# アカウントごとの順序を保ちつつ、ブラウザの同時実行数を制限して投稿する実行キュー
+note_post_executor = create_executor_from_env(note_session_pool)
+# 実行中の一括投稿タスク（ストリーミングのクライアントが切断してもGCされないように保持）
+batch_tasks = set()
 
 # Playwrightブラウザのインストールを1回だけ確認するためのロック
 _playwright_install_lock = asyncio.Lock()
@@ -97,8 +111,14 @@ from services.trend_scraper import TrendScraper
 from agents.trend_agent import get_global_trend_scraper
 global_trend_scraper = get_global_trend_scraper()
 
-# セッション管理（セッションID: 有効フラグ）
-active_sessions = {}
+# セッション管理（ローカルLRU/TTLキャッシュ + 全ワーカー共有のSQLite）
+session_store = SessionStore(
+    exists_backend=session_exists,
+    create_backend=ensure_user_data,
+    max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", "3600")),
+    negative_ttl_seconds=float(os.getenv("SESSION_NEGATIVE_TTL_SECONDS", "60"))
+)
 
 # CORS設定
 # 環境変数から許可オリジンを取得（カンマ区切り）
@@ -127,32 +147,22 @@ app.add_middleware(
 # セッション管理関数
 def create_session() -> str:
     """新しいセッションを作成"""
-    session_id = str(uuid.uuid4())
-    active_sessions[session_id] = True
-    return session_id
+    return session_store.create()
 
 def validate_session(session_id: Optional[str]) -> str:
-    """セッションIDを検証（データベースに存在すれば有効）"""
+    """セッションIDを検証（キャッシュになければデータベースで確認）"""
     if not session_id:
         raise HTTPException(status_code=401, detail="セッションIDが必要です。ログインしてください。")
     
-    # アクティブセッションに存在するか確認
-    if session_id in active_sessions:
+    cached = session_store.lookup(session_id)
+    if cached is True:
         return session_id
+    if cached is False:
+        raise HTTPException(status_code=401, detail="セッションが無効です。再ログインしてください。")
     
-    # データベースに存在するか確認（再起動後も有効）
+    # データベースに存在するか確認（再起動後・他ワーカーで発行されたセッションも有効）
     try:
-        from database import DB_FILE
-        # データベースにセッションIDが存在するか確認
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("SELECT session_id FROM user_data WHERE session_id = ?", (session_id,))
-        row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            # データベースに存在すれば、セッションをアクティブに復元
-            active_sessions[session_id] = True
+        if session_store.validate(session_id):
             print(f"[セッション復元] セッションID {session_id[:8]}... をデータベースから復元しました")
             return session_id
         else:
@@ -164,6 +174,13 @@ def validate_session(session_id: Optional[str]) -> str:
         print(f"[セッション検証エラー] {str(e)}")
         raise HTTPException(status_code=401, detail="セッションが無効です。再ログインしてください。")
 
+async def validate_session_async(session_id: Optional[str]) -> str:
+    """セッションIDを検証（asyncハンドラー用、DB確認はDB専用スレッドで実行）"""
+    if session_id and session_store.lookup(session_id) is None:
+        return await run_in_db_thread(validate_session, session_id)
+    # キャッシュで判定できる場合はDBに触れない
+    return validate_session(session_id)
+
 # 認証モデル
 class LoginRequest(BaseModel):
     password: str
@@ -202,10 +219,30 @@ class AutoPostRequest(BaseModel):
     article_id: str
     scheduled_time: str
 
+class PostBatchRequest(BaseModel):
+    article_ids: List[int]
+    stream: bool = False  # Trueなら1件ごとの結果をNDJSONで逐次返す
+
 @app.get("/")
 def read_root():
     return {"message": "Note下書き投稿システムAPI"}
 
+@app.get("/api/metrics")
+def read_metrics(
+    recent: int = Query(50, ge=0, le=200),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+):
+    """投稿処理の手順ごとの所要時間（p50/p95など）とブラウザ関連の集計（要ログイン）"""
+    validate_session(x_session_id)
+    return {
+        **get_metrics(recent=recent),
+        "session_pool": note_session_pool.get_info(),
+        "post_executor": note_post_executor.get_info(),
+        "resource_blocking": get_resource_block_stats(),
+        "selector_cache": get_default_selector_cache().stats(),
+        "session_cache": session_store.stats()
+    }
+
 @app.post("/api/auth/login")
 def login(request: LoginRequest):
     """固定パスワードでログイン、セッションIDを発行"""
@@ -224,9 +261,9 @@ def get_settings(x_session_id: Optional[str] = Header(None, alias="X-Session-ID"
     print(f"[GET /api/settings] セッションID: {x_session_id}")
     session_id = validate_session(x_session_id)
     print(f"[GET /api/settings] 検証済みセッションID: {session_id}")
-    data = get_user_data(session_id)
-    print(f"[GET /api/settings] 取得データ: {data['settings']}")
-    return data["settings"]
+    settings = get_user_settings(session_id)
+    print(f"[GET /api/settings] 取得データ: {settings}")
+    return settings
 
 @app.post("/api/settings")
 def update_settings(request: SettingsRequest, x_session_id: Optional[str] = Header(None, alias="X-Session-ID")):
@@ -243,8 +280,7 @@ def update_settings(request: SettingsRequest, x_session_id: Optional[str] = Head
 def get_prompt_settings(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")):
     """プロンプト設定を取得（セッション別）"""
     session_id = validate_session(x_session_id)
-    data = get_user_data(session_id)
-    return data["prompt_settings"]
+    return get_user_prompt_settings(session_id)
 
 @app.post("/api/prompt-settings")
 def update_prompt_settings(request: PromptSettingsRequest, x_session_id: Optional[str] = Header(None, alias="X-Session-ID")):
@@ -296,10 +332,9 @@ async def generate_theme_article(
 ):
     """テーマ別記事生成（セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
-        data = get_user_data(session_id)
-        settings = data["settings"]
-        prompt_settings = data["prompt_settings"]
+        session_id = await validate_session_async(x_session_id)
+        settings = await get_user_settings_async(session_id)
+        prompt_settings = await get_user_prompt_settings_async(session_id)
         
         # APIキーの取得と検証
         openai_api_key = settings.get("openai_api_key", "").strip() if llm_provider == "openai" else None
@@ -325,14 +360,12 @@ async def generate_theme_article(
         )
         
         # 記事を保存
-        articles = get_user_articles(session_id)
         article = {
-            "id": len(articles) + 1,
             "title": result["title"],
             "content": result["content"],
             "theme": theme
         }
-        add_user_article(session_id, article)
+        await add_user_article_async(session_id, article)
         
         return {"success": True, "article": article}
     except HTTPException:
@@ -350,10 +383,9 @@ async def generate_trend_article(
 ):
     """Xトレンド記事生成（セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
-        data = get_user_data(session_id)
-        settings = data["settings"]
-        prompt_settings = data["prompt_settings"]
+        session_id = await validate_session_async(x_session_id)
+        settings = await get_user_settings_async(session_id)
+        prompt_settings = await get_user_prompt_settings_async(session_id)
         
         # APIキーの取得と検証
         openai_api_key = settings.get("openai_api_key", "").strip() if llm_provider == "openai" else None
@@ -381,15 +413,13 @@ async def generate_trend_article(
         )
         
         # 記事を保存
-        articles = get_user_articles(session_id)
         article = {
-            "id": len(articles) + 1,
             "title": result["title"],
             "content": result["content"],
             "theme": theme,
             "trend_keyword": trend_keyword
         }
-        add_user_article(session_id, article)
+        await add_user_article_async(session_id, article)
         
         return {"success": True, "article": article}
     except HTTPException:
@@ -405,9 +435,8 @@ async def generate_custom_article(
 ):
     """カスタムプロンプト記事生成（セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
-        data = get_user_data(session_id)
-        settings = data["settings"]
+        session_id = await validate_session_async(x_session_id)
+        settings = await get_user_settings_async(session_id)
         
         # APIキーの取得と検証
         openai_api_key = settings.get("openai_api_key", "").strip() if request.llm_provider == "openai" else None
@@ -430,14 +459,12 @@ async def generate_custom_article(
         )
         
         # 記事を保存
-        articles = get_user_articles(session_id)
         article = {
-            "id": len(articles) + 1,
             "title": result["title"],
             "content": result["content"],
             "theme": "カスタム"
         }
-        add_user_article(session_id, article)
+        await add_user_article_async(session_id, article)
         
         return {"success": True, "article": article}
     except HTTPException:
@@ -453,15 +480,13 @@ async def generate_manual_article(
 ):
     """手動記事生成（編集可能・セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
-        articles = get_user_articles(session_id)
+        session_id = await validate_session_async(x_session_id)
         article = {
-            "id": len(articles) + 1,
             "title": request.title,
             "content": request.content,
             "theme": request.theme
         }
-        add_user_article(session_id, article)
+        await add_user_article_async(session_id, article)
         return {"success": True, "article": article}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -472,20 +497,53 @@ def create_article(
     x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
 ):
     session_id = validate_session(x_session_id)
-    articles = get_user_articles(session_id)
-    article = {
-        "id": len(articles) + 1,
-        **request.dict()
-    }
+    article = request.dict()
     add_user_article(session_id, article)
     return {"success": True, "article": article}
 
 @app.get("/api/articles")
-def get_articles(x_session_id: Optional[str] = Header(None, alias="X-Session-ID")):
-    """記事一覧取得（セッション別）"""
+def get_articles(
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    after_id: Optional[int] = Query(None),
+    fields: Optional[str] = Query(None),
+    theme: Optional[str] = Query(None),
+    trend_keyword: Optional[str] = Query(None),
+    posted: Optional[bool] = Query(None),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+):
+    """
+    記事一覧取得（セッション別）
+
+    limit/after_idでページング、fields（カンマ区切り、例: "id,title,posted"）で返すフィールドを絞り込み、
+    theme/trend_keyword/postedで絞り込み。limit未指定時は全件を返す。
+    """
     session_id = validate_session(x_session_id)
-    articles = get_user_articles(session_id)
-    return {"articles": articles}
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        articles, next_after_id = list_user_articles(
+            session_id,
+            limit=limit,
+            after_id=after_id,
+            fields=field_list,
+            theme=theme,
+            trend_keyword=trend_keyword,
+            posted=posted
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"articles": articles, "next_after_id": next_after_id}
+
+@app.get("/api/articles/search")
+def search_articles(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+):
+    """記事の全文検索（タイトル・本文、関連度順、セッション別）"""
+    session_id = validate_session(x_session_id)
+    results = search_user_articles(session_id, q, limit=limit, offset=offset)
+    return {"results": results, "limit": limit, "offset": offset}
 
 @app.get("/api/articles/{article_id}")
 def get_article(
@@ -507,9 +565,8 @@ async def get_trends(
 ):
     """Xトレンド取得（twittrend.jpから取得、セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
-        data = get_user_data(session_id)
-        settings = data["settings"]
+        session_id = await validate_session_async(x_session_id)
+        settings = await get_user_settings_async(session_id)
         
         agent = TrendAgent(
             openai_api_key=settings.get("openai_api_key"),
@@ -517,7 +574,16 @@ async def get_trends(
         )
         await agent.initialize()
         trends = await agent.get_trends(limit=limit, use_cache=use_cache)
-        return {"trends": trends}
+        cache_info = agent.trend_scraper.get_cache_info()
+        # changed_at・content_hashが前回と同じならトレンドは変わっていない
+        return {
+            "trends": trends,
+            "last_update": cache_info["last_update"],
+            "age_seconds": cache_info["age_seconds"],
+            "from_snapshot": cache_info["from_snapshot"],
+            "changed_at": cache_info["changed_at"],
+            "content_hash": cache_info["content_hash"]
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -529,14 +595,13 @@ async def post_draft(
 ):
     """下書き投稿（自動投稿対応・ブラウザスクレイピング・セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
+        session_id = await validate_session_async(x_session_id)
         # 記事を取得
-        article = get_user_article(session_id, article_id)
+        article = await get_user_article_async(session_id, article_id)
         if not article:
             raise HTTPException(status_code=404, detail="記事が見つかりません")
         
-        data = get_user_data(session_id)
-        settings = data["settings"]
+        settings = await get_user_settings_async(session_id)
         note_id = settings.get("note_id", "").strip()
         note_password = settings.get("note_password", "").strip()
         
@@ -547,17 +612,12 @@ async def post_draft(
                 detail="note.comのID/パスワードが設定されていません。設定画面で入力してください。"
             )
         
-        note_service = NoteService(
-            note_id=note_id,
-            note_password=note_password
-        )
-        
         if scheduled_time:
             # 自動投稿をスケジュール
             async def post_callback(aid: int):
-                art = get_user_article(session_id, aid)
+                art = await get_user_article_async(session_id, aid)
                 if art:
-                    await note_service.post_draft(art["title"], art["content"])
+                    await note_post_executor.post_draft(note_id, note_password, art["title"], art["content"])
             
             auto_post_service.schedule_post(
                 article_id=article_id,
@@ -569,13 +629,16 @@ async def post_draft(
             # 即座に投稿（ブラウザスクレイピングで自動実行、リトライ機能付き）
             max_retries = 3
             retry_delay = 2  # 秒
+            # 完了した手順を試行間で引き継ぎ、再試行ではエディタを開き直さず途中から再開する
+            checkpoint = DraftCheckpoint()
             
             for attempt in range(max_retries):
                 try:
                     print(f"[下書き投稿] 試行 {attempt + 1}/{max_retries} 開始")
-                    result = await note_service.post_draft(article["title"], article["content"])
+                    # ブラウザが正常ならプールに戻るので、次の試行でもログイン済みのセッションを借りられる
+                    result = await note_post_executor.post_draft(note_id, note_password, article["title"], article["content"], checkpoint=checkpoint)
                     # 投稿済みフラグを設定
-                    update_user_article(session_id, article_id, {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+                    await update_user_article_async(session_id, article_id, {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
                     print(f"[下書き投稿] 成功: 試行 {attempt + 1}/{max_retries}")
                     return {
                         "success": True, 
@@ -591,15 +654,6 @@ async def post_draft(
                     if attempt < max_retries - 1:
                         print(f"[下書き投稿] {retry_delay}秒後にリトライします...")
                         await asyncio.sleep(retry_delay)
-                        # ブラウザを確実に閉じる
-                        try:
-                            await note_service.close()
-                            print("[下書き投稿] ブラウザを閉じました")
-                        except Exception as close_error:
-                            print(f"[下書き投稿] ブラウザクローズエラー（無視）: {str(close_error)}")
-                        # 新しいNoteServiceインスタンスを作成
-                        note_service = NoteService(note_id=note_id, note_password=note_password)
-                        print("[下書き投稿] 新しいNoteServiceインスタンスを作成しました")
                     else:
                         # 最後の試行でも失敗した場合はエラーを再発生
                         print(f"[下書き投稿] 全試行が失敗しました")
@@ -615,6 +669,87 @@ async def post_draft(
         # エラーメッセージを簡潔にして、詳細はログに記録
         raise HTTPException(status_code=500, detail=f"下書き投稿エラー: {error_detail}")
 
+@app.post("/api/articles/post-batch")
+async def post_drafts_batch(
+    request: PostBatchRequest,
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID")
+):
+    """複数記事の一括下書き投稿（1回のログインで順に投稿・セッション別）"""
+    session_id = await validate_session_async(x_session_id)
+    if not request.article_ids:
+        raise HTTPException(status_code=400, detail="記事IDを指定してください")
+
+    settings = await get_user_settings_async(session_id)
+    note_id = settings.get("note_id", "").strip()
+    note_password = settings.get("note_password", "").strip()
+    if not note_id or not note_password:
+        raise HTTPException(
+            status_code=400,
+            detail="note.comのID/パスワードが設定されていません。設定画面で入力してください。"
+        )
+
+    articles = []
+    missing = []
+    for article_id in request.article_ids:
+        article = await get_user_article_async(session_id, article_id)
+        if article:
+            articles.append(article)
+        else:
+            missing.append({"article_id": article_id, "success": False, "error": "記事が見つかりません"})
+
+    async def run_batch(on_result) -> List[dict]:
+        results = list(missing)
+        for item in missing:
+            await on_result(item)
+
+        async def record(item: dict):
+            if item["success"]:
+                await update_user_article_async(session_id, item["article_id"], {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+            results.append(item)
+            await on_result(item)
+
+        if articles:
+            await note_post_executor.post_drafts(note_id, note_password, articles, on_result=record)
+        return results
+
+    def summarize(results: List[dict]) -> dict:
+        succeeded = sum(1 for item in results if item["success"])
+        return {"total": len(results), "succeeded": succeeded, "failed": len(results) - succeeded}
+
+    if not request.stream:
+        async def ignore(item: dict):
+            pass
+        try:
+            results = await run_batch(ignore)
+        except Exception as e:
+            print(f"[一括下書き投稿エラー] {str(e)}")
+            raise HTTPException(status_code=500, detail=f"一括下書き投稿エラー: {str(e)}")
+        return {"results": results, **summarize(results)}
+
+    async def stream_results():
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def run():
+            try:
+                return await run_batch(queue.put)
+            finally:
+                await queue.put(None)
+
+        # クライアントが切断しても投稿は最後まで続ける（完了までタスクの参照を保持）
+        task = asyncio.create_task(run())
+        batch_tasks.add(task)
+        task.add_done_callback(batch_tasks.discard)
+        while (item := await queue.get()) is not None:
+            yield json.dumps({"type": "result", **item}, ensure_ascii=False) + "\n"
+        try:
+            results = await task
+            yield json.dumps({"type": "summary", **summarize(results)}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"[一括下書き投稿エラー] {str(e)}")
+            yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.delete("/api/articles/{article_id}")
 def delete_article(
     article_id: int,
@@ -653,7 +788,7 @@ async def add_schedule(
 ):
     """スケジュールを追加"""
     try:
-        session_id = validate_session(x_session_id)
+        session_id = await validate_session_async(x_session_id)
         schedule_id = str(uuid.uuid4())
         
         # スケジュール情報を作成
@@ -671,11 +806,10 @@ async def add_schedule(
         }
         
         # データベースに保存
-        add_user_schedule(session_id, schedule_info)
+        await add_user_schedule_async(session_id, schedule_info)
         
         # AutoPostServiceに登録
-        data = get_user_data(session_id)
-        settings = data["settings"]
+        settings = await get_user_settings_async(session_id)
         note_id = settings.get("note_id", "").strip()
         note_password = settings.get("note_password", "").strip()
         
@@ -689,7 +823,7 @@ async def add_schedule(
             """記事生成→投稿のコールバック"""
             try:
                 # 記事を生成
-                prompt_settings = data["prompt_settings"]
+                prompt_settings = await get_user_prompt_settings_async(session_id)
                 if request.trend_keyword:
                     # トレンド記事生成
                     agent = TrendAgent(
@@ -720,20 +854,17 @@ async def add_schedule(
                     )
                 
                 # 記事を保存
-                articles = get_user_articles(session_id)
                 article = {
-                    "id": len(articles) + 1,
                     "title": result["title"],
                     "content": result["content"],
                     "theme": request.theme,
                     "trend_keyword": request.trend_keyword
                 }
-                add_user_article(session_id, article)
+                await add_user_article_async(session_id, article)
                 
                 # 投稿
-                note_service = NoteService(note_id=note_id, note_password=note_password)
-                await note_service.post_draft(article["title"], article["content"])
-                update_user_article(session_id, article["id"], {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+                await note_post_executor.post_draft(note_id, note_password, article["title"], article["content"])
+                await update_user_article_async(session_id, article["id"], {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
             except Exception as e:
                 print(f"[スケジュール実行エラー] {str(e)}")
         
@@ -741,11 +872,10 @@ async def add_schedule(
         if request.article_id:
             # 既存記事を投稿
             async def post_callback():
-                note_service = NoteService(note_id=note_id, note_password=note_password)
-                article = get_user_article(session_id, request.article_id)
+                article = await get_user_article_async(session_id, request.article_id)
                 if article:
-                    await note_service.post_draft(article["title"], article["content"])
-                    update_user_article(session_id, request.article_id, {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+                    await note_post_executor.post_draft(note_id, note_password, article["title"], article["content"])
+                    await update_user_article_async(session_id, request.article_id, {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
             callback = post_callback
         else:
             # 新規生成→投稿
@@ -775,8 +905,7 @@ def delete_schedule(
     """スケジュールを削除"""
     try:
         session_id = validate_session(x_session_id)
-        schedules = get_user_schedules(session_id)
-        schedule = next((s for s in schedules if s.get("schedule_id") == schedule_id), None)
+        schedule = get_user_schedule(session_id, schedule_id)
         if not schedule:
             raise HTTPException(status_code=404, detail="スケジュールが見つかりません")
         
@@ -800,14 +929,13 @@ async def generate_x_post(
 ):
     """X投稿用本文生成（セッション別）"""
     try:
-        session_id = validate_session(x_session_id)
+        session_id = await validate_session_async(x_session_id)
         # 記事を取得
-        article = get_user_article(session_id, article_id)
+        article = await get_user_article_async(session_id, article_id)
         if not article:
             raise HTTPException(status_code=404, detail="記事が見つかりません")
         
-        data = get_user_data(session_id)
-        settings = data["settings"]
+        settings = await get_user_settings_async(session_id)
         
         # APIキーの取得と検証
         openai_api_key = settings.get("openai_api_key", "").strip() if llm_provider == "openai" else None
@@ -846,105 +974,95 @@ async def startup_event():
     global_trend_scraper.start_background_update(interval_minutes=30)
     print("[サーバー起動] バックグラウンドトレンド更新を開始しました（30分間隔）")
     
-    # スケジューラーを開始
+    # スケジューラーを開始（asyncコールバックはメインループで実行し、ブラウザプールを共有する）
+    auto_post_service.set_event_loop(asyncio.get_running_loop())
     auto_post_service.start()
     print("[サーバー起動] 自動投稿スケジューラーを開始しました")
     
     # 既存のスケジュールを再登録（サーバー再起動時）
     try:
-        # すべてのセッションのスケジュールを取得して再登録
-        conn = sqlite3.connect('user_data.db')
-        cursor = conn.cursor()
-        cursor.execute("SELECT session_id, data FROM user_data")
-        rows = cursor.fetchall()
-        conn.close()
+        # すべてのセッションの有効なスケジュールを取得して再登録
+        active_schedules = await get_active_schedules_async()
         
         schedule_count = 0
-        for row in rows:
-            session_id, data_json = row
-            import json
-            data = json.loads(data_json)
-            schedules = data.get("schedules", [])
-            
-            for schedule_info in schedules:
-                if schedule_info.get("status") == "active":
-                    # スケジュールを再登録
-                    try:
-                        settings = data.get("settings", {})
-                        note_id = settings.get("note_id", "").strip()
-                        note_password = settings.get("note_password", "").strip()
-                        
-                        if note_id and note_password:
-                            # コールバック関数を作成（クロージャを正しく作成）
-                            def create_callback(sid, sch, nid, npwd):
-                                async def generate_and_post_callback():
-                                    try:
-                                        from agents.trend_agent import TrendAgent
-                                        from agents.theme_agent import ThemeAgent
-                                        settings = get_user_data(sid)["settings"]
-                                        agent = TrendAgent(
-                                            openai_api_key=settings.get("openai_api_key"),
-                                            gemini_api_key=settings.get("gemini_api_key")
+        settings_by_session = {}
+        for session_id, schedule_info in active_schedules:
+            if schedule_info.get("status") == "active":
+                # スケジュールを再登録
+                try:
+                    if session_id not in settings_by_session:
+                        settings_by_session[session_id] = await get_user_settings_async(session_id)
+                    settings = settings_by_session[session_id]
+                    note_id = settings.get("note_id", "").strip()
+                    note_password = settings.get("note_password", "").strip()
+                    
+                    if note_id and note_password:
+                        # コールバック関数を作成（クロージャを正しく作成）
+                        def create_callback(sid, sch, nid, npwd):
+                            async def generate_and_post_callback():
+                                try:
+                                    from agents.trend_agent import TrendAgent
+                                    from agents.theme_agent import ThemeAgent
+                                    settings = await get_user_settings_async(sid)
+                                    agent = TrendAgent(
+                                        openai_api_key=settings.get("openai_api_key"),
+                                        gemini_api_key=settings.get("gemini_api_key")
+                                    )
+                                    
+                                    if sch.get("trend_keyword") and sch.get("theme"):
+                                        result = await agent.generate_article_from_trend(
+                                            trend_keyword=sch["trend_keyword"],
+                                            theme=sch["theme"],
+                                            provider=sch.get("llm_provider", "openai")
                                         )
                                         
-                                        if sch.get("trend_keyword") and sch.get("theme"):
-                                            result = await agent.generate_article_from_trend(
-                                                trend_keyword=sch["trend_keyword"],
-                                                theme=sch["theme"],
-                                                provider=sch.get("llm_provider", "openai")
-                                            )
-                                            
-                                            articles = get_user_articles(sid)
-                                            article = {
-                                                "id": len(articles) + 1,
-                                                "title": result["title"],
-                                                "content": result["content"],
-                                                "theme": sch["theme"],
-                                                "trend_keyword": sch["trend_keyword"]
-                                            }
-                                            add_user_article(sid, article)
-                                            
-                                            note_service = NoteService(note_id=nid, note_password=npwd)
-                                            await note_service.post_draft(article["title"], article["content"])
-                                            update_user_article(sid, article["id"], {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
-                                    except Exception as e:
-                                        print(f"[スケジュール実行エラー] {str(e)}")
-                                        import traceback
-                                        print(traceback.format_exc())
-                                return generate_and_post_callback
-                            
-                            # 既存記事の投稿コールバックも作成
-                            def create_post_callback(sid, sch, nid, npwd):
-                                async def post_callback():
-                                    try:
-                                        article = get_user_article(sid, sch.get("article_id", 0))
-                                        if article:
-                                            note_service = NoteService(note_id=nid, note_password=npwd)
-                                            await note_service.post_draft(article["title"], article["content"])
-                                            update_user_article(sid, sch.get("article_id", 0), {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
-                                    except Exception as e:
-                                        print(f"[スケジュール実行エラー] {str(e)}")
-                                        import traceback
-                                        print(traceback.format_exc())
-                                return post_callback
-                            
-                            # コールバック関数を決定
-                            if schedule_info.get("article_id"):
-                                callback = create_post_callback(session_id, schedule_info, note_id, note_password)
-                            else:
-                                callback = create_callback(session_id, schedule_info, note_id, note_password)
-                            
-                            auto_post_service.add_schedule(
-                                schedule_id=schedule_info["schedule_id"],
-                                article_id=schedule_info.get("article_id", 0),
-                                schedule_type=schedule_info["schedule_type"],
-                                day_of_week=schedule_info.get("day_of_week"),
-                                time_str=schedule_info["time"],
-                                post_callback=callback
-                            )
-                            schedule_count += 1
-                    except Exception as e:
-                        print(f"[スケジュール再登録エラー] {str(e)}")
+                                        article = {
+                                            "title": result["title"],
+                                            "content": result["content"],
+                                            "theme": sch["theme"],
+                                            "trend_keyword": sch["trend_keyword"]
+                                        }
+                                        await add_user_article_async(sid, article)
+                                        
+                                        await note_post_executor.post_draft(nid, npwd, article["title"], article["content"])
+                                        await update_user_article_async(sid, article["id"], {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+                                except Exception as e:
+                                    print(f"[スケジュール実行エラー] {str(e)}")
+                                    import traceback
+                                    print(traceback.format_exc())
+                            return generate_and_post_callback
+                        
+                        # 既存記事の投稿コールバックも作成
+                        def create_post_callback(sid, sch, nid, npwd):
+                            async def post_callback():
+                                try:
+                                    article = await get_user_article_async(sid, sch.get("article_id", 0))
+                                    if article:
+                                        await note_post_executor.post_draft(nid, npwd, article["title"], article["content"])
+                                        await update_user_article_async(sid, sch.get("article_id", 0), {"posted": True, "posted_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+                                except Exception as e:
+                                    print(f"[スケジュール実行エラー] {str(e)}")
+                                    import traceback
+                                    print(traceback.format_exc())
+                            return post_callback
+                        
+                        # コールバック関数を決定
+                        if schedule_info.get("article_id"):
+                            callback = create_post_callback(session_id, schedule_info, note_id, note_password)
+                        else:
+                            callback = create_callback(session_id, schedule_info, note_id, note_password)
+                        
+                        auto_post_service.add_schedule(
+                            schedule_id=schedule_info["schedule_id"],
+                            article_id=schedule_info.get("article_id", 0),
+                            schedule_type=schedule_info["schedule_type"],
+                            day_of_week=schedule_info.get("day_of_week"),
+                            time_str=schedule_info["time"],
+                            post_callback=callback
+                        )
+                        schedule_count += 1
+                except Exception as e:
+                    print(f"[スケジュール再登録エラー] {str(e)}")
         
         if schedule_count > 0:
             print(f"[サーバー起動] {schedule_count}件のスケジュールを再登録しました")
@@ -955,7 +1073,12 @@ async def startup_event():
 async def shutdown_event():
     """サーバー停止時にバックグラウンドタスクを停止"""
     global_trend_scraper.stop_background_update()
+    await global_trend_scraper.close()
     print("[サーバー停止] バックグラウンドトレンド更新を停止しました")
+    await note_session_pool.close_all()
+    print("[サーバー停止] ブラウザプールを閉じました")
+    close_db()
+    print("[サーバー停止] データベース接続を閉じました")
 
 if __name__ == "__main__":
     import uvicorn
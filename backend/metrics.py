@@ -0,0 +1,151 @@
+"""
+処理時間の計測（スパン）と手順ごとのヒストグラム集計
+
+    with span("login", run_id=run_id):
+        ...
+        set_span_attribute("selector", selector)
+
+スパンの終了時に所要時間をヒストグラムに加え、直近のスパンを構造化データとして保持する。
+NOTE_SPAN_LOG を有効にすると、スパンごとにJSON行を出力する。
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+import json
+import os
+import threading
+import time
+
+# ヒストグラムのバケット境界（ミリ秒）
+BUCKET_BOUNDS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, 120000)
+
+
+class Histogram:
+    """固定バケットのヒストグラム（分位数はバケット内の線形補間で推定）"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float, ok: bool = True):
+        index = len(self.bounds)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if not ok:
+            self.errors += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count == 0:
+                continue
+            if seen + bucket_count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else self.max
+                lower = max(lower, self.min)
+                upper = min(upper, self.max)
+                fraction = (rank - seen) / bucket_count
+                return round(lower + (upper - lower) * fraction, 1)
+            seen += bucket_count
+        return self.max
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.total / self.count, 1) if self.count else None,
+            "min_ms": round(self.min, 1) if self.min is not None else None,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "p99_ms": self.quantile(0.99),
+            "max_ms": round(self.max, 1) if self.max is not None else None,
+            "buckets": {
+                (f"le_{bound}" if i < len(self.bounds) else "inf"): count
+                for i, (bound, count) in enumerate(zip(list(self.bounds) + [None], self.counts))
+            }
+        }
+
+
+class MetricsRegistry:
+    """手順名ごとのヒストグラムと直近のスパン（スレッドセーフ）"""
+
+    def __init__(self, recent_size: int = 200):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._recent: deque = deque(maxlen=recent_size)
+        self.log_spans = os.getenv("NOTE_SPAN_LOG", "false").strip().lower() in ("1", "true", "yes", "on")
+
+    def record(self, record: Dict[str, Any]):
+        """終了したスパンを記録"""
+        with self._lock:
+            histogram = self._histograms.get(record["stage"])
+            if histogram is None:
+                histogram = self._histograms[record["stage"]] = Histogram()
+            histogram.observe(record["duration_ms"], ok=record["ok"])
+            self._recent.append(record)
+        if self.log_spans:
+            print(f"[計測] {json.dumps(record, ensure_ascii=False)}")
+
+    def snapshot(self, recent: int = 50) -> Dict[str, Any]:
+        """手順ごとの集計と直近のスパンを取得"""
+        with self._lock:
+            return {
+                "stages": {stage: h.summary() for stage, h in sorted(self._histograms.items())},
+                "recent_spans": list(self._recent)[-recent:] if recent > 0 else []
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._recent.clear()
+
+
+registry = MetricsRegistry()
+
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_span", default=None)
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[Dict[str, Any]]:
+    """処理時間を計測するスパン（例外で抜けた場合はok=Falseとして記録し、例外はそのまま送出）"""
+    record: Dict[str, Any] = {"stage": stage, **attributes}
+    token = _current_span.set(record)
+    started = time.perf_counter()
+    record["ok"] = True
+    try:
+        yield record
+    except BaseException:
+        record["ok"] = False
+        raise
+    finally:
+        _current_span.reset(token)
+        record["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        record["ended_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        registry.record(record)
+
+
+def set_span_attribute(key: str, value: Any):
+    """実行中のスパンに属性（使用したセレクターなど）を追加"""
+    record = _current_span.get()
+    if record is not None:
+        record[key] = value
+
+
+def get_metrics(recent: int = 50) -> Dict[str, Any]:
+    return registry.snapshot(recent=recent)
@@ -14,6 +14,15 @@ class AutoPostService:
         self.callbacks = {}  # スケジュールID -> コールバック関数のマッピング
         self.is_running = False
         self.scheduler_thread = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # async コールバックを実行するイベントループ
+    
+    def set_event_loop(self, loop: asyncio.AbstractEventLoop):
+        """
+        asyncコールバックの実行先イベントループを設定（サーバーのメインループ）
+        
+        設定しない場合は実行ごとに新しいイベントループを作成する
+        """
+        self.loop = loop
     
     def add_schedule(
         self,
@@ -158,7 +167,12 @@ class AutoPostService:
             print(f"[スケジュール実行] スケジュールID {schedule_id} を実行します")
             if post_callback:
                 # コールバックがasync関数かどうかを確認
-                if asyncio.iscoroutinefunction(post_callback):
+                if asyncio.iscoroutinefunction(post_callback) and self.loop and self.loop.is_running():
+                    # メインループで実行して完了を待つ（ブラウザプールなどループに紐づく資源を共有するため）
+                    future = asyncio.run_coroutine_threadsafe(post_callback(), self.loop)
+                    future.result()
+                    print(f"[スケジュール実行] スケジュールID {schedule_id} の実行が完了しました")
+                elif asyncio.iscoroutinefunction(post_callback):
                     # 新しいイベントループを作成して実行
                     loop = asyncio.new_event_loop()
                     asyncio.set_event_loop(loop)
@@ -0,0 +1,128 @@
+"""
+ブラウザ自動操作の診断用スクリーンショット
+
+モード（NOTE_DIAGNOSTICS）:
+    off: 撮影しない
+    on-error: エラー時のみ撮影（既定）
+    always: 各手順で撮影
+表示範囲のみをJPEGで撮影し、ファイル書き込みは別スレッドで行う。
+保存先は実行IDごとにファイル名を付け、合計サイズが上限を超えたら古いものから削除する。
+"""
+from typing import Optional
+import asyncio
+import os
+import re
+import threading
+import time
+import uuid
+
+DIAGNOSTICS_MODES = ("off", "on-error", "always")
+
+
+def new_run_id() -> str:
+    """実行ID（日時 + ランダム文字列）を発行"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+class Diagnostics:
+    def __init__(
+        self,
+        mode: str = "on-error",
+        directory: str = "artifacts",
+        max_bytes: int = 50 * 1024 * 1024,
+        jpeg_quality: int = 60,
+        timeout_ms: int = 3000
+    ):
+        """
+        Args:
+            mode: off / on-error / always
+            directory: 保存先ディレクトリ
+            max_bytes: 保存先の合計サイズの上限（超えたら古いファイルから削除）
+            jpeg_quality: JPEGの画質（0〜100）
+            timeout_ms: 撮影のタイムアウト
+        """
+        if mode not in DIAGNOSTICS_MODES:
+            print(f"[診断] 不明なモード {mode} のため on-error を使用します")
+            mode = "on-error"
+        self.mode = mode
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self.timeout_ms = timeout_ms
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Diagnostics":
+        """環境変数（NOTE_DIAGNOSTICS, NOTE_ARTIFACTS_DIR, NOTE_ARTIFACTS_MAX_MB, NOTE_SCREENSHOT_QUALITY）から作成"""
+        return cls(
+            mode=os.getenv("NOTE_DIAGNOSTICS", "on-error").strip().lower(),
+            directory=os.getenv("NOTE_ARTIFACTS_DIR", "artifacts"),
+            max_bytes=int(float(os.getenv("NOTE_ARTIFACTS_MAX_MB", "50")) * 1024 * 1024),
+            jpeg_quality=int(os.getenv("NOTE_SCREENSHOT_QUALITY", "60"))
+        )
+
+    def wants(self, on_error: bool) -> bool:
+        """このモードで撮影するか"""
+        if self.mode == "always":
+            return True
+        return self.mode == "on-error" and on_error
+
+    async def capture(self, page, run_id: str, label: str) -> Optional[str]:
+        """
+        表示範囲をJPEGで撮影して保存（失敗しても例外は出さない）
+
+        Returns:
+            保存したファイルのパス（撮影できなかった場合はNone）
+        """
+        try:
+            data = await page.screenshot(type="jpeg", quality=self.jpeg_quality, full_page=False, timeout=self.timeout_ms)
+        except Exception as e:
+            print(f"[診断] {label}のスクリーンショット取得に失敗しましたが処理を続行します: {str(e)}")
+            return None
+
+        safe_label = re.sub(r"[^0-9A-Za-z_-]", "_", label)
+        path = os.path.join(self.directory, f"{run_id}_{int(time.time() * 1000)}_{safe_label}.jpg")
+        try:
+            await asyncio.to_thread(self._write, path, data)
+            print(f"[診断] スクリーンショットを保存しました: {path}")
+            return path
+        except Exception as e:
+            print(f"[診断] スクリーンショットの保存に失敗しました: {str(e)}")
+            return None
+
+    def _write(self, path: str, data: bytes):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            self._rotate()
+
+    def _rotate(self):
+        """合計サイズが上限を超えていれば古いファイルから削除"""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_default_diagnostics: Optional[Diagnostics] = None
+
+
+def get_default_diagnostics() -> Diagnostics:
+    """環境変数の設定で共有インスタンスを取得"""
+    global _default_diagnostics
+    if _default_diagnostics is None:
+        _default_diagnostics = Diagnostics.from_env()
+    return _default_diagnostics
@@ -0,0 +1,198 @@
+"""
+note.comへの下書き投稿の実行キュー
+アカウントが異なる投稿は並行して実行し、同じアカウントの投稿は受け付けた順に1件ずつ実行する
+同時に動かすブラウザ（Chromium）の数はメモリ量に合わせて全体で制限する
+"""
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+import asyncio
+import os
+import sys
+
+from services.note_service import DraftCheckpoint, NoteService
+from services.note_session_pool import NoteSessionPool
+
+T = TypeVar("T")
+
+# Chromium 1つあたりの想定メモリ使用量と、アプリ本体用に残しておくメモリ（MB）
+DEFAULT_BROWSER_MEMORY_MB = 350
+RESERVED_MEMORY_MB = 512
+
+
+def _total_memory_mb() -> Optional[int]:
+    """搭載メモリ量（MB、取得できない場合はNone）"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            if not ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return None
+            return status.ullTotalPhys // (1024 * 1024)
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def default_max_browsers() -> int:
+    """
+    同時に動かすブラウザ数の上限
+
+    NOTE_MAX_BROWSERS が指定されていればその値、なければ
+    (搭載メモリ - 予備) / NOTE_BROWSER_MEMORY_MB をCPUコア数で頭打ちにした値（最低1）
+    """
+    configured = os.getenv("NOTE_MAX_BROWSERS")
+    if configured:
+        return max(1, int(configured))
+    cpu_count = os.cpu_count() or 1
+    memory_mb = _total_memory_mb()
+    if memory_mb is None:
+        return cpu_count
+    per_browser = int(os.getenv("NOTE_BROWSER_MEMORY_MB", str(DEFAULT_BROWSER_MEMORY_MB)))
+    return max(1, min(cpu_count, (memory_mb - RESERVED_MEMORY_MB) // max(1, per_browser)))
+
+
+class NotePostExecutor:
+    """アカウントごとに順序を保ち、ブラウザの同時実行数を制限して投稿を実行する"""
+
+    def __init__(self, pool: NoteSessionPool, max_browsers: Optional[int] = None):
+        """
+        Args:
+            pool: ログイン済みセッションのプール（待機中のブラウザも上限に含めるよう設定する）
+            max_browsers: 同時に動かすブラウザ数の上限（省略時は default_max_browsers()）
+        """
+        self.pool = pool
+        self.max_browsers = max_browsers or default_max_browsers()
+        self.pool.max_browsers = self.max_browsers
+        self._slots = asyncio.Semaphore(self.max_browsers)
+        self._account_locks: Dict[str, asyncio.Lock] = {}
+        self._account_pending: Dict[str, int] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiting_for_browser = 0
+        self._active = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0}
+        print(f"[投稿キュー] ブラウザの同時実行数の上限: {self.max_browsers}")
+
+    async def run(self, note_id: str, note_password: str, job: Callable[[NoteService], Awaitable[T]]) -> T:
+        """
+        アカウントの順番とブラウザの空きを待ってから、ログイン済みNoteServiceでjobを実行
+
+        Args:
+            note_id: note.comのID
+            note_password: note.comのパスワード
+            job: 借りたNoteServiceを受け取って投稿する処理
+
+        Returns:
+            jobの戻り値
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        if loop is not self._loop:
+            # 別のイベントループからの呼び出しではキューを使わない（プールも使い捨てのセッションを渡す）
+            async with self.pool.lease(note_id, note_password) as note_service:
+                return await job(note_service)
+
+        self.stats["submitted"] += 1
+        self._account_pending[note_id] = self._account_pending.get(note_id, 0) + 1
+        lock = self._account_locks.setdefault(note_id, asyncio.Lock())
+        try:
+            # asyncio.Lockは待った順に獲得されるので、同じアカウントの投稿は受け付けた順に実行される
+            async with lock:
+                self._waiting_for_browser += 1
+                try:
+                    await self._slots.acquire()
+                finally:
+                    self._waiting_for_browser -= 1
+                self._active += 1
+                try:
+                    async with self.pool.lease(note_id, note_password) as note_service:
+                        result = await job(note_service)
+                    self.stats["completed"] += 1
+                    return result
+                except Exception:
+                    self.stats["failed"] += 1
+                    raise
+                finally:
+                    self._active -= 1
+                    self._slots.release()
+        finally:
+            self._account_pending[note_id] -= 1
+            if self._account_pending[note_id] == 0:
+                del self._account_pending[note_id]
+                del self._account_locks[note_id]
+
+    async def post_draft(
+        self,
+        note_id: str,
+        note_password: str,
+        title: str,
+        content: str,
+        checkpoint: Optional[DraftCheckpoint] = None
+    ) -> Dict:
+        """1件の下書きを投稿"""
+        return await self.run(
+            note_id, note_password,
+            lambda note_service: note_service.post_draft(title, content, checkpoint=checkpoint)
+        )
+
+    async def post_drafts(
+        self,
+        note_id: str,
+        note_password: str,
+        articles: List[Dict],
+        on_result: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> List[Dict]:
+        """
+        同じアカウントの複数記事を1つのブラウザで順に投稿
+
+        ブラウザの起動やログインに失敗した場合も例外にせず、
+        結果を返していない記事それぞれを失敗として返す（on_resultにも渡す）。
+        """
+        results: List[Dict] = []
+
+        async def record(result: Dict):
+            results.append(result)
+            if on_result is not None:
+                await on_result(result)
+
+        try:
+            await self.run(
+                note_id, note_password,
+                lambda note_service: note_service.post_drafts(articles, on_result=record)
+            )
+        except Exception as e:
+            print(f"[投稿キュー] 一括投稿を実行できませんでした: {str(e)}")
+            for article in articles[len(results):]:
+                await record({"article_id": article.get("id"), "success": False, "error": str(e)})
+        return results
+
+    def get_info(self) -> Dict:
+        """キューの状態を取得（アカウントIDは含めない）"""
+        pending = sum(self._account_pending.values())
+        return {
+            "max_browsers": self.max_browsers,
+            "active_browsers": self._active,
+            "queue_depth": pending - self._active,
+            "waiting_for_browser": self._waiting_for_browser,
+            "accounts_pending": len(self._account_pending),
+            **self.stats
+        }
+
+
+def create_executor_from_env(pool: NoteSessionPool) -> NotePostExecutor:
+    """環境変数の設定（NOTE_MAX_BROWSERS, NOTE_BROWSER_MEMORY_MB）で実行キューを作成"""
+    return NotePostExecutor(pool, max_browsers=default_max_browsers())
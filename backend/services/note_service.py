@@ -1,83 +1,332 @@
 """
 note.comへの下書き投稿サービス（ブラウザスクレイピング）
-Windows環境ではsync_playwrightを使用してasyncio問題を回避
+固定時間のsleepではなく、要素の表示・URLの変化・保存APIのレスポンスを待って次の操作に進む
+Windows環境ではProactorイベントループを動かす専用スレッドでPlaywrightを実行してasyncio問題を回避
 """
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
 import asyncio
-import time
+import hashlib
+import math
+import os
+import re
 import sys
-from concurrent.futures import ThreadPoolExecutor
-
-# Windows環境ではsync_playwrightを使用
-if sys.platform == 'win32':
-    from playwright.sync_api import (
-        sync_playwright,
-        Browser,
-        Page,
-        BrowserContext,
-        TimeoutError as PlaywrightTimeoutError,
-    )
-    USE_SYNC = True
-else:
-    from playwright.async_api import (
-        async_playwright,
-        Browser,
-        Page,
-        BrowserContext,
-        TimeoutError as PlaywrightTimeoutError,
+import threading
+
+from playwright.async_api import (
+    async_playwright,
+    Browser,
+    Page,
+    BrowserContext,
+    Locator,
+    Response,
+    TimeoutError as PlaywrightTimeoutError,
+)
+
+from services.note_state_store import NoteStateStore, get_default_state_store
+from services.selector_cache import SelectorCache, get_default_selector_cache
+from services.resource_blocker import ResourceBlocker
+from services.diagnostics import Diagnostics, get_default_diagnostics, new_run_id
+from metrics import span, set_span_attribute
+
+# Windows環境ではuvicornのイベントループでサブプロセスを起動できないため、専用スレッドのループを使う
+USE_BROWSER_THREAD = sys.platform == 'win32'
+
+# note.comのURL（ベンチマークではローカルの疑似サーバーを指定する）
+NOTE_BASE_URL = os.getenv("NOTE_BASE_URL", "https://note.com").rstrip('/')
+
+# 下書きのキーからエディタのURLを作るテンプレート（保存後に/notes/newのままだった下書きを開き直すのに使う）
+NOTE_EDITOR_URL_TEMPLATE = os.getenv("NOTE_EDITOR_URL_TEMPLATE", "https://editor.note.com/notes/{key}/edit")
+
+# ログイン済みならユーザー情報を返すAPI（保存したログイン状態が有効かの確認に使う）
+NOTE_CURRENT_USER_URL = f'{NOTE_BASE_URL}/api/v2/current_user'
+
+# ログイン・エディタに不要なリソースはルートインターセプトで読み込まない（NOTE_BLOCK_* で設定）
+resource_blocker = ResourceBlocker.from_env("note", "NOTE")
+
+_browser_loop: Optional[asyncio.AbstractEventLoop] = None
+_browser_loop_lock = threading.Lock()
+
+
+def _get_browser_loop() -> asyncio.AbstractEventLoop:
+    """Playwright専用のイベントループ（初回呼び出し時にスレッドを起動）"""
+    global _browser_loop
+    with _browser_loop_lock:
+        if _browser_loop is None:
+            loop = asyncio.ProactorEventLoop() if sys.platform == 'win32' else asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="playwright-loop", daemon=True).start()
+            _browser_loop = loop
+        return _browser_loop
+
+
+class NoteTimeouts:
+    """待機条件ごとのタイムアウト（ミリ秒）"""
+
+    def __init__(
+        self,
+        navigation: int = 30000,
+        element: int = 10000,
+        login: int = 20000,
+        editor: int = 30000,
+        save: int = 15000,
+        body: int = 5000
+    ):
+        """
+        Args:
+            navigation: ページ遷移（goto・クリック後のURL変化）の待機
+            element: 入力欄・ボタンが表示されるまでの待機
+            login: ログインボタン押下後、ログイン画面から離れるまでの待機
+            editor: エディタのタイトル欄が表示されるまでの待機
+            save: 下書き保存APIのレスポンスを待つ時間
+            body: 本文の挿入後、エディタに反映された文字数が揃うまでの待機
+        """
+        self.navigation = navigation
+        self.element = element
+        self.login = login
+        self.editor = editor
+        self.save = save
+        self.body = body
+
+    @classmethod
+    def from_env(cls) -> "NoteTimeouts":
+        """環境変数 NOTE_TIMEOUT_<名前>_MS で上書きした設定を作成"""
+        defaults = cls()
+        return cls(**{
+            name: int(os.getenv(f"NOTE_TIMEOUT_{name.upper()}_MS", str(getattr(defaults, name))))
+            for name in ("navigation", "element", "login", "editor", "save", "body")
+        })
+
+
+def _is_draft_save_response(response: Response) -> bool:
+    """エディタが下書きを保存するAPIへのレスポンスか"""
+    url = response.url.lower()
+    return (
+        response.request.method in ('POST', 'PUT')
+        and '/api/' in url
+        and ('draft' in url or 'text_notes' in url)
     )
-    USE_SYNC = False
+
+
+# 候補のうち最初に表示されている要素のセレクター番号（1始まり、なければ0）を返す
+# :has-text("...") はテキストを含む要素として扱い、ブラウザが解釈できないセレクターは読み飛ばす
+_RESOLVE_SELECTORS_JS = """(selectors) => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    for (let i = 0; i < selectors.length; i++) {
+        let css = selectors[i];
+        let text = null;
+        const match = css.match(/^(.*):has-text\\("(.*)"\\)$/);
+        if (match) {
+            css = match[1];
+            text = match[2].toLowerCase();
+        }
+        let elements;
+        try {
+            elements = document.querySelectorAll(css);
+        } catch (e) {
+            continue;
+        }
+        for (const el of elements) {
+            if (text !== null && !(el.textContent || '').toLowerCase().includes(text)) continue;
+            if (isVisible(el)) return i + 1;
+        }
+    }
+    return 0;
+}"""
+
+
+# 本文を1回の貼り付けイベントで挿入する（エディタが処理した場合はtrue）
+# 1行を1段落とし、空行は空の段落にする
+_PASTE_BODY_JS = """(element, text) => {
+    const escape = (s) => s.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+    const html = text.split('\\n').map((line) => line ? `<p>${escape(line)}</p>` : '<p><br></p>').join('');
+    const data = new DataTransfer();
+    data.setData('text/plain', text);
+    data.setData('text/html', html);
+    element.focus();
+    const event = new ClipboardEvent('paste', { clipboardData: data, bubbles: true, cancelable: true });
+    element.dispatchEvent(event);
+    return event.defaultPrevented;
+}"""
+
+# 本文の段落をまとめて1回のDOM操作で置き換える
+_REPLACE_BODY_JS = """(element, text) => {
+    const fragment = document.createDocumentFragment();
+    for (const line of text.split('\\n')) {
+        const paragraph = document.createElement('p');
+        if (line) {
+            paragraph.textContent = line;
+        } else {
+            paragraph.appendChild(document.createElement('br'));
+        }
+        fragment.appendChild(paragraph);
+    }
+    element.focus();
+    element.replaceChildren(fragment);
+    element.dispatchEvent(new InputEvent('input', { bubbles: true, inputType: 'insertFromPaste' }));
+}"""
+
+# 入力欄の文字列（textarea・inputはvalue、それ以外は表示テキスト）
+_READ_TEXT_JS = "element => ('value' in element && element.tagName !== 'DIV') ? element.value : element.innerText"
+
+# 入力欄の文字数（空白を除く）が指定以上になったか（エディタが非同期に反映する貼り付けを待つ）
+_HAS_VISIBLE_CHARS_JS = """([element, minimum]) => {
+    const text = ('value' in element && element.tagName !== 'DIV') ? element.value : element.innerText;
+    return [...(text || '').replace(/\\s/g, '')].length >= minimum;
+}"""
+
+# 入力欄の中身を全選択する（次の挿入方法を試す前に削除するため）
+_SELECT_CONTENTS_JS = """(element) => {
+    element.focus();
+    const range = document.createRange();
+    range.selectNodeContents(element);
+    const selection = window.getSelection();
+    selection.removeAllRanges();
+    selection.addRange(range);
+}"""
+
+# 本文の挿入方法（NOTE_BODY_INSERT で1つに固定できる、autoなら順に試す）
+BODY_INSERT_STRATEGIES = ("paste", "insert_text", "dom")
+
+# 挿入後の文字数（空白を除く）がこの割合以上なら成功とみなす（エディタによる記号の変換を許容）
+BODY_MIN_LENGTH_RATIO = 0.95
+
+
+def _count_visible_chars(text: str) -> int:
+    return sum(1 for char in text if not char.isspace())
+
+
+def _is_editor_url(url: str) -> bool:
+    url = url.lower()
+    return 'editor' in url or '/notes/new' in url
+
+
+# 保存済みの下書きのエディタURL（/notes/<記事キー>/edit）
+_DRAFT_EDITOR_URL_PATTERN = re.compile(r'/notes/n[0-9a-z]+/edit', re.IGNORECASE)
+
+# URL中の下書きのキー（n + 16進数）
+_DRAFT_KEY_PATTERN = re.compile(r'/(n[0-9a-f]{6,})(?:/|$)', re.IGNORECASE)
+
+
+async def _draft_key_of_response(response: Response) -> Optional[str]:
+    """下書き保存のレスポンス（本文のdata.key、なければURL）から下書きのキーを取り出す"""
+    try:
+        data = await response.json()
+        key = data.get("data", {}).get("key") if isinstance(data, dict) else None
+        if isinstance(key, str) and key:
+            return key
+    except Exception:
+        pass
+    match = _DRAFT_KEY_PATTERN.search(response.url.split('?', 1)[0])
+    return match.group(1) if match else None
+
+
+# 下書き投稿の手順（この順に進み、完了した手順は再試行時に繰り返さない）
+DRAFT_STAGES = ("editor_open", "title_filled", "body_filled", "saved")
+
+
+class DraftCheckpoint:
+    """
+    1件の下書き投稿で完了した手順（再試行時に途中から再開するために呼び出し側で保持する）
+
+    エディタのURLは下書きごとに発行されるので、ブラウザを作り直しても同じ下書きを開き直せる。
+    保存まで完了していれば再試行しても保存済みの結果を返し、同じ下書きを二重に作らない。
+    保存を試みた後は（エディタのURLが分からなくても）新しいエディタを開かない。
+    """
+
+    def __init__(self):
+        self.key: Optional[str] = None
+        self.stage: Optional[str] = None
+        self.editor_url: Optional[str] = None
+        self.draft_key: Optional[str] = None
+        self.save_attempted = False
+        self.result: Optional[Dict] = None
+        self.attempts = 0
+
+    @staticmethod
+    def key_for(title: str, content: str) -> str:
+        return hashlib.sha256(f"{title}\0{content}".encode("utf-8")).hexdigest()
+
+    def bind(self, title: str, content: str):
+        """記事を割り当てる（別の記事なら記録をリセット）"""
+        key = self.key_for(title, content)
+        if key != self.key:
+            self.__init__()
+            self.key = key
+        self.attempts += 1
+
+    def reached(self, stage: str) -> bool:
+        return self.stage is not None and DRAFT_STAGES.index(self.stage) >= DRAFT_STAGES.index(stage)
+
+    def advance(self, stage: str):
+        if not self.reached(stage):
+            self.stage = stage
+
+    def record_editor_url(self, url: str):
+        """下書きごとのエディタURL（/notes/<キー>/edit）なら記録する"""
+        if self.editor_url is None and url and _DRAFT_EDITOR_URL_PATTERN.search(url):
+            self.editor_url = url
+
 
 class NoteService:
-    def __init__(self, note_id: str, note_password: str):
+    def __init__(
+        self,
+        note_id: str,
+        note_password: str,
+        state_store: Optional[NoteStateStore] = None,
+        timeouts: Optional[NoteTimeouts] = None,
+        selector_cache: Optional[SelectorCache] = None,
+        resolve_in_page: Optional[bool] = None,
+        diagnostics: Optional[Diagnostics] = None
+    ):
+        """
+        Args:
+            note_id: note.comのID（メールアドレス）
+            note_password: note.comのパスワード
+            state_store: ログイン状態の保存先（省略時は共有ストア）
+            timeouts: 待機条件ごとのタイムアウト（省略時は環境変数の設定）
+            selector_cache: セレクター解決キャッシュ（省略時は共有キャッシュ）
+            resolve_in_page: セレクター候補をページ内の1回の評価で判定するか
+                （省略時は環境変数 NOTE_SELECTOR_RESOLVE_IN_PAGE、既定で有効）
+            diagnostics: 診断用スクリーンショットの設定（省略時は環境変数の設定）
+        """
         self.note_id = note_id
         self.note_password = note_password
+        self.state_store = state_store if state_store is not None else get_default_state_store()
+        self.timeouts = timeouts or NoteTimeouts.from_env()
+        self.selector_cache = selector_cache or get_default_selector_cache()
+        if resolve_in_page is None:
+            resolve_in_page = os.getenv("NOTE_SELECTOR_RESOLVE_IN_PAGE", "true").strip().lower() in ("1", "true", "yes", "on")
+        self.resolve_in_page = resolve_in_page
+        self.diagnostics = diagnostics or get_default_diagnostics()
+        # 診断ファイル名に付ける実行ID（login・post_draftの呼び出しごとに発行）
+        self.run_id = new_run_id()
+        self._capture_tasks = set()
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
         self.playwright = None
-        self.executor = ThreadPoolExecutor(max_workers=1) if USE_SYNC else None
-    
-    async def _init_browser(self, headless: bool = False):
-        """ブラウザを初期化（Windows環境対応）"""
+
+    async def _run(self, coro):
+        """Playwrightの処理を実行（Windows環境では専用スレッドのループで実行して結果を待つ）"""
+        if not USE_BROWSER_THREAD:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _get_browser_loop()))
+
+    async def _init_browser(self, headless: bool = False, storage_state: Optional[Dict] = None):
+        """ブラウザを初期化（storage_stateを指定するとログイン状態を復元）"""
         try:
             if self.browser is None:
-                print(f"[ブラウザ初期化] 開始 (headless={headless}, type={type(headless)}, USE_SYNC={USE_SYNC})")
-                
+                print(f"[ブラウザ初期化] 開始 (headless={headless}, type={type(headless)}, USE_BROWSER_THREAD={USE_BROWSER_THREAD})")
+
                 # headlessが文字列の場合はbooleanに変換
                 if isinstance(headless, str):
                     headless = headless.lower() in ('true', '1', 'yes', 'on')
                     print(f"[ブラウザ初期化] headlessを文字列からbooleanに変換: {headless}")
-                
-                if USE_SYNC:
-                    # Windows環境: sync_playwrightを使用して別スレッドで実行
-                    def init_sync():
-                        p = sync_playwright().start()
-                        browser = p.chromium.launch(
-                            headless=headless,
-                            args=[
-                                '--disable-blink-features=AutomationControlled',
-                                '--disable-dev-shm-usage',
-                                '--no-sandbox'
-                            ]
-                        )
-                        context = browser.new_context(
-                            viewport={'width': 1920, 'height': 1080},
-                            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                            locale='ja-JP',
-                            timezone_id='Asia/Tokyo'
-                        )
-                        page = context.new_page()
-                        page.set_default_timeout(60000)
-                        page.set_default_navigation_timeout(60000)
-                        return p, browser, context, page
-                    
-                    loop = asyncio.get_event_loop()
-                    result = await loop.run_in_executor(self.executor, init_sync)
-                    self.playwright, self.browser, self.context, self.page = result
-                    print("[ブラウザ初期化] sync_playwrightで成功")
-                else:
-                    # 非Windows環境: async_playwrightを使用
+
+                with span("browser_launch", run_id=self.run_id, restored_state=storage_state is not None):
                     self.playwright = await async_playwright().start()
                     self.browser = await self.playwright.chromium.launch(
                         headless=headless,
@@ -91,41 +340,34 @@ class NoteService:
                         viewport={'width': 1920, 'height': 1080},
                         user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                         locale='ja-JP',
-                        timezone_id='Asia/Tokyo'
+                        timezone_id='Asia/Tokyo',
+                        storage_state=storage_state
                     )
+                    await resource_blocker.install(self.context)
                     self.page = await self.context.new_page()
-                    self.page.set_default_timeout(60000)
-                    self.page.set_default_navigation_timeout(60000)
-                    print("[ブラウザ初期化] async_playwrightで成功")
+                    self.page.set_default_timeout(self.timeouts.element)
+                    self.page.set_default_navigation_timeout(self.timeouts.navigation)
+                print("[ブラウザ初期化] async_playwrightで成功")
         except Exception as e:
             import traceback
             print(f"[ブラウザ初期化エラー] {str(e)}")
             print(f"[ブラウザ初期化エラー詳細] {traceback.format_exc()}")
             raise
-    
+
     async def _close_browser(self):
         """ブラウザを閉じる"""
         try:
-            if USE_SYNC:
-                def close_sync():
-                    if self.context:
-                        self.context.close()
-                    if self.browser:
-                        self.browser.close()
-                    if self.playwright:
-                        self.playwright.stop()
-                
-                if self.playwright or self.browser or self.context:
-                    loop = asyncio.get_event_loop()
-                    await loop.run_in_executor(self.executor, close_sync)
-            else:
-                if self.context:
-                    await self.context.close()
-                if self.browser:
-                    await self.browser.close()
-                if self.playwright:
-                    await self.playwright.stop()
-            
+            # 撮影中のスクリーンショットを待ってから閉じる
+            if self._capture_tasks:
+                await asyncio.gather(*self._capture_tasks, return_exceptions=True)
+
+            if self.context:
+                await self.context.close()
+            if self.browser:
+                await self.browser.close()
+            if self.playwright:
+                await self.playwright.stop()
+
             self.context = None
             self.browser = None
             self.playwright = None
@@ -133,40 +375,18 @@ class NoteService:
             print("[ブラウザ] 閉じました")
         except Exception as e:
             print(f"[ブラウザクローズエラー] {str(e)}")
-    
-    async def _goto(self, url: str, *, wait_until: str = 'domcontentloaded', timeout: int = 60000, label: str = '', retries: int = 2):
+
+    async def _goto(self, url: str, *, wait_until: str = 'domcontentloaded', timeout: Optional[int] = None, label: str = '', retries: int = 2):
         """ナビゲーションを安定化させるための内部ヘルパー"""
         if self.page is None:
             raise RuntimeError("ページが初期化されていません")
-        
+
+        # 下書きのエディタURLなどをメトリクスに残さないよう、スパンには手順名だけを記録する
+        span_label = label or "ページ遷移"
         label = label or url
-        
-        if USE_SYNC:
-            def navigate_sync():
-                page = self.page
-                if page is None:
-                    raise RuntimeError("ページが初期化されていません")
-                
-                last_exc = None
-                for attempt in range(1, retries + 1):
-                    try:
-                        page.goto(url, wait_until=wait_until, timeout=timeout)
-                        return True
-                    except PlaywrightTimeoutError as exc:
-                        last_exc = exc
-                        current_url = page.url if page else 'about:blank'
-                        print(f"[ブラウザナビゲーション] {label} への移動でタイムアウト ({attempt}/{retries}) current_url={current_url}")
-                        if current_url and current_url not in ('about:blank', '', url):
-                            return True
-                        if attempt < retries:
-                            time.sleep(3)
-                if last_exc:
-                    raise last_exc
-                return False
-            
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(self.executor, navigate_sync)
-        else:
+        timeout = timeout or self.timeouts.navigation
+
+        with span("navigation", run_id=self.run_id, label=span_label):
             last_exc = None
             for attempt in range(1, retries + 1):
                 try:
@@ -176,1097 +396,758 @@ class NoteService:
                     last_exc = exc
                     current_url = self.page.url if self.page else 'about:blank'
                     print(f"[ブラウザナビゲーション] {label} への移動でタイムアウト ({attempt}/{retries}) current_url={current_url}")
-                    
+
+                    # 別のページに遷移できていれば、読み込みの続きは次の要素待機に任せる
                     if current_url and current_url not in ('about:blank', '', url):
-                        try:
-                            await self.page.wait_for_load_state('domcontentloaded', timeout=15000)
-                        except PlaywrightTimeoutError:
-                            pass
                         return True
-                    
-                    if attempt < retries:
-                        await asyncio.sleep(3)
             if last_exc:
                 raise last_exc
             return False
-    
+
+    async def _wait_for_first(self, scope, selectors: List[str], timeout: int, label: str, step: Optional[str] = None) -> Optional[Locator]:
+        """
+        セレクター候補のいずれかが表示されるまで待ち、候補の優先順で最初に表示されている要素を返す
+
+        Args:
+            scope: PageまたはFrame
+            selectors: セレクター候補（優先順）
+            timeout: 待機時間（ミリ秒）
+            label: ログ用の名前
+            step: セレクターキャッシュの手順名（指定すると前回一致したセレクターから試し、結果を記録）
+
+        Returns:
+            表示された要素（タイムアウトした場合はNone）
+        """
+        if step:
+            selectors = self.selector_cache.order(step, selectors)
+
+        if self.resolve_in_page:
+            selector = await self._resolve_in_page(scope, selectors, timeout)
+        else:
+            selector = await self._resolve_by_probe(scope, selectors, timeout)
+
+        if selector is None:
+            print(f"[待機] {label}が{timeout}ms以内に表示されませんでした")
+            if step:
+                self.selector_cache.record_failure(step)
+            return None
+
+        print(f"[待機] {label}を検出しました (セレクター: {selector})")
+        set_span_attribute("selector", selector)
+        if step:
+            self.selector_cache.record_success(step, selector)
+        return scope.locator(f"{selector} >> visible=true").first
+
+    async def _resolve_in_page(self, scope, selectors: List[str], timeout: int) -> Optional[str]:
+        """ページ内の1回の評価で全候補を判定し、表示されるまで待つ（候補ごとの往復をなくす）"""
+        try:
+            handle = await scope.wait_for_function(_RESOLVE_SELECTORS_JS, arg=selectors, timeout=timeout, polling='raf')
+            return selectors[await handle.json_value() - 1]
+        except PlaywrightTimeoutError:
+            # ページ内で評価できないPlaywright独自のセレクターだけが一致している場合に備えて1回確認
+            return await self._resolve_by_probe(scope, selectors, 0)
+
+    async def _resolve_by_probe(self, scope, selectors: List[str], timeout: int) -> Optional[str]:
+        """いずれかの候補が表示されるまで待ってから、候補を順にlocatorで確認"""
+        if timeout > 0:
+            try:
+                await scope.locator(f"{', '.join(selectors)} >> visible=true").first.wait_for(state='visible', timeout=timeout)
+            except PlaywrightTimeoutError:
+                return None
+
+        for selector in selectors:
+            try:
+                if await scope.locator(f"{selector} >> visible=true").count() > 0:
+                    return selector
+            except Exception as e:
+                print(f"[待機] セレクター {selector} でエラー: {str(e)}")
+                continue
+        return None
+
+    async def _wait_for_url(self, predicate: Callable[[str], bool], timeout: int) -> bool:
+        """URLが条件を満たすまで待機（満たさずにタイムアウトした場合はFalse）"""
+        try:
+            await self.page.wait_for_url(predicate, wait_until='commit', timeout=timeout)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    async def _fill(self, element: Locator, value: str, label: str) -> bool:
+        """要素に値を入力（fillできない要素は値を直接設定してinputイベントを発火）"""
+        try:
+            await element.fill(value, timeout=self.timeouts.element)
+            return True
+        except PlaywrightTimeoutError as e:
+            print(f"[入力] {label}のfillでタイムアウト: {str(e)}")
+        except Exception as e:
+            print(f"[入力] {label}のfillでエラー: {str(e)}")
+
+        try:
+            await element.evaluate(
+                """(element, value) => {
+                    element.focus();
+                    if ('value' in element) {
+                        element.value = value;
+                    } else {
+                        element.innerText = value;
+                    }
+                    element.dispatchEvent(new Event('input', { bubbles: true }));
+                    element.dispatchEvent(new Event('change', { bubbles: true }));
+                }""",
+                value,
+            )
+            return True
+        except Exception as e:
+            print(f"[入力] {label}のevaluate入力でエラー: {str(e)}")
+            return False
+
+    async def _insert_body(self, element: Locator, content: str) -> str:
+        """
+        長い本文を一括で挿入し、挿入後の文字数を確認する（キー入力しないので本文の長さによらず一定時間）
+
+        Returns:
+            使用した挿入方法
+        """
+        content = content.replace('\r\n', '\n')
+        expected = _count_visible_chars(content)
+
+        if not await self._is_rich_text(element):
+            # textarea・inputはfillで一括入力できる
+            if not await self._fill(element, content, "本文"):
+                raise Exception("本文を入力できませんでした")
+            strategies = ["fill"]
+        else:
+            configured = os.getenv("NOTE_BODY_INSERT", "auto").strip().lower()
+            strategies = [configured] if configured in BODY_INSERT_STRATEGIES else list(BODY_INSERT_STRATEGIES)
+            # 再試行時などに前回の本文が残っていれば先に削除する
+            if await self._visible_chars_of(element) > 0:
+                await self._clear_rich_text(element)
+
+        for index, strategy in enumerate(strategies):
+            if strategy != "fill":
+                if index > 0:
+                    await self._clear_rich_text(element)
+                try:
+                    handled = await self._insert_body_with(element, content, strategy)
+                except Exception as e:
+                    print(f"[本文入力] {strategy}での挿入でエラー: {str(e)}")
+                    continue
+                if not handled:
+                    print(f"[本文入力] エディタが{strategy}での挿入を処理したことを確認できませんでした")
+
+            # エディタが挿入を非同期に反映する場合があるので、文字数が揃うまで待ってから判定する
+            # （すぐに判定すると反映前の0文字を失敗とみなし、次の方法で本文を二重に挿入してしまう）
+            inserted = await self._wait_for_visible_chars(element, math.ceil(expected * BODY_MIN_LENGTH_RATIO))
+            set_span_attribute("strategy", strategy)
+            set_span_attribute("inserted_chars", inserted)
+            if expected == 0 or inserted >= expected * BODY_MIN_LENGTH_RATIO:
+                print(f"[本文入力] {strategy}で本文を挿入しました ({inserted}/{expected}文字)")
+                return strategy
+            print(f"[本文入力] {strategy}での挿入後の文字数が不足しています ({inserted}/{expected}文字)")
+
+        raise Exception("本文を入力できませんでした（挿入後の文字数が一致しません）")
+
+    async def _visible_chars_of(self, element: Locator) -> int:
+        """入力欄の文字数（空白を除く）"""
+        return _count_visible_chars(await element.evaluate(_READ_TEXT_JS) or '')
+
+    async def _wait_for_visible_chars(self, element: Locator, minimum: int) -> int:
+        """入力欄の文字数（空白を除く）がminimum以上になるまでtimeouts.bodyだけ待ち、その時点の文字数を返す"""
+        if minimum > 0:
+            try:
+                handle = await element.element_handle(timeout=self.timeouts.element)
+                frame = await handle.owner_frame() or self.page
+                await frame.wait_for_function(_HAS_VISIBLE_CHARS_JS, arg=[handle, minimum], timeout=self.timeouts.body)
+            except PlaywrightTimeoutError:
+                pass
+        return await self._visible_chars_of(element)
+
+    async def _is_rich_text(self, element: Locator) -> bool:
+        is_contenteditable = await element.get_attribute('contenteditable')
+        role_attr = await element.get_attribute('role')
+        return bool(is_contenteditable) or bool(role_attr and role_attr.lower() == 'textbox')
+
+    async def _insert_body_with(self, element: Locator, content: str, strategy: str) -> bool:
+        """指定の方法で本文を挿入（エディタが処理しなかった場合はFalse）"""
+        if strategy == "paste":
+            return await element.evaluate(_PASTE_BODY_JS, content)
+        if strategy == "insert_text":
+            # 段落ごとに1回のinsertTextで入力し、段落の区切りだけEnterを押す
+            # （改行を含めて1回で挿入するとcontenteditableのエディタでは段落に分かれないため、呼び出しは段落数に比例する）
+            await element.focus()
+            for index, line in enumerate(content.split('\n')):
+                if index > 0:
+                    await self.page.keyboard.press('Enter')
+                if line:
+                    await self.page.keyboard.insert_text(line)
+            return True
+        await element.evaluate(_REPLACE_BODY_JS, content)
+        return True
+
+    async def _clear_rich_text(self, element: Locator):
+        """前の挿入方法で途中まで入った本文を削除"""
+        try:
+            await element.evaluate(_SELECT_CONTENTS_JS)
+            await self.page.keyboard.press('Delete')
+        except Exception as e:
+            print(f"[本文入力] 本文の削除でエラー: {str(e)}")
+
+    async def _capture(self, label: str, on_error: bool = False):
+        """診断用スクリーンショット（エラー時は保存まで待ち、それ以外は待たずにバックグラウンドで撮影）"""
+        if self.page is None or not self.diagnostics.wants(on_error):
+            return
+        if on_error:
+            await self.diagnostics.capture(self.page, self.run_id, label)
+            return
+        task = asyncio.ensure_future(self.diagnostics.capture(self.page, self.run_id, label))
+        self._capture_tasks.add(task)
+        task.add_done_callback(self._capture_tasks.discard)
+
     async def close(self):
         """ブラウザを閉じる（公開メソッド）"""
-        await self._close_browser()
-    
+        await self._run(self._close_browser())
+
+    async def is_healthy(self) -> bool:
+        """ブラウザ・ページが生きていて、ログイン画面に戻されていないか確認"""
+        return await self._run(self._is_healthy())
+
+    async def _is_healthy(self) -> bool:
+        if self.browser is None or self.page is None:
+            return False
+        try:
+            current_url = self.browser.is_connected() and not self.page.is_closed() and self.page.url
+            return bool(current_url) and 'login' not in current_url.lower()
+        except Exception as e:
+            print(f"[ブラウザ] ヘルスチェックでエラー: {str(e)}")
+            return False
+
+    @staticmethod
+    def _headless_mode() -> bool:
+        """本番環境（Renderなど）ではヘッドレスモードを使用"""
+        render_env = os.getenv("RENDER")
+        railway_env = os.getenv("RAILWAY")
+        fly_env = os.getenv("FLY_APP_NAME")
+        headless_env = os.getenv("HEADLESS_MODE")
+
+        if headless_env is not None:
+            return headless_env.strip().lower() in ("1", "true", "yes", "on")
+        return any(flag is not None for flag in [render_env, railway_env, fly_env])
+
+    async def _is_authenticated(self) -> bool:
+        """現在のコンテキストのCookieでnote.comにログイン済みか、APIへの軽いリクエストで確認"""
+        try:
+            response = await self.context.request.get(NOTE_CURRENT_USER_URL, timeout=self.timeouts.element)
+            return response.ok and bool((await response.json() or {}).get('data'))
+        except Exception as e:
+            print(f"[ログイン] ログイン状態の確認でエラー: {str(e)}")
+            return False
+
+    async def _save_storage_state(self):
+        """ログイン後のCookie・localStorageを暗号化して保存"""
+        if self.state_store is None or self.context is None:
+            return
+        try:
+            state = await self.context.storage_state()
+            self.state_store.save(self.note_id, state)
+            print("[ログイン] ログイン状態を保存しました")
+        except Exception as e:
+            print(f"[ログイン] ログイン状態の保存に失敗しましたが処理を続行します: {str(e)}")
+
+    async def _discard_storage_state(self):
+        """保存済みのログイン状態を削除し、コンテキストのCookieも消してフォームからのログインに備える"""
+        if self.state_store is not None:
+            self.state_store.delete(self.note_id)
+        if self.context is None:
+            return
+        try:
+            await self.context.clear_cookies()
+        except Exception as e:
+            print(f"[ログイン] Cookieの削除でエラー: {str(e)}")
+
     async def login(self) -> bool:
         """
-        noteにログイン（ブラウザスクレイピング）
-        
+        noteにログイン
+
+        保存済みのログイン状態があれば復元してAPIで有効か確認し、
+        無効な場合だけフォームからログインする（成功したら状態を保存）
+
         Returns:
             ログイン成功かどうか
         """
-        try:
-            # 本番環境（Renderなど）ではヘッドレスモードを使用
-            import os
-            render_env = os.getenv("RENDER")
-            railway_env = os.getenv("RAILWAY")
-            fly_env = os.getenv("FLY_APP_NAME")
-            headless_env = os.getenv("HEADLESS_MODE")
-
-            if headless_env is not None:
-                headless_mode = headless_env.strip().lower() in ("1", "true", "yes", "on")
-            else:
-                headless_mode = any(flag is not None for flag in [render_env, railway_env, fly_env])
+        self.run_id = new_run_id()
+        return await self._run(self._login())
+
+    async def _login(self) -> bool:
+        with span("login", run_id=self.run_id) as login_span:
+            login_span["ok"] = await self._login_steps(login_span)
+            return login_span["ok"]
 
+    async def _login_steps(self, login_span: Dict) -> bool:
+        stored_state = None
+        if self.browser is None and self.state_store is not None:
+            stored_state = self.state_store.load(self.note_id)
+
+        if stored_state is not None:
+            try:
+                await self._init_browser(headless=self._headless_mode(), storage_state=stored_state)
+            except Exception as e:
+                print(f"[ログイン] 保存済みのログイン状態を復元できませんでした: {str(e)}")
+                await self._close_browser()
+            if self.browser is not None and await self._is_authenticated():
+                print("[ログイン] 保存済みのログイン状態でログインしました")
+                login_span["method"] = "stored_state"
+                return True
+            print("[ログイン] 保存済みのログイン状態が無効なため、フォームからログインします")
+            await self._discard_storage_state()
+
+        login_span["method"] = "form"
+        if not await self._login_with_form():
+            return False
+        await self._save_storage_state()
+        return True
+
+    async def _login_with_form(self) -> bool:
+        """
+        noteにログイン（ブラウザスクレイピングでメールアドレス・パスワードを入力）
+
+        Returns:
+            ログイン成功かどうか
+        """
+        try:
+            headless_mode = self._headless_mode()
             print(f"[ログイン] headless_mode={headless_mode} (type={type(headless_mode)})")
             await self._init_browser(headless=headless_mode)
-            
-            if USE_SYNC:
-                # Windows環境: 同期的に実行
-                def login_sync():
-                    page = self.page
-                    try:
-                        page.goto('https://note.com/login', wait_until='domcontentloaded', timeout=60000)
-                    except PlaywrightTimeoutError as exc:
-                        current_url = page.url if page else 'about:blank'
-                        print(f"[ログイン] ログインページへの遷移でタイムアウトしました ({str(exc)}), current_url={current_url}")
-                        if current_url in ('about:blank', '', 'https://note.com/login'):
-                            raise
-                    time.sleep(3)
-                    
-                    try:
-                        page.screenshot(path='login_page.png', full_page=True, timeout=10000)
-                        print("[ログイン] ログインページのスクリーンショットを保存しました: login_page.png")
-                    except PlaywrightTimeoutError as exc:
-                        print(f"[ログイン] ログインページのスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(exc)}")
-                    except Exception as exc:
-                        print(f"[ログイン] ログインページのスクリーンショット取得に失敗しましたが処理を続行します: {str(exc)}")
-                    
-                    # メールアドレス入力
-                    email_filled = False
-                    email_selectors = [
-                        'input[type="email"]',
-                        'input[name="email"]',
-                        'input[placeholder*="メール"]',
-                        'input[placeholder*="email"]',
-                        'input[placeholder*="Email"]',
-                        'input[id*="email"]',
-                        'input[class*="email"]',
-                        'input[type="text"]'
-                    ]
-                    
-                    for selector in email_selectors:
-                        try:
-                            email_input = page.locator(selector).first
-                            if email_input.count() > 0:
-                                email_input.click()
-                                time.sleep(0.5)
-                                email_input.fill(self.note_id)
-                                print(f"[ログイン] メールアドレスを入力しました (セレクター: {selector})")
-                                email_filled = True
-                                break
-                        except Exception as e:
-                            print(f"[ログイン] セレクター {selector} でエラー: {str(e)}")
-                            continue
-                    
-                    if not email_filled:
-                        all_inputs = page.locator('input').all()
-                        if len(all_inputs) > 0:
-                            all_inputs[0].fill(self.note_id)
-                            email_filled = True
-                            print("[ログイン] 最初のinput要素にメールアドレスを入力しました")
-                    
-                    if not email_filled:
-                        raise Exception("メールアドレス入力欄が見つかりませんでした")
-                    
-                    time.sleep(1)
-                    
-                    # パスワード入力
-                    password_input = page.locator('input[type="password"]').first
-                    if password_input.count() == 0:
-                        raise Exception("パスワード入力欄が見つかりませんでした")
-                    
-                    password_input.click()
-                    time.sleep(0.5)
-                    password_input.fill(self.note_password)
-                    print("[ログイン] パスワードを入力しました")
-                    time.sleep(1)
-                    
-                    # ログインボタンをクリック
-                    login_clicked = False
-                    login_selectors = [
-                        'button[type="submit"]',
-                        'button:has-text("ログイン")',
-                        'a:has-text("ログイン")',
-                        'button.login',
-                        'a.login',
-                        '[class*="login"] button',
-                        '[class*="Login"] button',
-                        'form button',
-                        'button:has-text("送信")',
-                        'button:has-text("Sign in")'
-                    ]
-                    
-                    for selector in login_selectors:
-                        try:
-                            login_button = page.locator(selector).first
-                            if login_button.count() > 0:
-                                login_button.click()
-                                print(f"[ログイン] ログインボタンをクリックしました (セレクター: {selector})")
-                                login_clicked = True
-                                break
-                        except Exception as e:
-                            print(f"[ログイン] ログインボタンセレクター {selector} でエラー: {str(e)}")
-                            continue
-                    
-                    if not login_clicked:
-                        page.keyboard.press('Enter')
-                        print("[ログイン] Enterキーを押しました")
-                    
-                    time.sleep(5)
-                    
-                    try:
-                        page.screenshot(path='after_login.png', full_page=True, timeout=10000)
-                        print("[ログイン] ログイン後のスクリーンショットを保存しました: after_login.png")
-                    except PlaywrightTimeoutError as exc:
-                        print(f"[ログイン] ログイン後のスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(exc)}")
-                    except Exception as exc:
-                        print(f"[ログイン] ログイン後のスクリーンショット取得に失敗しましたが処理を続行します: {str(exc)}")
-                    
-                    current_url = page.url
-                    print(f"[ログイン] 現在のURL: {current_url}")
-                    
-                    if 'login' not in current_url.lower():
-                        print("[ログイン] ログイン成功（URLが変更されました）")
-                        return True
-                    
-                    success_indicators = [
-                        'a[href*="/mypage"]',
-                        'a[href*="/settings"]',
-                        '[class*="mypage"]',
-                        '[class*="user"]',
-                        'button:has-text("投稿")',
-                        'a:has-text("投稿")'
-                    ]
-                    
-                    for indicator in success_indicators:
-                        if page.locator(indicator).count() > 0:
-                            print(f"[ログイン] ログイン成功（要素確認: {indicator}）")
-                            return True
-                    
-                    error_selectors = [
-                        '.error',
-                        '.alert',
-                        '[class*="error"]',
-                        '[class*="Error"]',
-                        '[role="alert"]'
-                    ]
-                    
-                    for error_selector in error_selectors:
-                        error_elements = page.locator(error_selector).all()
-                        if len(error_elements) > 0:
-                            try:
-                                error_message = error_elements[0].inner_text()
-                                if error_message:
-                                    raise Exception(f"ログインエラー: {error_message}")
-                            except:
-                                pass
-                    
-                    print("[ログイン] ログイン状態を確認できませんでした")
-                    return False
-                
-                loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(self.executor, login_sync)
+
+            print(f"[ログイン開始] note.comにアクセスします...")
+            await self._goto(f'{NOTE_BASE_URL}/login', wait_until='domcontentloaded', label="ログインページ遷移")
+
+            email_selectors = [
+                'input[type="email"]',
+                'input[name="email"]',
+                'input[placeholder*="メール"]',
+                'input[placeholder*="email"]',
+                'input[placeholder*="Email"]',
+                'input[id*="email"]',
+                'input[class*="email"]',
+                'input[type="text"]'
+            ]
+
+            # メールアドレス入力欄が表示されたらログインフォームの準備完了
+            email_input = await self._wait_for_first(self.page, email_selectors, self.timeouts.element, "メールアドレス入力欄", step="login.email")
+            await self._capture('login_page')
+
+            if email_input is None:
+                all_inputs = await self.page.locator('input').all()
+                if len(all_inputs) > 0:
+                    email_input = all_inputs[0]
+                    print("[ログイン] 最初のinput要素にメールアドレスを入力します")
+
+            if email_input is None or not await self._fill(email_input, self.note_id, "メールアドレス"):
+                raise Exception("メールアドレス入力欄が見つかりませんでした")
+            print("[ログイン] メールアドレスを入力しました")
+
+            password_input = await self._wait_for_first(self.page, ['input[type="password"]'], self.timeouts.element, "パスワード入力欄")
+            if password_input is None:
+                raise Exception("パスワード入力欄が見つかりませんでした")
+
+            await password_input.fill(self.note_password)
+            print("[ログイン] パスワードを入力しました")
+
+            login_selectors = [
+                'button[type="submit"]',
+                'button:has-text("ログイン")',
+                'a:has-text("ログイン")',
+                'button.login',
+                'a.login',
+                '[class*="login"] button',
+                '[class*="Login"] button',
+                'form button',
+                'button:has-text("送信")',
+                'button:has-text("Sign in")'
+            ]
+
+            login_button = await self._wait_for_first(self.page, login_selectors, self.timeouts.element, "ログインボタン", step="login.submit")
+            if login_button is not None:
+                await login_button.click()
+                print("[ログイン] ログインボタンをクリックしました")
             else:
-                # 非Windows環境: 非同期で実行
-                print(f"[ログイン開始] note.comにアクセスします...")
-                await self._goto('https://note.com/login', wait_until='domcontentloaded', timeout=60000, label="ログインページ遷移")
-                await asyncio.sleep(3)
-                
-                try:
-                    await self.page.screenshot(path='login_page.png', full_page=True, timeout=10000)
-                    print("[ログイン] ログインページのスクリーンショットを保存しました: login_page.png")
-                except PlaywrightTimeoutError as e:
-                    print(f"[ログイン] ログインページのスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(e)}")
-                except Exception as e:
-                    print(f"[ログイン] ログインページのスクリーンショット取得に失敗しましたが処理を続行します: {str(e)}")
-                
-                email_filled = False
-                email_selectors = [
-                    'input[type="email"]',
-                    'input[name="email"]',
-                    'input[placeholder*="メール"]',
-                    'input[placeholder*="email"]',
-                    'input[placeholder*="Email"]',
-                    'input[id*="email"]',
-                    'input[class*="email"]',
-                    'input[type="text"]'
-                ]
-                
-                for selector in email_selectors:
-                    try:
-                        email_input = self.page.locator(selector).first
-                        if await email_input.count() > 0:
-                            await email_input.click()
-                            await asyncio.sleep(0.5)
-                            await email_input.fill(self.note_id)
-                            print(f"[ログイン] メールアドレスを入力しました (セレクター: {selector})")
-                            email_filled = True
-                            break
-                    except Exception as e:
-                        print(f"[ログイン] セレクター {selector} でエラー: {str(e)}")
-                        continue
-                
-                if not email_filled:
-                    all_inputs = await self.page.locator('input').all()
-                    if len(all_inputs) > 0:
-                        await all_inputs[0].fill(self.note_id)
-                        email_filled = True
-                        print("[ログイン] 最初のinput要素にメールアドレスを入力しました")
-                
-                if not email_filled:
-                    raise Exception("メールアドレス入力欄が見つかりませんでした")
-                
-                await asyncio.sleep(1)
-                
-                password_input = self.page.locator('input[type="password"]').first
-                if await password_input.count() == 0:
-                    raise Exception("パスワード入力欄が見つかりませんでした")
-                
-                await password_input.click()
-                await asyncio.sleep(0.5)
-                await password_input.fill(self.note_password)
-                print("[ログイン] パスワードを入力しました")
-                await asyncio.sleep(1)
-                
-                login_clicked = False
-                login_selectors = [
-                    'button[type="submit"]',
-                    'button:has-text("ログイン")',
-                    'a:has-text("ログイン")',
-                    'button.login',
-                    'a.login',
-                    '[class*="login"] button',
-                    '[class*="Login"] button',
-                    'form button',
-                    'button:has-text("送信")',
-                    'button:has-text("Sign in")'
-                ]
-                
-                for selector in login_selectors:
-                    try:
-                        login_button = self.page.locator(selector).first
-                        if await login_button.count() > 0:
-                            await login_button.click()
-                            print(f"[ログイン] ログインボタンをクリックしました (セレクター: {selector})")
-                            login_clicked = True
-                            break
-                    except Exception as e:
-                        print(f"[ログイン] ログインボタンセレクター {selector} でエラー: {str(e)}")
-                        continue
-                
-                if not login_clicked:
-                    await self.page.keyboard.press('Enter')
-                    print("[ログイン] Enterキーを押しました")
-                
-                await asyncio.sleep(5)
-                
-                try:
-                    await self.page.screenshot(path='after_login.png', full_page=True, timeout=10000)
-                    print("[ログイン] ログイン後のスクリーンショットを保存しました: after_login.png")
-                except PlaywrightTimeoutError as e:
-                    print(f"[ログイン] ログイン後のスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(e)}")
-                except Exception as e:
-                    print(f"[ログイン] ログイン後のスクリーンショット取得に失敗しましたが処理を続行します: {str(e)}")
-                
-                current_url = self.page.url
-                print(f"[ログイン] 現在のURL: {current_url}")
-                
-                if 'login' not in current_url.lower():
-                    print("[ログイン] ログイン成功（URLが変更されました）")
+                await self.page.keyboard.press('Enter')
+                print("[ログイン] Enterキーを押しました")
+
+            # ログイン画面から離れたらログイン成功
+            if await self._wait_for_url(lambda url: 'login' not in url.lower(), self.timeouts.login):
+                print(f"[ログイン] ログイン成功（URLが変更されました: {self.page.url}）")
+                await self._capture('after_login')
+                return True
+
+            await self._capture('after_login')
+            current_url = self.page.url
+            print(f"[ログイン] 現在のURL: {current_url}")
+
+            success_indicators = [
+                'a[href*="/mypage"]',
+                'a[href*="/settings"]',
+                '[class*="mypage"]',
+                '[class*="user"]',
+                'button:has-text("投稿")',
+                'a:has-text("投稿")'
+            ]
+
+            for indicator in success_indicators:
+                if await self.page.locator(indicator).count() > 0:
+                    print(f"[ログイン] ログイン成功（要素確認: {indicator}）")
                     return True
-                
-                success_indicators = [
-                    'a[href*="/mypage"]',
-                    'a[href*="/settings"]',
-                    '[class*="mypage"]',
-                    '[class*="user"]',
-                    'button:has-text("投稿")',
-                    'a:has-text("投稿")'
-                ]
-                
-                for indicator in success_indicators:
-                    if await self.page.locator(indicator).count() > 0:
-                        print(f"[ログイン] ログイン成功（要素確認: {indicator}）")
-                        return True
-                
-                error_selectors = [
-                    '.error',
-                    '.alert',
-                    '[class*="error"]',
-                    '[class*="Error"]',
-                    '[role="alert"]'
-                ]
-                
-                for error_selector in error_selectors:
-                    error_elements = await self.page.locator(error_selector).all()
-                    if len(error_elements) > 0:
-                        try:
-                            error_message = await error_elements[0].inner_text()
-                            if error_message:
-                                raise Exception(f"ログインエラー: {error_message}")
-                        except:
-                            pass
-                
-                print("[ログイン] ログイン状態を確認できませんでした")
-                return False
-                
+
+            error_selectors = [
+                '.error',
+                '.alert',
+                '[class*="error"]',
+                '[class*="Error"]',
+                '[role="alert"]'
+            ]
+
+            for error_selector in error_selectors:
+                error_elements = await self.page.locator(error_selector).all()
+                if len(error_elements) > 0:
+                    try:
+                        error_message = await error_elements[0].inner_text()
+                        if error_message:
+                            raise Exception(f"ログインエラー: {error_message}")
+                    except:
+                        pass
+
+            print("[ログイン] ログイン状態を確認できませんでした")
+            return False
+
         except Exception as e:
             error_msg = str(e)
             print(f"[ログインエラー] {error_msg}")
-            try:
-                if self.page:
-                    screenshot_path = f'login_error_{int(time.time())}.png'
-                    try:
-                        if USE_SYNC:
-                            self.page.screenshot(path=screenshot_path, full_page=True, timeout=10000)
-                        else:
-                            await self.page.screenshot(path=screenshot_path, full_page=True, timeout=10000)
-                        print(f"[ログインエラー] スクリーンショットを保存: {screenshot_path}")
-                    except PlaywrightTimeoutError as capture_timeout:
-                        print(f"[ログインエラー] スクリーンショット取得がタイムアウトしましたが処理を続行します: {str(capture_timeout)}")
-                    except Exception as capture_error:
-                        print(f"[ログインエラー] スクリーンショット保存に失敗しましたが処理を続行します: {str(capture_error)}")
-            except Exception:
-                pass
+            await self._capture('login_error', on_error=True)
             await self._close_browser()
             raise Exception(f"ログインに失敗しました: {error_msg}")
-    
-    async def post_draft(self, title: str, content: str) -> Dict[str, any]:
+
+    async def post_draft(self, title: str, content: str, checkpoint: Optional[DraftCheckpoint] = None) -> Dict[str, any]:
         """
         下書きを投稿（ブラウザスクレイピング）
-        
+
         Args:
             title: 記事のタイトル
             content: 記事の本文
-        
+            checkpoint: 再試行で使い回すチェックポイント（同じ記事なら完了済みの手順から再開する）
+
         Returns:
             投稿結果
         """
-        try:
-            # ログイン済みでない場合はログイン
-            if self.page is None:
-                print("[下書き投稿] ログインが必要です")
+        checkpoint = checkpoint if checkpoint is not None else DraftCheckpoint()
+        checkpoint.bind(title, content)
+        self.run_id = new_run_id()
+        print(f"[下書き投稿] 実行ID: {self.run_id}")
+        with span("post_draft", run_id=self.run_id, attempt=checkpoint.attempts, resumed_from=checkpoint.stage):
+            return await self._run(self._post_draft(title, content, checkpoint))
+
+    async def post_drafts(
+        self,
+        articles: List[Dict],
+        on_result: Optional[Callable[[Dict], Awaitable[None]]] = None
+    ) -> List[Dict]:
+        """
+        複数の記事を1つのログイン済みブラウザで順に下書き投稿
+
+        Args:
+            articles: 記事のリスト（id・title・contentを含む）
+            on_result: 1件終わるごとに結果を渡して呼ぶコールバック
+
+        Returns:
+            記事ごとの結果（article_id・success・urlまたはerror）
+        """
+        results: List[Dict] = []
+        login_error = None
+        if self.page is None:
+            try:
                 if not await self.login():
-                    raise Exception("ログインに失敗しました")
-            elif USE_SYNC:
-                # Windows環境: URLを同期的に確認
-                def check_url():
-                    return self.page.url
-                loop = asyncio.get_event_loop()
-                current_url = await loop.run_in_executor(self.executor, check_url)
-                if 'login' in current_url.lower():
-                    print("[下書き投稿] ログインが必要です")
-                    if not await self.login():
-                        raise Exception("ログインに失敗しました")
-            else:
-                current_url = self.page.url
-                if 'login' in current_url.lower():
-                    print("[下書き投稿] ログインが必要です")
-                    if not await self.login():
-                        raise Exception("ログインに失敗しました")
-            
-            if USE_SYNC:
-                # Windows環境: 同期的に実行
-                def post_draft_sync():
-                    page = self.page
-                    print(f"[下書き投稿] note.comのトップページに移動します...")
-                    # まずトップページまたはマイページに移動
-                    try:
-                        page.goto('https://note.com/', wait_until='domcontentloaded', timeout=60000)
-                    except PlaywrightTimeoutError as exc:
-                        current_url = page.url if page else 'about:blank'
-                        print(f"[下書き投稿] トップページへの遷移でタイムアウトしました ({str(exc)}) current_url={current_url}")
-                        if current_url in ('about:blank', '', 'https://note.com/'):
-                            raise
-                    time.sleep(3)
-                    
-                    # 「投稿」ボタンを探してクリック
-                    print("[下書き投稿] 「投稿」ボタンを探します...")
-                    post_button_clicked = False
-                    post_button_selectors = [
-                        'a:has-text("投稿")',
-                        'button:has-text("投稿")',
-                        'a[href*="/notes/new"]',
-                        'a[href*="/mypage/notes/new"]',
-                        '[class*="post"] a',
-                        '[class*="Post"] a',
-                        '[class*="投稿"]',
-                        'a:has-text("新規投稿")',
-                        'button:has-text("新規投稿")',
-                        'a[href*="editor"]',
-                        # 左上の投稿ボタン（より具体的なセレクター）
-                        'header a:has-text("投稿")',
-                        'nav a:has-text("投稿")',
-                        '[role="navigation"] a:has-text("投稿")',
-                        '.header a:has-text("投稿")',
-                        '.nav a:has-text("投稿")'
-                    ]
-                    
-                    for selector in post_button_selectors:
-                        try:
-                            post_button = page.locator(selector).first
-                            if post_button.count() > 0:
-                                post_button.click()
-                                print(f"[下書き投稿] 「投稿」ボタンをクリックしました (セレクター: {selector})")
-                                time.sleep(5)  # ページ遷移待機
-                                post_button_clicked = True
-                                break
-                        except Exception as e:
-                            print(f"[下書き投稿] 投稿ボタンセレクター {selector} でエラー: {str(e)}")
-                            continue
-                    
-                    if not post_button_clicked:
-                        # 投稿ボタンが見つからない場合、直接URLにアクセスを試す
-                        print("[下書き投稿] 「投稿」ボタンが見つからないため、直接URLにアクセスします...")
-                        try:
-                            page.goto('https://note.com/mypage/notes/new', wait_until='domcontentloaded', timeout=60000)
-                        except PlaywrightTimeoutError as exc:
-                            current_url = page.url if page else 'about:blank'
-                            print(f"[下書き投稿] エディタページへの直接遷移でタイムアウトしました ({str(exc)}) current_url={current_url}")
-                            if current_url in ('about:blank', '', 'https://note.com/mypage/notes/new'):
-                                raise
-                        time.sleep(5)
-                    
-                    # エディタページのURLを確認
-                    current_url = page.url
-                    print(f"[下書き投稿] 現在のURL: {current_url}")
-                    
-                    # エディタページでない場合、もう一度試す
-                    if 'editor' not in current_url.lower() and '/notes/new' not in current_url.lower():
-                        print("[下書き投稿] エディタページに遷移できていないため、再試行します...")
-                        time.sleep(2)
-                        # 再度投稿ボタンを探す
-                        for selector in post_button_selectors[:5]:  # 主要なセレクターのみ
-                            try:
-                                post_button = page.locator(selector).first
-                                if post_button.count() > 0:
-                                    post_button.click()
-                                    time.sleep(5)
-                                    break
-                            except:
-                                continue
-                    
-                    time.sleep(3)  # エディタ読み込み待機
-                    
-                    try:
-                        page.screenshot(path='editor_page.png', full_page=True, timeout=10000)
-                        print("[下書き投稿] エディタページのスクリーンショットを保存しました: editor_page.png")
-                    except PlaywrightTimeoutError as exc:
-                        print(f"[下書き投稿] エディタページのスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(exc)}")
-                    except Exception as exc:
-                        print(f"[下書き投稿] エディタページのスクリーンショット取得に失敗しましたが処理を続行します: {str(exc)}")
-                    
-                    # タイトル入力
-                    print("[下書き投稿] タイトルを入力します...")
-                    title_filled = False
-                    title_selectors = [
-                        'input[placeholder*="タイトル"]',
-                        'input[placeholder*="title"]',
-                        'input[placeholder*="Title"]',
-                        'input[type="text"]',
-                        'textarea[placeholder*="タイトル"]',
-                        '[contenteditable="true"][placeholder*="タイトル"]',
-                        '[contenteditable="true"][placeholder*="title"]',
-                        '.note-editor-title',
-                        '.editor-title',
-                        '[class*="title"] input',
-                        '[class*="Title"] input',
-                        'input'
-                    ]
-                    
-                    for selector in title_selectors:
-                        try:
-                            title_element = page.locator(selector).first
-                            count = title_element.count()
-                            if count > 0:
-                                title_element.click()
-                                time.sleep(0.5)
-                                title_element.fill(title)
-                                print(f"[下書き投稿] タイトルを入力しました (セレクター: {selector})")
-                                title_filled = True
-                                break
-                        except Exception as e:
-                            print(f"[下書き投稿] タイトルセレクター {selector} でエラー: {str(e)}")
-                            continue
-                    
-                    if not title_filled:
-                        all_inputs = page.locator('input').all()
-                        if len(all_inputs) > 0:
-                            all_inputs[0].fill(title)
-                            title_filled = True
-                            print("[下書き投稿] 最初のinput要素にタイトルを入力しました")
-                    
-                    if not title_filled:
-                        raise Exception("タイトル入力欄が見つかりませんでした")
-                    
-                    time.sleep(2)
-                    
-                    # 本文入力
-                    print("[下書き投稿] 本文を入力します...")
-                    content_filled = False
-                    content_selectors = [
-                        'textarea[placeholder*="本文"]',
-                        'textarea[placeholder*="content"]',
-                        'textarea[placeholder*="Content"]',
-                        '[contenteditable="true"]',
-                        'div[contenteditable="true"]',
-                        'textarea',
-                        '.note-editor-body',
-                        '.editor-body',
-                        '[class*="editor"] textarea',
-                        '[class*="Editor"] textarea',
-                        '[class*="editor"] [contenteditable]',
-                        '[class*="Editor"] [contenteditable]'
-                    ]
-                    
-                    for selector in content_selectors:
-                        try:
-                            content_element = page.locator(selector).first
-                            count = content_element.count()
-                            if count > 0:
-                                content_element.click()
-                                time.sleep(0.5)
-                                
-                                is_contenteditable = content_element.get_attribute('contenteditable')
-                                if is_contenteditable:
-                                    content_element.evaluate(f'element => element.innerHTML = `{content.replace(chr(10), "<br>")}`')
-                                else:
-                                    content_element.fill(content)
-                                
-                                print(f"[下書き投稿] 本文を入力しました (セレクター: {selector})")
-                                content_filled = True
-                                break
-                        except Exception as e:
-                            print(f"[下書き投稿] 本文セレクター {selector} でエラー: {str(e)}")
-                            continue
-                    
-                    if not content_filled:
-                        all_textareas = page.locator('textarea, [contenteditable="true"]').all()
-                        if len(all_textareas) > 0:
-                            element = all_textareas[0]
-                            is_contenteditable = element.get_attribute('contenteditable')
-                            if is_contenteditable:
-                                element.evaluate(f'element => element.innerHTML = `{content.replace(chr(10), "<br>")}`')
-                            else:
-                                element.fill(content)
-                            content_filled = True
-                            print("[下書き投稿] 最初のtextarea/contenteditable要素に本文を入力しました")
-                    
-                    if not content_filled:
-                        raise Exception("本文入力欄が見つかりませんでした")
-                    
-                    time.sleep(3)
-                    
-                    try:
-                        page.screenshot(path='before_save.png', full_page=True, timeout=10000)
-                        print("[下書き投稿] 保存前のスクリーンショットを保存しました: before_save.png")
-                    except PlaywrightTimeoutError as exc:
-                        print(f"[下書き投稿] 保存前のスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(exc)}")
-                    except Exception as exc:
-                        print(f"[下書き投稿] 保存前のスクリーンショット取得に失敗しましたが処理を続行します: {str(exc)}")
-                    
-                    # 保存ボタンをクリック
-                    print("[下書き投稿] 下書き保存ボタンを探します...")
-                    save_selectors = [
-                        'button:has-text("下書き保存")',
-                        'button:has-text("保存")',
-                        'button:has-text("下書き")',
-                        'button[type="submit"]',
-                        'a:has-text("下書き保存")',
-                        'a:has-text("保存")',
-                        '.save-draft',
-                        '.draft-save',
-                        '[class*="save"] button',
-                        '[class*="Save"] button',
-                        'button:has-text("Save")',
-                        '[data-testid*="save"]',
-                        '[data-testid*="Save"]'
-                    ]
-                    
-                    saved = False
-                    for selector in save_selectors:
-                        try:
-                            save_button = page.locator(selector).first
-                            if save_button.count() > 0:
-                                save_button.click()
-                                print(f"[下書き投稿] 保存ボタンをクリックしました (セレクター: {selector})")
-                                time.sleep(5)
-                                saved = True
-                                break
-                        except Exception as e:
-                            print(f"[下書き投稿] 保存ボタンセレクター {selector} でエラー: {str(e)}")
-                            continue
-                    
-                    if not saved:
-                        print("[下書き投稿] 保存ボタンが見つからないため、Ctrl+Sを試します")
-                        page.keyboard.press('Control+s')
-                        time.sleep(3)
-                    
-                    time.sleep(3)
-                    current_url = page.url
-                    print(f"[下書き投稿] 保存後のURL: {current_url}")
-                    
-                    try:
-                        page.screenshot(path='after_save.png', full_page=True, timeout=10000)
-                        print("[下書き投稿] 保存後のスクリーンショットを保存しました: after_save.png")
-                    except PlaywrightTimeoutError as exc:
-                        print(f"[下書き投稿] 保存後のスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(exc)}")
-                    except Exception as exc:
-                        print(f"[下書き投稿] 保存後のスクリーンショット取得に失敗しましたが処理を続行します: {str(exc)}")
-                    
-                    success = 'draft' in current_url.lower() or 'mypage' in current_url.lower() or 'note' in current_url.lower()
-                    
-                    if success:
-                        print("[下書き投稿] 下書きを保存しました")
-                        return {
-                            "success": True,
-                            "message": "下書きを保存しました",
-                            "url": current_url
-                        }
-                    else:
-                        error_elements = page.locator('.error, .alert, [class*="error"], [role="alert"]').all()
-                        error_message = "不明なエラー"
-                        if len(error_elements) > 0:
-                            try:
-                                error_message = error_elements[0].inner_text()
-                            except:
-                                pass
-                        raise Exception(f"下書き保存に失敗しました: {error_message}")
-                
-                loop = asyncio.get_event_loop()
-                return await loop.run_in_executor(self.executor, post_draft_sync)
+                    login_error = "ログインに失敗しました"
+            except Exception as e:
+                login_error = str(e)
+
+        for index, article in enumerate(articles, start=1):
+            if login_error is not None:
+                result = {"article_id": article.get("id"), "success": False, "error": login_error}
             else:
-                # 非Windows環境: 非同期で実行
-                print(f"[下書き投稿] note.comのトップページに移動します...")
-                # まずトップページまたはマイページに移動
-                await self._goto('https://note.com/', wait_until='domcontentloaded', timeout=60000, label="トップページ遷移")
-                await asyncio.sleep(3)
-                
-                # 「投稿」ボタンを探してクリック
-                print("[下書き投稿] 「投稿」ボタンを探します...")
-                post_button_clicked = False
-                post_button_selectors = [
-                    'a:has-text("投稿")',
-                    'button:has-text("投稿")',
-                    'a[href*="/notes/new"]',
-                    'a[href*="/mypage/notes/new"]',
-                    '[class*="post"] a',
-                    '[class*="Post"] a',
-                    '[class*="投稿"]',
-                    'a:has-text("新規投稿")',
-                    'button:has-text("新規投稿")',
-                    'a[href*="editor"]',
-                    # 左上の投稿ボタン（より具体的なセレクター）
-                    'header a:has-text("投稿")',
-                    'nav a:has-text("投稿")',
-                    '[role="navigation"] a:has-text("投稿")',
-                    '.header a:has-text("投稿")',
-                    '.nav a:has-text("投稿")'
-                ]
-                
-                for selector in post_button_selectors:
-                    try:
-                        post_button = self.page.locator(selector).first
-                        if await post_button.count() > 0:
-                            await post_button.click()
-                            print(f"[下書き投稿] 「投稿」ボタンをクリックしました (セレクター: {selector})")
-                            await asyncio.sleep(5)  # ページ遷移待機
-                            post_button_clicked = True
-                            break
-                    except Exception as e:
-                        print(f"[下書き投稿] 投稿ボタンセレクター {selector} でエラー: {str(e)}")
-                        continue
-                
-                if not post_button_clicked:
-                    # 投稿ボタンが見つからない場合、直接URLにアクセスを試す
-                    print("[下書き投稿] 「投稿」ボタンが見つからないため、直接URLにアクセスします...")
-                    await self._goto('https://note.com/mypage/notes/new', wait_until='domcontentloaded', timeout=60000, label="エディタ直接遷移")
-                    await asyncio.sleep(5)
-                
-                # エディタページのURLを確認
-                current_url = self.page.url
-                print(f"[下書き投稿] 現在のURL: {current_url}")
-                
-                # エディタページでない場合、もう一度試す
-                if 'editor' not in current_url.lower() and '/notes/new' not in current_url.lower():
-                    print("[下書き投稿] エディタページに遷移できていないため、再試行します...")
-                    await asyncio.sleep(2)
-                    # 再度投稿ボタンを探す
-                    for selector in post_button_selectors[:5]:  # 主要なセレクターのみ
-                        try:
-                            post_button = self.page.locator(selector).first
-                            if await post_button.count() > 0:
-                                await post_button.click()
-                                await asyncio.sleep(5)
-                                break
-                        except:
-                            continue
-                
-                await asyncio.sleep(3)  # エディタ読み込み待機
-                
-                try:
-                    await self.page.screenshot(path='editor_page.png', full_page=True, timeout=10000)
-                    print("[下書き投稿] エディタページのスクリーンショットを保存しました: editor_page.png")
-                except PlaywrightTimeoutError as e:
-                    print(f"[下書き投稿] エディタページのスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(e)}")
-                except Exception as e:
-                    print(f"[下書き投稿] エディタページのスクリーンショット取得に失敗しましたが処理を続行します: {str(e)}")
-                
-                # エディタがiframe内に読み込まれている場合に対応
-                editor_contexts = [self.page]
                 try:
-                    editor_frames = [frame for frame in self.page.frames if "editor" in frame.url or "notes/new" in frame.url]
-                    if editor_frames:
-                        editor_contexts = editor_frames + editor_contexts
-                        print(f"[下書き投稿] エディタiframeを検出しました: {[frame.url for frame in editor_frames]}")
+                    posted = await self.post_draft(article["title"], article["content"])
+                    result = {"article_id": article.get("id"), "success": True, "url": posted.get("url")}
                 except Exception as e:
-                    print(f"[下書き投稿] iframe検出中にエラー: {str(e)}")
-                
-                print("[下書き投稿] タイトルを入力します...")
-                title_filled = False
-                title_selectors = [
-                    'input[placeholder*="タイトル"]',
-                    'input[placeholder*="title"]',
-                    'input[placeholder*="Title"]',
-                    'input[type="text"]',
-                    'textarea[placeholder*="タイトル"]',
-                    '[contenteditable="true"][placeholder*="タイトル"]',
-                    '[contenteditable="true"][placeholder*="title"]',
-                    '.note-editor-title',
-                    '.editor-title',
-                    '[class*="title"] input',
-                    '[class*="Title"] input',
-                    'input'
-                ]
-                
-                for context in editor_contexts:
-                    context_label = getattr(context, 'url', None)
-                    for selector in title_selectors:
-                        try:
-                            title_element = context.locator(selector).first
-                            count = await title_element.count()
-                            if count > 0:
-                                try:
-                                    await title_element.wait_for(state="visible", timeout=15000)
-                                except PlaywrightTimeoutError as e:
-                                    print(f"[下書き投稿] タイトルセレクター {selector} の可視化待機でタイムアウト: {str(e)}")
-                                
-                                try:
-                                    await title_element.scroll_into_view_if_needed()
-                                except Exception as e:
-                                    print(f"[下書き投稿] タイトルセレクター {selector} のスクロールでエラー: {str(e)}")
-                                
-                                clicked = False
-                                for attempt in range(2):
-                                    try:
-                                        await title_element.click(timeout=5000)
-                                        clicked = True
-                                        break
-                                    except PlaywrightTimeoutError as e:
-                                        print(f"[下書き投稿] タイトルセレクター {selector} のクリック{attempt+1}回目でタイムアウト: {str(e)}")
-                                        try:
-                                            await title_element.click(force=True, timeout=3000)
-                                            clicked = True
-                                            break
-                                        except PlaywrightTimeoutError as e2:
-                                            print(f"[下書き投稿] タイトルセレクター {selector} のforceクリック{attempt+1}回目でタイムアウト: {str(e2)}")
-                                if not clicked:
-                                    try:
-                                        await title_element.evaluate("element => element.focus()", timeout=3000)
-                                        clicked = True
-                                    except Exception as e:
-                                        print(f"[下書き投稿] タイトルセレクター {selector} のfocusでエラー: {str(e)}")
-                                
-                                filled_direct = True
-                                try:
-                                    await asyncio.sleep(0.3)
-                                    await title_element.fill(title, timeout=5000)
-                                except PlaywrightTimeoutError as e:
-                                    print(f"[下書き投稿] タイトルセレクター {selector} のfillでタイムアウト: {str(e)}")
-                                    filled_direct = False
-                                
-                                if not filled_direct:
-                                    try:
-                                        await title_element.evaluate(
-                                            """(element, value) => {
-                                                if ('value' in element) {
-                                                    element.value = value;
-                                                    element.dispatchEvent(new Event('input', { bubbles: true }));
-                                                    element.dispatchEvent(new Event('change', { bubbles: true }));
-                                                } else if (element.innerHTML !== undefined) {
-                                                    element.innerHTML = value;
-                                                }
-                                            }""",
-                                            title,
-                                        )
-                                        filled_direct = True
-                                    except Exception as e:
-                                        print(f"[下書き投稿] タイトルセレクター {selector} のevaluate入力でエラー: {str(e)}")
-                                
-                                if filled_direct:
-                                    print(f"[下書き投稿] タイトルを入力しました (コンテキスト: {context_label or 'page'}, セレクター: {selector})")
-                                    title_filled = True
-                                    break
-                                else:
-                                    print(f"[下書き投稿] タイトルセレクター {selector} での入力に失敗しました")
-                        except Exception as e:
-                            print(f"[下書き投稿] タイトルセレクター {selector} でエラー: {str(e)}")
-                            continue
-                    if title_filled:
-                        break
-                
-                if not title_filled:
-                    for context in editor_contexts:
-                        all_inputs = await context.locator('input').all()
-                        if len(all_inputs) > 0:
-                            try:
-                                await all_inputs[0].click()
-                                await asyncio.sleep(0.5)
-                                await all_inputs[0].fill(title)
-                                title_filled = True
-                                print("[下書き投稿] 最初のinput要素にタイトルを入力しました")
-                                break
-                            except Exception as e:
-                                print(f"[下書き投稿] input要素への入力でエラー: {str(e)}")
-                                continue
-                
-                if not title_filled:
-                    raise Exception("タイトル入力欄が見つかりませんでした")
-                
-                await asyncio.sleep(2)
-                
-                print("[下書き投稿] 本文を入力します...")
-                content_filled = False
-                content_selectors = [
-                    'textarea[placeholder*="本文"]',
-                    'textarea[placeholder*="content"]',
-                    'textarea[placeholder*="Content"]',
-                    '[contenteditable="true"]',
-                    'div[contenteditable="true"]',
-                    'textarea',
-                    '.note-editor-body',
-                    '.editor-body',
-                    '[class*="editor"] textarea',
-                    '[class*="Editor"] textarea',
-                    '[class*="editor"] [contenteditable]',
-                    '[class*="Editor"] [contenteditable]',
-                    'div[role="textbox"]',
-                    'div[aria-label*="本文"]',
-                    'div[data-placeholder*="本文"]',
-                    'div[data-placeholder*="content"]',
-                    'section div[contenteditable="true"]'
-                ]
-                
+                    # ブラウザが壊れていれば閉じられるので、次の記事で再ログインする
+                    result = {"article_id": article.get("id"), "success": False, "error": str(e)}
+            print(f"[一括下書き投稿] {index}/{len(articles)} 記事ID {article.get('id')}: {'成功' if result['success'] else '失敗'}")
+            results.append(result)
+            if on_result is not None:
+                await on_result(result)
+        return results
+
+    async def _open_editor(self):
+        """トップページの「投稿」ボタンからエディタを開く（見つからなければURLに直接アクセス）"""
+        print(f"[下書き投稿] note.comのトップページに移動します...")
+        await self._goto(f'{NOTE_BASE_URL}/', wait_until='domcontentloaded', label="トップページ遷移")
+
+        print("[下書き投稿] 「投稿」ボタンを探します...")
+        post_button_selectors = [
+            'a:has-text("投稿")',
+            'button:has-text("投稿")',
+            'a[href*="/notes/new"]',
+            'a[href*="/mypage/notes/new"]',
+            '[class*="post"] a',
+            '[class*="Post"] a',
+            '[class*="投稿"]',
+            'a:has-text("新規投稿")',
+            'button:has-text("新規投稿")',
+            'a[href*="editor"]',
+            # 左上の投稿ボタン（より具体的なセレクター）
+            'header a:has-text("投稿")',
+            'nav a:has-text("投稿")',
+            '[role="navigation"] a:has-text("投稿")',
+            '.header a:has-text("投稿")',
+            '.nav a:has-text("投稿")'
+        ]
+
+        post_button = await self._wait_for_first(self.page, post_button_selectors, self.timeouts.element, "「投稿」ボタン", step="editor.post_button")
+        if post_button is not None:
+            try:
+                await post_button.click()
+                print("[下書き投稿] 「投稿」ボタンをクリックしました")
+            except Exception as e:
+                print(f"[下書き投稿] 「投稿」ボタンのクリックでエラー: {str(e)}")
+            if await self._wait_for_url(_is_editor_url, self.timeouts.navigation):
+                return
+
+        # 投稿ボタンが見つからない・エディタに遷移しない場合、直接URLにアクセス
+        print("[下書き投稿] エディタに遷移できていないため、直接URLにアクセスします...")
+        await self._goto(f'{NOTE_BASE_URL}/mypage/notes/new', wait_until='domcontentloaded', label="エディタ直接遷移")
+        await self._wait_for_url(_is_editor_url, self.timeouts.navigation)
+
+    async def _post_draft(self, title: str, content: str, checkpoint: DraftCheckpoint) -> Dict[str, any]:
+        if checkpoint.reached("saved"):
+            # 保存済みの下書きを再試行で二重に作らない
+            print("[下書き投稿] この記事は保存済みのため、前回の結果を返します")
+            return dict(checkpoint.result)
+        if checkpoint.stage is not None:
+            print(f"[下書き投稿] チェックポイント（{checkpoint.stage}まで完了）から再開します")
+
+        try:
+            # ログイン済みでない場合はログイン
+            if self.page is None or self.page.is_closed() or 'login' in self.page.url.lower():
+                print("[下書き投稿] ログインが必要です")
+                if not await self._login():
+                    raise Exception("ログインに失敗しました")
+
+            if checkpoint.editor_url is None and checkpoint.save_attempted:
+                # 前回の保存で下書きが作られている可能性があるため、新しいエディタは開かない
+                if checkpoint.draft_key is None:
+                    raise Exception("前回の保存で下書きが作成された可能性がありますが、下書きのURLが分からないため再開できません")
+                checkpoint.editor_url = NOTE_EDITOR_URL_TEMPLATE.format(key=checkpoint.draft_key)
+
+            if checkpoint.editor_url is None:
+                with span("editor_open", run_id=self.run_id):
+                    await self._open_editor()
+            elif self.page.url != checkpoint.editor_url:
+                # 新しい下書きを作らず、前回開いた下書きのエディタに戻る
+                print("[下書き投稿] 前回の下書きのエディタを開き直します")
+                with span("editor_open", run_id=self.run_id, resumed=True):
+                    await self._goto(checkpoint.editor_url, wait_until='domcontentloaded', label="エディタ再表示")
+            print(f"[下書き投稿] 現在のURL: {self.page.url}")
+
+            title_selectors = [
+                'input[placeholder*="タイトル"]',
+                'input[placeholder*="title"]',
+                'input[placeholder*="Title"]',
+                'input[type="text"]',
+                'textarea[placeholder*="タイトル"]',
+                '[contenteditable="true"][placeholder*="タイトル"]',
+                '[contenteditable="true"][placeholder*="title"]',
+                '.note-editor-title',
+                '.editor-title',
+                '[class*="title"] input',
+                '[class*="Title"] input',
+                'input'
+            ]
+
+            # エディタがiframe内に読み込まれている場合に対応
+            editor_contexts = [self.page]
+            try:
+                editor_frames = [frame for frame in self.page.frames if _is_editor_url(frame.url) and frame != self.page.main_frame]
+                if editor_frames:
+                    editor_contexts = editor_frames + editor_contexts
+                    print(f"[下書き投稿] エディタiframeを検出しました: {[frame.url for frame in editor_frames]}")
+            except Exception as e:
+                print(f"[下書き投稿] iframe検出中にエラー: {str(e)}")
+
+            # タイトル欄が表示されたらエディタの準備完了
+            print("[下書き投稿] タイトルを入力します...")
+            title_element = None
+            editor_context = self.page
+            with span("editor_detection", run_id=self.run_id) as detection:
                 for context in editor_contexts:
-                    context_label = getattr(context, 'url', None)
-                    for selector in content_selectors:
-                        try:
-                            content_element = context.locator(selector).first
-                            count = await content_element.count()
-                            if count > 0:
-                                try:
-                                    await content_element.wait_for(state="visible", timeout=15000)
-                                except PlaywrightTimeoutError as e:
-                                    print(f"[下書き投稿] 本文セレクター {selector} の可視化待機でタイムアウト: {str(e)}")
-                                
-                                try:
-                                    await content_element.scroll_into_view_if_needed()
-                                except Exception as e:
-                                    print(f"[下書き投稿] 本文セレクター {selector} のスクロールでエラー: {str(e)}")
-                                
-                                clicked = False
-                                for attempt in range(2):
-                                    try:
-                                        await content_element.click(timeout=5000)
-                                        clicked = True
-                                        break
-                                    except PlaywrightTimeoutError as e:
-                                        print(f"[下書き投稿] 本文セレクター {selector} のクリック{attempt+1}回目でタイムアウト: {str(e)}")
-                                        try:
-                                            await content_element.click(force=True, timeout=3000)
-                                            clicked = True
-                                            break
-                                        except PlaywrightTimeoutError as e2:
-                                            print(f"[下書き投稿] 本文セレクター {selector} のforceクリック{attempt+1}回目でタイムアウト: {str(e2)}")
-                                if not clicked:
-                                    try:
-                                        await content_element.evaluate("element => element.focus()", timeout=3000)
-                                        clicked = True
-                                    except Exception as e:
-                                        print(f"[下書き投稿] 本文セレクター {selector} のfocusでエラー: {str(e)}")
-                                
-                                is_contenteditable = await content_element.get_attribute('contenteditable')
-                                role_attr = await content_element.get_attribute('role')
-                                if is_contenteditable or (role_attr and role_attr.lower() == 'textbox'):
-                                    await content_element.evaluate(f'element => element.innerHTML = `{content.replace(chr(10), "<br>")}`')
-                                else:
-                                    filled_textarea = True
-                                    try:
-                                        await content_element.fill(content, timeout=5000)
-                                    except PlaywrightTimeoutError as e:
-                                        print(f"[下書き投稿] 本文セレクター {selector} のfillでタイムアウト: {str(e)}")
-                                        filled_textarea = False
-                                    if not filled_textarea:
-                                        try:
-                                            await content_element.evaluate(
-                                                """(element, value) => {
-                                                    if ('value' in element) {
-                                                        element.value = value;
-                                                        element.dispatchEvent(new Event('input', { bubbles: true }));
-                                                        element.dispatchEvent(new Event('change', { bubbles: true }));
-                                                    } else {
-                                                        element.innerHTML = value;
-                                                    }
-                                                }""",
-                                                content,
-                                            )
-                                        except Exception as e:
-                                            print(f"[下書き投稿] 本文セレクター {selector} のevaluate入力でエラー: {str(e)}")
-                                
-                                print(f"[下書き投稿] 本文を入力しました (コンテキスト: {context_label or 'page'}, セレクター: {selector})")
-                                content_filled = True
-                                break
-                        except Exception as e:
-                            print(f"[下書き投稿] 本文セレクター {selector} でエラー: {str(e)}")
-                            continue
-                    if content_filled:
+                    title_element = await self._wait_for_first(context, title_selectors, self.timeouts.editor, "タイトル入力欄", step="editor.title")
+                    if title_element is not None:
+                        editor_context = context
                         break
-                
-                if not content_filled:
-                    for context in editor_contexts:
-                        all_textareas = await context.locator('textarea, [contenteditable="true"], div[role="textbox"]').all()
-                        if len(all_textareas) > 0:
-                            try:
-                                element = all_textareas[0]
-                                await element.click()
-                                await asyncio.sleep(0.5)
-                                is_contenteditable = await element.get_attribute('contenteditable')
-                                role_attr = await element.get_attribute('role')
-                                if is_contenteditable or (role_attr and role_attr.lower() == 'textbox'):
-                                    await element.evaluate(f'element => element.innerHTML = `{content.replace(chr(10), "<br>")}`')
-                                else:
-                                    await element.fill(content)
-                                content_filled = True
-                                print("[下書き投稿] 最初のtextarea/contenteditable要素に本文を入力しました")
-                                break
-                            except Exception as e:
-                                print(f"[下書き投稿] textarea/contenteditable入力時にエラー: {str(e)}")
-                                continue
-                
-                if not content_filled:
+                detection["ok"] = title_element is not None
+
+            await self._capture('editor_page')
+
+            if title_element is None:
+                raise Exception("タイトル入力欄が見つかりませんでした")
+            # /notes/new からリダイレクトされた後の、下書きごとのエディタURLを記録
+            checkpoint.record_editor_url(self.page.url)
+            checkpoint.advance("editor_open")
+
+            if checkpoint.reached("title_filled") and (await title_element.evaluate(_READ_TEXT_JS) or '').strip() == title.strip():
+                print("[下書き投稿] タイトルは入力済みのためスキップします")
+            else:
+                with span("title_fill", run_id=self.run_id, selector=detection.get("selector"), length=len(title)) as title_span:
+                    title_span["ok"] = await self._fill(title_element, title, "タイトル")
+                if not title_span["ok"]:
+                    raise Exception("タイトルを入力できませんでした")
+                print(f"[下書き投稿] タイトルを入力しました (コンテキスト: {getattr(editor_context, 'url', None) or 'page'})")
+            checkpoint.advance("title_filled")
+
+            print("[下書き投稿] 本文を入力します...")
+            content_selectors = [
+                'textarea[placeholder*="本文"]',
+                'textarea[placeholder*="content"]',
+                'textarea[placeholder*="Content"]',
+                '[contenteditable="true"]',
+                'div[contenteditable="true"]',
+                'textarea',
+                '.note-editor-body',
+                '.editor-body',
+                '[class*="editor"] textarea',
+                '[class*="Editor"] textarea',
+                '[class*="editor"] [contenteditable]',
+                '[class*="Editor"] [contenteditable]',
+                'div[role="textbox"]',
+                'div[aria-label*="本文"]',
+                'div[data-placeholder*="本文"]',
+                'div[data-placeholder*="content"]',
+                'section div[contenteditable="true"]'
+            ]
+
+            with span("content_fill", run_id=self.run_id, length=len(content)) as content_span:
+                content_element = await self._wait_for_first(editor_context, content_selectors, self.timeouts.element, "本文入力欄", step="editor.content")
+                if content_element is None:
                     raise Exception("本文入力欄が見つかりませんでした")
-                
-                await asyncio.sleep(3)
-                
-                try:
-                    await self.page.screenshot(path='before_save.png', full_page=True, timeout=10000)
-                    print("[下書き投稿] 保存前のスクリーンショットを保存しました: before_save.png")
-                except PlaywrightTimeoutError as e:
-                    print(f"[下書き投稿] 保存前のスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(e)}")
-                except Exception as e:
-                    print(f"[下書き投稿] 保存前のスクリーンショット取得に失敗しましたが処理を続行します: {str(e)}")
-                
-                print("[下書き投稿] 下書き保存ボタンを探します...")
-                save_selectors = [
-                    'button:has-text("下書き保存")',
-                    'button:has-text("保存")',
-                    'button:has-text("下書き")',
-                    'button[type="submit"]',
-                    'a:has-text("下書き保存")',
-                    'a:has-text("保存")',
-                    '.save-draft',
-                    '.draft-save',
-                    '[class*="save"] button',
-                    '[class*="Save"] button',
-                    'button:has-text("Save")',
-                    '[data-testid*="save"]',
-                    '[data-testid*="Save"]'
-                ]
-                
-                saved = False
-                for selector in save_selectors:
-                    try:
-                        save_button = self.page.locator(selector).first
-                        if await save_button.count() > 0:
-                            await save_button.click()
-                            print(f"[下書き投稿] 保存ボタンをクリックしました (セレクター: {selector})")
-                            await asyncio.sleep(5)
-                            saved = True
-                            break
-                    except Exception as e:
-                        print(f"[下書き投稿] 保存ボタンセレクター {selector} でエラー: {str(e)}")
-                        continue
-                
-                if not saved:
-                    print("[下書き投稿] 保存ボタンが見つからないため、Ctrl+Sを試します")
-                    await self.page.keyboard.press('Control+s')
-                    await asyncio.sleep(3)
-                
-                await asyncio.sleep(3)
-                current_url = self.page.url
-                print(f"[下書き投稿] 保存後のURL: {current_url}")
-                
-                try:
-                    await self.page.screenshot(path='after_save.png', full_page=True, timeout=10000)
-                    print("[下書き投稿] 保存後のスクリーンショットを保存しました: after_save.png")
-                except PlaywrightTimeoutError as e:
-                    print(f"[下書き投稿] 保存後のスクリーンショット取得がタイムアウトしましたが処理を続行します: {str(e)}")
-                except Exception as e:
-                    print(f"[下書き投稿] 保存後のスクリーンショット取得に失敗しましたが処理を続行します: {str(e)}")
-                
-                success = 'draft' in current_url.lower() or 'mypage' in current_url.lower() or 'note' in current_url.lower()
-                
-                if success:
-                    print("[下書き投稿] 下書きを保存しました")
-                    return {
-                        "success": True,
-                        "message": "下書きを保存しました",
-                        "url": current_url
-                    }
+
+                expected = _count_visible_chars(content.replace('\r\n', '\n'))
+                if checkpoint.reached("body_filled") and await self._visible_chars_of(content_element) >= expected * BODY_MIN_LENGTH_RATIO:
+                    content_span["skipped"] = True
+                    print("[下書き投稿] 本文は入力済みのためスキップします")
                 else:
-                    error_elements = await self.page.locator('.error, .alert, [class*="error"], [role="alert"]').all()
-                    error_message = "不明なエラー"
-                    if len(error_elements) > 0:
-                        try:
-                            error_message = await error_elements[0].inner_text()
-                        except:
-                            pass
-                    raise Exception(f"下書き保存に失敗しました: {error_message}")
-                
+                    await content_element.click()
+                    await self._insert_body(content_element, content)
+                    print("[下書き投稿] 本文を入力しました")
+            checkpoint.advance("body_filled")
+
+            await self._capture('before_save')
+
+            print("[下書き投稿] 下書き保存ボタンを探します...")
+            save_selectors = [
+                'button:has-text("下書き保存")',
+                'button:has-text("保存")',
+                'button:has-text("下書き")',
+                'button[type="submit"]',
+                'a:has-text("下書き保存")',
+                'a:has-text("保存")',
+                '.save-draft',
+                '.draft-save',
+                '[class*="save"] button',
+                '[class*="Save"] button',
+                'button:has-text("Save")',
+                '[data-testid*="save"]',
+                '[data-testid*="Save"]'
+            ]
+
+            # 保存APIのレスポンスが返ってきたら保存完了（クリック前から待ち受ける）
+            response_waiter = asyncio.ensure_future(
+                self.page.wait_for_event('response', predicate=_is_draft_save_response, timeout=self.timeouts.save)
+            )
+            await asyncio.sleep(0)
+            url_before_save = self.page.url
+            # ここから先の失敗では下書きが作られている可能性があるので、再試行で新しいエディタを開かない
+            checkpoint.save_attempted = True
+            try:
+                with span("save_click", run_id=self.run_id):
+                    save_button = await self._wait_for_first(self.page, save_selectors, self.timeouts.element, "保存ボタン", step="editor.save")
+                    if save_button is not None:
+                        await save_button.click()
+                        print("[下書き投稿] 保存ボタンをクリックしました")
+                    else:
+                        print("[下書き投稿] 保存ボタンが見つからないため、Ctrl+Sを試します")
+                        await self.page.keyboard.press('Control+s')
+            except Exception:
+                response_waiter.cancel()
+                raise
+
+            save_response = None
+            try:
+                with span("save_confirmation", run_id=self.run_id) as confirmation:
+                    save_response = await response_waiter
+                    confirmation["status"] = save_response.status
+                    confirmation["ok"] = save_response.ok
+                if checkpoint.draft_key is None:
+                    checkpoint.draft_key = await _draft_key_of_response(save_response)
+                print(f"[下書き投稿] 下書き保存のレスポンスを受信しました (status: {save_response.status}, url: {save_response.url})")
+            except PlaywrightTimeoutError:
+                print(f"[下書き投稿] {self.timeouts.save}ms以内に下書き保存のレスポンスを確認できませんでした")
+
+            current_url = self.page.url
+            print(f"[下書き投稿] 保存後のURL: {current_url}")
+            checkpoint.record_editor_url(current_url)
+            await self._capture('after_save')
+
+            if save_response is not None:
+                success = save_response.ok
+            else:
+                # 保存APIの応答が見えない場合は、保存によって下書きのエディタURLへ移動したときだけ保存済みとみなす
+                success = current_url != url_before_save and _DRAFT_EDITOR_URL_PATTERN.search(current_url) is not None
+                if not success:
+                    print("[下書き投稿] 保存を確認できないため、失敗として扱います")
+
+            if success:
+                print("[下書き投稿] 下書きを保存しました")
+                checkpoint.result = {
+                    "success": True,
+                    "message": "下書きを保存しました",
+                    "url": current_url
+                }
+                checkpoint.advance("saved")
+                return dict(checkpoint.result)
+            else:
+                error_elements = await self.page.locator('.error, .alert, [class*="error"], [role="alert"]').all()
+                error_message = f"保存APIがステータス{save_response.status}を返しました" if save_response is not None else "保存APIの応答も下書きのエディタURLへの移動も確認できませんでした"
+                if len(error_elements) > 0:
+                    try:
+                        error_message = await error_elements[0].inner_text()
+                    except:
+                        pass
+                raise Exception(f"下書き保存に失敗しました: {error_message}")
+
         except Exception as e:
             import traceback
             error_msg = str(e)
             error_traceback = traceback.format_exc()
             print(f"[下書き投稿エラー] {error_msg}")
             print(f"[下書き投稿エラー詳細]\n{error_traceback}")
+            await self._capture('post_error', on_error=True)
             try:
-                if self.page:
-                    screenshot_path = f'error_screenshot_{int(time.time())}.png'
-                    try:
-                        if USE_SYNC:
-                            self.page.screenshot(path=screenshot_path, full_page=True, timeout=10000)
-                        else:
-                            await self.page.screenshot(path=screenshot_path, full_page=True, timeout=10000)
-                        print(f"[下書き投稿エラー] スクリーンショットを保存: {screenshot_path}")
-                    except PlaywrightTimeoutError as capture_timeout:
-                        print(f"[下書き投稿エラー] スクリーンショット取得がタイムアウトしましたが処理を続行します: {str(capture_timeout)}")
-                    except Exception as capture_error:
-                        print(f"[下書き投稿エラー] スクリーンショット保存に失敗しましたが処理を続行します: {str(capture_error)}")
-            except Exception as screenshot_error:
-                print(f"[下書き投稿エラー] スクリーンショット処理で予期せぬエラー: {str(screenshot_error)}")
-            # ブラウザを閉じる
-            try:
-                await self._close_browser()
-            except:
+                checkpoint.record_editor_url(self.page.url if self.page is not None else None)
+            except Exception:
                 pass
+            if await self._is_healthy():
+                # ログイン状態と入力済みのエディタを残し、再試行ではチェックポイントから再開する
+                print(f"[下書き投稿] ブラウザを保持します（完了した手順: {checkpoint.stage or 'なし'}）")
+            else:
+                try:
+                    await self._close_browser()
+                except:
+                    pass
             raise Exception(f"下書き投稿エラー: {error_msg}")
-        finally:
-            # ブラウザは閉じずに保持（次回の投稿で再利用可能）
-            pass
@@ -0,0 +1,176 @@
+"""
+ログイン済みNoteServiceのプール（note.comアカウント単位）
+ブラウザ起動とログインを投稿ごとに繰り返さず、同じアカウントの連続投稿で使い回す
+"""
+from typing import Dict, List, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import os
+import time
+
+from services.note_service import NoteService
+
+
+class _PooledSession:
+    def __init__(self, service: NoteService, credential_hash: str):
+        self.service = service
+        self.credential_hash = credential_hash
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.released_at = time.monotonic()
+
+
+class NoteSessionPool:
+    """note.comアカウントごとのログイン済みブラウザを貸し出すプール"""
+
+    def __init__(
+        self,
+        max_idle_per_account: int = 1,
+        max_uses: int = 20,
+        max_idle_seconds: float = 600,
+        max_browsers: Optional[int] = None
+    ):
+        """
+        Args:
+            max_idle_per_account: アカウントごとに保持しておく待機中セッション数
+            max_uses: この回数使ったセッションは返却時に閉じて作り直す
+            max_idle_seconds: この秒数使われなかった待機中セッションは閉じる
+            max_browsers: 貸出中と待機中を合わせたブラウザ数の上限（超える場合は待機中のものから閉じる）
+        """
+        self.max_idle_per_account = max_idle_per_account
+        self.max_uses = max_uses
+        self.max_idle_seconds = max_idle_seconds
+        self.max_browsers = max_browsers
+        self._idle: Dict[str, List[_PooledSession]] = {}
+        self._leased = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"created": 0, "reused": 0, "recycled": 0, "discarded": 0, "evicted": 0}
+
+    @staticmethod
+    def _credential_hash(note_id: str, note_password: str) -> str:
+        return hashlib.sha256(f"{note_id}\0{note_password}".encode("utf-8")).hexdigest()
+
+    @asynccontextmanager
+    async def lease(self, note_id: str, note_password: str) -> AsyncIterator[NoteService]:
+        """
+        ログイン済みNoteServiceを借りる（ブロックを抜けると返却、ブラウザが壊れていれば破棄）
+
+        投稿に失敗してもブラウザが正常なら返却する（ログイン状態を次の再試行で使い回す）。
+
+        Playwrightのオブジェクトは作成したイベントループでしか使えないため、
+        プールを作ったループ以外からの呼び出しではプールを使わず使い捨てのNoteServiceを渡す。
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        if loop is not self._loop:
+            service = NoteService(note_id=note_id, note_password=note_password)
+            try:
+                yield service
+            finally:
+                await service.close()
+            return
+
+        entry = await self._acquire(note_id, note_password)
+        self._leased += 1
+        try:
+            yield entry.service
+        finally:
+            self._leased -= 1
+            await self._release(note_id, entry)
+
+    async def _acquire(self, note_id: str, note_password: str) -> _PooledSession:
+        await self._reap_idle()
+        credential_hash = self._credential_hash(note_id, note_password)
+        idle = self._idle.get(note_id, [])
+        while idle:
+            entry = idle.pop()
+            if entry.credential_hash == credential_hash and await entry.service.is_healthy():
+                self.stats["reused"] += 1
+                print(f"[セッションプール] ログイン済みブラウザを再利用します ({note_id}, 使用回数: {entry.uses})")
+                return entry
+            self.stats["discarded"] += 1
+            await entry.service.close()
+
+        await self._evict_for_new_browser()
+        service = NoteService(note_id=note_id, note_password=note_password)
+        if not await service.login():
+            await service.close()
+            raise Exception("ログインに失敗しました")
+        self.stats["created"] += 1
+        print(f"[セッションプール] 新しいブラウザでログインしました ({note_id})")
+        return _PooledSession(service, credential_hash)
+
+    async def _release(self, note_id: str, entry: _PooledSession):
+        entry.uses += 1
+        entry.released_at = time.monotonic()
+        idle = self._idle.setdefault(note_id, [])
+
+        if not await entry.service.is_healthy():
+            self.stats["discarded"] += 1
+            await entry.service.close()
+        elif entry.uses >= self.max_uses:
+            self.stats["recycled"] += 1
+            print(f"[セッションプール] 使用回数の上限に達したためブラウザを閉じます ({note_id})")
+            await entry.service.close()
+        elif len(idle) >= self.max_idle_per_account or self._over_browser_limit(1):
+            await entry.service.close()
+        else:
+            idle.append(entry)
+
+    def _idle_count(self) -> int:
+        return sum(len(idle) for idle in self._idle.values())
+
+    def _over_browser_limit(self, adding: int) -> bool:
+        return self.max_browsers is not None and self._leased + self._idle_count() + adding > self.max_browsers
+
+    async def _evict_for_new_browser(self):
+        """新しいブラウザを起動すると上限を超える場合、最も長く使われていない待機中セッションを閉じる"""
+        while self._over_browser_limit(1) and self._idle_count() > 0:
+            note_id, entry = min(
+                ((note_id, e) for note_id, idle in self._idle.items() for e in idle),
+                key=lambda item: item[1].released_at
+            )
+            self._idle[note_id].remove(entry)
+            if not self._idle[note_id]:
+                del self._idle[note_id]
+            self.stats["evicted"] += 1
+            print("[セッションプール] ブラウザ数の上限のため待機中のブラウザを閉じます")
+            await entry.service.close()
+
+    async def _reap_idle(self):
+        """長時間使われていない待機中セッションを閉じる"""
+        now = time.monotonic()
+        for note_id, idle in list(self._idle.items()):
+            expired = [e for e in idle if now - e.released_at > self.max_idle_seconds]
+            for entry in expired:
+                idle.remove(entry)
+                await entry.service.close()
+            if not idle:
+                del self._idle[note_id]
+
+    async def close_all(self):
+        """待機中のセッションをすべて閉じる"""
+        for idle in self._idle.values():
+            for entry in idle:
+                await entry.service.close()
+        self._idle.clear()
+
+    def get_info(self) -> Dict:
+        """プールの状態を取得（アカウントIDは含めない）"""
+        return {
+            "idle_accounts": len(self._idle),
+            "idle_sessions": self._idle_count(),
+            "leased": self._leased,
+            **self.stats
+        }
+
+
+def create_pool_from_env() -> NoteSessionPool:
+    """環境変数の設定でプールを作成"""
+    return NoteSessionPool(
+        max_idle_per_account=int(os.getenv("NOTE_POOL_MAX_IDLE_PER_ACCOUNT", "1")),
+        max_uses=int(os.getenv("NOTE_POOL_MAX_USES", "20")),
+        max_idle_seconds=float(os.getenv("NOTE_POOL_MAX_IDLE_SECONDS", "600"))
+    )
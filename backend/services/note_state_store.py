@@ -0,0 +1,142 @@
+"""
+note.comのログイン状態（Playwrightのstorage_state）をアカウントごとに暗号化して保存する
+次回起動時にこの状態を復元すれば、メールアドレス・パスワードの入力を省略できる
+
+暗号化キーは環境変数 NOTE_STATE_KEY で渡すのが推奨。未設定の場合は保存先とは別の場所
+（NOTE_STATE_KEY_FILE、既定: ~/.note_state.key）に所有者のみ読める権限で生成する。
+"""
+from typing import Dict, Optional
+import hashlib
+import json
+import os
+import stat
+
+from cryptography.fernet import Fernet, InvalidToken
+
+DEFAULT_KEY_FILE = os.path.join("~", ".note_state.key")
+
+# 以前のバージョンが保存先ディレクトリ内に作成していたキーファイル名
+_LEGACY_KEY_NAME = ".key"
+
+
+class NoteStateStore:
+    """storage_stateをFernetで暗号化してファイルに保存するストア"""
+
+    def __init__(self, directory: str, key: Optional[bytes] = None, key_path: Optional[str] = None):
+        """
+        Args:
+            directory: 保存先ディレクトリ
+            key: Fernetキー（省略時はkey_pathのファイルを使用、なければ生成）
+            key_path: キーファイルのパス（省略時は DEFAULT_KEY_FILE）。暗号文と一緒に読まれないよう保存先の外に置く
+        """
+        self.directory = directory
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        self._fernet = Fernet(key or self._load_or_create_key(os.path.expanduser(key_path or DEFAULT_KEY_FILE)))
+
+    def _load_or_create_key(self, key_path: str) -> bytes:
+        if self._is_inside_directory(key_path):
+            print(
+                f"[ログイン状態] 警告: 暗号化キー {key_path} が保存先 {self.directory} の中にあります。"
+                f"暗号文を読める人はキーも読めるため、NOTE_STATE_KEY を設定するか保存先の外に置いてください"
+            )
+        if not os.path.exists(key_path):
+            legacy_path = os.path.join(self.directory, _LEGACY_KEY_NAME)
+            if os.path.exists(legacy_path) and os.path.abspath(legacy_path) != os.path.abspath(key_path):
+                # 保存済みの状態を復号できるよう、旧キーを保存先の外へ移す
+                with open(legacy_path, "rb") as f:
+                    self._write_private(key_path, f.read().strip())
+                os.remove(legacy_path)
+                print(f"[ログイン状態] 暗号化キーを保存先の外（{key_path}）に移動しました")
+
+        if os.path.exists(key_path):
+            self._restrict_permissions(key_path)
+            with open(key_path, "rb") as f:
+                return f.read().strip()
+        key = Fernet.generate_key()
+        self._write_private(key_path, key)
+        print(f"[ログイン状態] 暗号化キーを生成しました: {key_path}（NOTE_STATE_KEY の設定を推奨）")
+        return key
+
+    def _is_inside_directory(self, path: str) -> bool:
+        directory = os.path.realpath(self.directory)
+        try:
+            return os.path.commonpath([directory, os.path.realpath(path)]) == directory
+        except ValueError:
+            # Windowsでドライブが異なる場合
+            return False
+
+    @staticmethod
+    def _restrict_permissions(path: str):
+        """キーファイルを所有者以外が読める場合は0600に戻す（権限のないWindowsでは何もしない）"""
+        if os.name != "posix":
+            return
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+        if mode & 0o077:
+            os.chmod(path, 0o600)
+            print(f"[ログイン状態] 警告: 暗号化キー {path} の権限 {oct(mode)} を0600に変更しました")
+
+    @staticmethod
+    def _write_private(path: str, data: bytes):
+        """所有者のみ読み書きできる権限で、一時ファイル経由で置き換える"""
+        tmp_path = f"{path}.tmp"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _path(self, note_id: str) -> str:
+        # ファイル名にメールアドレスを残さない
+        name = hashlib.sha256(note_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{name}.state")
+
+    def load(self, note_id: str) -> Optional[Dict]:
+        """保存済みのstorage_stateを取得（なければ・復号できなければNone）"""
+        path = self._path(note_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return json.loads(self._fernet.decrypt(f.read()))
+        except (InvalidToken, ValueError, OSError) as e:
+            print(f"[ログイン状態] 保存済みの状態を読み込めませんでした（破棄します）: {str(e)}")
+            self.delete(note_id)
+            return None
+
+    def save(self, note_id: str, state: Dict):
+        """storage_stateを暗号化して保存"""
+        token = self._fernet.encrypt(json.dumps(state).encode("utf-8"))
+        self._write_private(self._path(note_id), token)
+
+    def delete(self, note_id: str):
+        """保存済みのstorage_stateを削除"""
+        try:
+            os.remove(self._path(note_id))
+        except FileNotFoundError:
+            pass
+
+
+_default_store: Optional[NoteStateStore] = None
+
+
+def get_default_state_store() -> Optional[NoteStateStore]:
+    """
+    環境変数の設定で共有ストアを取得（NOTE_STATE_PERSISTが無効ならNone）
+
+    NOTE_STATE_DIR: 保存先ディレクトリ（既定: note_state）
+    NOTE_STATE_KEY: Fernetキー（推奨。複数インスタンスで共有する場合も指定）
+    NOTE_STATE_KEY_FILE: NOTE_STATE_KEY未設定時のキーファイル（既定: ~/.note_state.key、保存先の外に置くこと）
+    """
+    global _default_store
+    if os.getenv("NOTE_STATE_PERSIST", "true").strip().lower() not in ("1", "true", "yes", "on"):
+        return None
+    if _default_store is None:
+        key = os.getenv("NOTE_STATE_KEY")
+        _default_store = NoteStateStore(
+            directory=os.getenv("NOTE_STATE_DIR", "note_state"),
+            key=key.encode("utf-8") if key else None,
+            key_path=os.getenv("NOTE_STATE_KEY_FILE") or None
+        )
+    return _default_store
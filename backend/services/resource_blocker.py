@@ -0,0 +1,166 @@
+"""
+Playwrightのルートインターセプトで不要なリソース（画像・フォント・動画・広告/解析）を読み込まないようにする
+ブロックした件数と、読み込まずに済んだバイト数の推定値をポリシーごとに集計する
+（ブロックしたリクエストは応答を受け取らないため実際のサイズは測れない）
+"""
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+import os
+import threading
+
+# ログイン・エディタ・トレンド表のどれにも不要なリソースタイプ
+DEFAULT_BLOCKED_TYPES = ("image", "font", "media")
+
+# 広告・アクセス解析のドメイン（サブドメインも対象）
+DEFAULT_BLOCKED_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "clarity.ms",
+    "criteo.com",
+    "criteo.net",
+    "ads-twitter.com",
+    "analytics.twitter.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+)
+
+# ブロックしたリクエストは実際のサイズが分からないため、リソースタイプごとの典型的なサイズで推定する
+_ESTIMATED_BYTES = {
+    "image": 40_000,
+    "font": 50_000,
+    "media": 500_000,
+    "script": 60_000,
+    "stylesheet": 20_000,
+}
+_DEFAULT_ESTIMATED_BYTES = 10_000
+BYTES_SAVED_ESTIMATE_BASIS = "推定値（実測ではなく、ブロックした件数 × リソースタイプごとの典型的なサイズ）"
+
+
+def _parse_list(value: Optional[str], default: Iterable[str]) -> List[str]:
+    if value is None:
+        return list(default)
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+class ResourceBlocker:
+    """リソースのブロックポリシーと集計（コンテキストにinstall/install_syncして使う）"""
+
+    def __init__(
+        self,
+        name: str,
+        blocked_types: Iterable[str] = DEFAULT_BLOCKED_TYPES,
+        blocked_domains: Iterable[str] = DEFAULT_BLOCKED_DOMAINS,
+        enabled: bool = True
+    ):
+        """
+        Args:
+            name: 集計の表示名
+            blocked_types: ブロックするPlaywrightのresource_type（image, font, media, stylesheetなど）
+            blocked_domains: ブロックするドメイン（サブドメインも対象）
+            enabled: Falseならインターセプトを設定しない
+        """
+        self.name = name
+        self.blocked_types = frozenset(t.lower() for t in blocked_types)
+        self.blocked_domains = tuple(d.lower().lstrip(".") for d in blocked_domains)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.blocked = 0
+        self.blocked_by_type: Dict[str, int] = {}
+        self.bytes_saved_estimate = 0
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, default_types: Iterable[str] = DEFAULT_BLOCKED_TYPES) -> "ResourceBlocker":
+        """
+        環境変数からポリシーを作成
+
+        <prefix>_BLOCK_RESOURCES: 0/falseで無効化
+        <prefix>_BLOCK_RESOURCE_TYPES: ブロックするリソースタイプ（カンマ区切り）
+        <prefix>_BLOCK_DOMAINS: 既定のドメインに追加でブロックするドメイン（カンマ区切り）
+        """
+        enabled = os.getenv(f"{prefix}_BLOCK_RESOURCES", "true").strip().lower() in ("1", "true", "yes", "on")
+        blocked_types = _parse_list(os.getenv(f"{prefix}_BLOCK_RESOURCE_TYPES"), default_types)
+        blocked_domains = list(DEFAULT_BLOCKED_DOMAINS) + _parse_list(os.getenv(f"{prefix}_BLOCK_DOMAINS"), ())
+        return register(cls(name, blocked_types, blocked_domains, enabled))
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        """リクエストをブロックするか判定"""
+        if resource_type in self.blocked_types:
+            return True
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == domain or host.endswith(f".{domain}") for domain in self.blocked_domains)
+
+    def _count(self, blocked: bool, resource_type: str):
+        with self._lock:
+            if not blocked:
+                self.allowed += 1
+                return
+            self.blocked += 1
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+            self.bytes_saved_estimate += _ESTIMATED_BYTES.get(resource_type, _DEFAULT_ESTIMATED_BYTES)
+
+    async def install(self, context):
+        """async APIのBrowserContextにインターセプトを設定"""
+        if not self.enabled:
+            return
+
+        async def handle(route):
+            request = route.request
+            blocked = self.should_block(request.resource_type, request.url)
+            self._count(blocked, request.resource_type)
+            if blocked:
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await context.route("**/*", handle)
+
+    def install_sync(self, context):
+        """sync APIのBrowserContextにインターセプトを設定"""
+        if not self.enabled:
+            return
+
+        def handle(route):
+            request = route.request
+            blocked = self.should_block(request.resource_type, request.url)
+            self._count(blocked, request.resource_type)
+            if blocked:
+                route.abort()
+            else:
+                route.continue_()
+
+        context.route("**/*", handle)
+
+    def stats(self) -> Dict:
+        """集計を取得"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "blocked_types": sorted(self.blocked_types),
+                "allowed_requests": self.allowed,
+                "blocked_requests": self.blocked,
+                "blocked_by_type": dict(self.blocked_by_type),
+                "bytes_saved_estimate": self.bytes_saved_estimate,
+                "bytes_saved_estimate_basis": BYTES_SAVED_ESTIMATE_BASIS
+            }
+
+
+_blockers: Dict[str, ResourceBlocker] = {}
+
+
+def register(blocker: ResourceBlocker) -> ResourceBlocker:
+    """集計対象として登録"""
+    _blockers[blocker.name] = blocker
+    return blocker
+
+
+def get_all_stats() -> Dict[str, Dict]:
+    """登録済みの全ポリシーの集計を取得"""
+    return {name: blocker.stats() for name, blocker in _blockers.items()}
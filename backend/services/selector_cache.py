@@ -0,0 +1,95 @@
+"""
+セレクター解決キャッシュ（手順ごとに前回一致したセレクターを記録してファイルに保存）
+次回はそのセレクターを候補の先頭で試し、見つからなかった場合は記録を外す
+"""
+from typing import Dict, List, Optional
+import json
+import os
+import threading
+
+
+class SelectorCache:
+    """手順名 → 前回一致したセレクター のキャッシュ（スレッドセーフ、変更時のみ保存）"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 保存先のJSONファイル（Noneならメモリ上のみ）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._winners: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._winners = {str(k): str(v) for k, v in data.items()}
+        except (OSError, ValueError) as e:
+            print(f"[セレクターキャッシュ] 読み込みに失敗しました（空で開始します）: {str(e)}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._winners, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[セレクターキャッシュ] 保存に失敗しました: {str(e)}")
+
+    def order(self, step: str, selectors: List[str]) -> List[str]:
+        """前回一致したセレクターを先頭にした候補リストを返す"""
+        with self._lock:
+            winner = self._winners.get(step)
+        if winner in selectors:
+            return [winner] + [s for s in selectors if s != winner]
+        return list(selectors)
+
+    def record_success(self, step: str, selector: str):
+        """一致したセレクターを記録"""
+        with self._lock:
+            if self._winners.get(step) == selector:
+                self.hits += 1
+                return
+            self.misses += 1
+            self._winners[step] = selector
+            self._save()
+
+    def record_failure(self, step: str):
+        """どの候補も見つからなかった手順の記録を外す"""
+        with self._lock:
+            self.misses += 1
+            if self._winners.pop(step, None) is not None:
+                self._save()
+
+    def stats(self) -> Dict:
+        """キャッシュ情報を取得"""
+        with self._lock:
+            return {"steps": dict(self._winners), "hits": self.hits, "misses": self.misses}
+
+
+_default_cache: Optional[SelectorCache] = None
+
+
+def get_default_selector_cache() -> SelectorCache:
+    """
+    共有キャッシュを取得
+
+    NOTE_SELECTOR_CACHE_FILE: 保存先（既定: note_state/selectors.json、空文字ならメモリ上のみ）
+    """
+    global _default_cache
+    if _default_cache is None:
+        path = os.getenv("NOTE_SELECTOR_CACHE_FILE", os.path.join("note_state", "selectors.json"))
+        _default_cache = SelectorCache(path or None)
+    return _default_cache
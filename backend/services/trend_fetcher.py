@@ -0,0 +1,279 @@
+"""
+twittrend.jpのトレンド表をHTTPで取得してHTMLパーサーで抽出する（ブラウザを起動しない）
+トレンド表は静的なHTMLなので、aiohttpの接続プールで取得して標準のHTMLParserで1回走査するだけで読める
+ETag/Last-Modifiedで条件付きリクエストを送り、変更がなければ（304または同じ本文）解析を省略する
+"""
+from typing import Dict, List, Optional, Tuple
+from html.parser import HTMLParser
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import weakref
+
+import aiohttp
+
+from metrics import span
+
+# 日本のトレンド（twittrend.jp）
+TREND_URL = "https://twittrend.jp/compare/result/23424856/1/"
+
+# キーワードとして扱うリンク（Xの検索へのリンク）
+TREND_LINK_HREF = "twitter.com/search"
+
+# リンクのテキストでもキーワードとして扱わないもの
+_SKIP_KEYWORDS = frozenset(['ツイート', 'Tweet', '検索', 'Search'])
+
+_TWEET_COUNT_PATTERN = re.compile(r'(\d+(?:,\d+)*)\s*件のツイート')
+
+_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Language": "ja-JP,ja;q=0.9",
+}
+
+
+class _TrendTableParser(HTMLParser):
+    """
+    表の各行の最初のセル（日本列）のテキストと、その中の検索リンクのテキストを集める
+    ページ内のすべての検索リンクのテキストも集める（表から取れない場合の予備）
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: List[Dict[str, Optional[str]]] = []
+        self.links: List[str] = []
+        self._table_depth = 0
+        self._cell_index = -1
+        self._in_first_cell = False
+        self._cell_text: List[str] = []
+        self._cell_link: Optional[str] = None
+        self._link_depth = 0
+        self._link_text: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._table_depth += 1
+        elif tag == "tr" and self._table_depth:
+            self._finish_cell()
+            self._cell_index = -1
+            self.rows.append({"cell_text": None, "link_text": None})
+        elif tag in ("td", "th") and self._table_depth and self.rows:
+            self._finish_cell()
+            self._cell_index += 1
+            if self._cell_index == 0 and tag == "td":
+                self._in_first_cell = True
+                self._cell_text = []
+                self._cell_link = None
+        elif tag == "a":
+            if self._link_depth:
+                self._link_depth += 1
+            elif TREND_LINK_HREF in (dict(attrs).get("href") or ""):
+                self._link_depth = 1
+                self._link_text = []
+        elif tag == "br" and self._in_first_cell:
+            self._cell_text.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._link_depth:
+            self._link_depth -= 1
+            if self._link_depth == 0:
+                # innerTextと同じく連続する空白を1つにまとめる
+                text = " ".join("".join(self._link_text).split())
+                self.links.append(text)
+                if self._in_first_cell and self._cell_link is None:
+                    self._cell_link = text
+        elif tag in ("td", "th"):
+            self._finish_cell()
+        elif tag == "tr":
+            self._finish_cell()
+        elif tag == "table" and self._table_depth:
+            self._finish_cell()
+            self._table_depth -= 1
+
+    def handle_data(self, data):
+        if self._link_depth:
+            self._link_text.append(data)
+        if self._in_first_cell:
+            self._cell_text.append(data)
+
+    def _finish_cell(self):
+        if not self._in_first_cell:
+            return
+        self._in_first_cell = False
+        if self.rows:
+            self.rows[-1]["cell_text"] = "".join(self._cell_text).strip()
+            self.rows[-1]["link_text"] = self._cell_link
+
+
+def _parse_tweet_count(cell_text: str) -> Optional[int]:
+    match = _TWEET_COUNT_PATTERN.search(cell_text or "")
+    if match is None:
+        return None
+    try:
+        return int(match.group(1).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def build_trends(rows: List[Optional[Dict]], links: List[str], limit: int) -> List[Dict]:
+    """
+    表の行とリンクのテキストからトレンドを組み立てる（HTTP取得・ブラウザ取得で共通の規則）
+
+    各行の最初のセルにある検索リンクをキーワード、セルの「N件のツイート」をツイート数とし、
+    足りなければページ内の検索リンクから補う。重複はsetで除く。
+
+    Args:
+        rows: ヘッダー行を除いた行（{"cell_text", "link_text"}、セルのない行はNone）
+        links: ページ内の検索リンクのテキスト
+        limit: 取得する件数
+
+    Returns:
+        トレンドのリスト [{"keyword": "トレンド名", "tweet_count": 数値またはNone}]
+    """
+    trends: List[Dict] = []
+    seen = set()
+    for row in rows:
+        if len(trends) >= limit:
+            break
+        if not row:
+            continue
+        keyword = (row.get("link_text") or "").replace('#', '').strip()
+        if keyword and keyword not in seen:
+            seen.add(keyword)
+            trends.append({"keyword": keyword, "tweet_count": _parse_tweet_count(row.get("cell_text"))})
+
+    for link_text in links:
+        if len(trends) >= limit:
+            break
+        keyword = link_text.replace('#', '').strip()
+        if not keyword or len(keyword) > 100 or keyword in _SKIP_KEYWORDS or keyword in seen:
+            continue
+        seen.add(keyword)
+        trends.append({"keyword": keyword, "tweet_count": None})
+    return trends
+
+
+def trends_digest(trends: List[Dict]) -> str:
+    """トレンド一覧の内容のハッシュ（変更の検出用）"""
+    return hashlib.sha256(json.dumps(trends, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def parse_trends_html(html: str, limit: int) -> List[Dict]:
+    """トレンド表のHTMLを1回走査してトレンドを抽出"""
+    parser = _TrendTableParser()
+    parser.feed(html)
+    parser.close()
+    return build_trends(parser.rows[1:], parser.links, limit)  # ヘッダー行をスキップ
+
+
+class TrendHttpFetcher:
+    """aiohttpの接続プールを使い回してトレンド表を取得する（イベントループごとにセッションを持つ）"""
+
+    def __init__(self, url: str = TREND_URL, timeout_seconds: Optional[float] = None):
+        """
+        Args:
+            url: トレンド表のURL
+            timeout_seconds: 1回の取得のタイムアウト（省略時は環境変数 TREND_HTTP_TIMEOUT_SECONDS、既定10秒）
+        """
+        self.url = url
+        if timeout_seconds is None:
+            timeout_seconds = float(os.getenv("TREND_HTTP_TIMEOUT_SECONDS", "10"))
+        self.timeout_seconds = timeout_seconds
+        # ClientSessionは作成したループでしか使えないため、ループごとに保持する
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+        # 条件付きリクエスト用の検証子と、前回の本文のハッシュ・解析結果
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.body_hash: Optional[str] = None
+        self._trends: Optional[List[Dict]] = None
+        self._parsed_limit = 0
+        self.stats = {"requests": 0, "not_modified": 0, "same_body": 0, "parsed": 0}
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=4, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers=_HEADERS
+            )
+            self._sessions[loop] = session
+        return session
+
+    async def fetch_html(self, revalidate: bool) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        トレンド表のHTMLを取得
+
+        Args:
+            revalidate: 前回の検証子で条件付きリクエストを送るか
+
+        Returns:
+            (HTML, ETag, Last-Modified)（304で変更がなかった場合のHTMLはNone）
+        """
+        headers = {}
+        if revalidate:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        self.stats["requests"] += 1
+        async with self._session().get(self.url, headers=headers) as response:
+            if response.status == 304 and headers:
+                return None, self.etag, self.last_modified
+            response.raise_for_status()
+            return await response.text(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    async def fetch(self, limit: int) -> List[Dict]:
+        """
+        トレンド表を取得して抽出（取得できなければ例外、表が見つからなければ空のリスト）
+        前回と変わっていなければ解析せず、前回の結果を返す
+        """
+        started = time.perf_counter()
+        # 前回より多くの件数が必要な場合は解析し直すため、条件付きにしない
+        revalidate = self._trends is not None and limit <= self._parsed_limit
+        html, etag, last_modified = await self.fetch_html(revalidate)
+        fetched = time.perf_counter()
+        if html is None:
+            self.stats["not_modified"] += 1
+            print(f"[トレンド取得] トレンド表は更新されていません (304, {(fetched - started) * 1000:.0f}ms)")
+            return self._trends[:limit]
+
+        body_hash = hashlib.sha256(html.encode("utf-8")).hexdigest()
+        if revalidate and body_hash == self.body_hash:
+            self.stats["same_body"] += 1
+            print(f"[トレンド取得] 前回と同じ内容のため解析を省略しました ({(fetched - started) * 1000:.0f}ms)")
+            return self._trends[:limit]
+
+        with span("trend_extract", method="http", bytes=len(html)) as extract_span:
+            trends = parse_trends_html(html, limit)
+            extract_span["count"] = len(trends)
+        self.stats["parsed"] += 1
+        if trends:
+            # 表が取れた場合だけ検証子を更新する（取れなかったページで304を受けないように）
+            self._trends = trends
+            self._parsed_limit = limit
+            self.body_hash = body_hash
+            self.etag = etag
+            self.last_modified = last_modified
+        print(
+            f"[トレンド取得] HTTPで{len(trends)}件を取得しました "
+            f"(取得 {(fetched - started) * 1000:.0f}ms, 解析 {(time.perf_counter() - fetched) * 1000:.0f}ms, {len(html) // 1024}KB)"
+        )
+        return trends
+
+    async def close(self):
+        """現在のループのセッションを閉じる"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
@@ -1,23 +1,61 @@
 """
-X（Twitter）のトレンドをtwscrape/Playwrightで取得するサービス
+X（Twitter）のトレンドをtwittrend.jpから取得するサービス
+通常はHTTPで取得してHTMLを解析し、取得できない場合だけPlaywrightでスクレイピングする
 バックグラウンドで定期的にトレンドを取得してキャッシュ
 """
 from typing import List, Dict, Optional, Any
 import asyncio
+import json
 import threading
 import schedule
 import time
 from datetime import datetime
+import os
 import sys
 from twscrape import API, AccountsPool
 from playwright.async_api import async_playwright, TimeoutError as AsyncTimeoutError
 from playwright.sync_api import sync_playwright, TimeoutError as SyncTimeoutError
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
+from services.resource_blocker import ResourceBlocker
+from services.trend_fetcher import TREND_URL, TrendHttpFetcher, build_trends, trends_digest
+from metrics import span
+
+# トレンド表の取得に不要なリソースはルートインターセプトで読み込まない（TREND_BLOCK_* で設定）
+resource_blocker = ResourceBlocker.from_env("trend", "TREND")
+
+# トレンド表のキーワードリンク（これが表示されたら抽出を開始できる）
+TREND_LINK_SELECTOR = 'table tr td a[href*="twitter.com/search"]'
+
+# 表の各行（ヘッダーを除く）の最初のセルとその中の検索リンク、ページ内の全検索リンクのテキストを1回で取得
+EXTRACT_TRENDS_JS = """() => {
+    const rows = Array.from(document.querySelectorAll('table tr')).slice(1).map((row) => {
+        const cell = row.querySelector('td');
+        if (!cell) {
+            return null;
+        }
+        const link = cell.querySelector('a[href*="twitter.com/search"]');
+        return { cell_text: cell.innerText.trim(), link_text: link ? link.innerText.trim() : null };
+    });
+    const links = Array.from(document.querySelectorAll('a[href*="twitter.com/search"]')).map((link) => link.innerText.trim());
+    return { rows, links };
+}"""
+
+# 1回の取得で読むトレンドの件数（要求された件数にかかわらず同じ件数を取得して比較・キャッシュする）
+TREND_FETCH_LIMIT = 50
+
+# 最新のトレンドの保存先（TREND_SNAPSHOT_FILE、空文字なら保存しない）。起動直後はこれを返す
+TREND_SNAPSHOT_FILE = os.getenv("TREND_SNAPSHOT_FILE", "trend_snapshot.json")
+
+# 有効期限を過ぎたキャッシュ（起動直後の保存データを含む）も、この時間以内なら更新を待たずに返す
+TREND_SNAPSHOT_MAX_AGE_HOURS = float(os.getenv("TREND_SNAPSHOT_MAX_AGE_HOURS", "24"))
+
+# 取得方法（TREND_FETCH_MODE）: auto=HTTPで取得できなければブラウザ、http=HTTPのみ、browser=ブラウザのみ
+TREND_FETCH_MODES = ("auto", "http", "browser")
 
 class TrendScraper:
     """Xのトレンドを取得するクラス（twscrape/Playwright使用、バックグラウンド更新対応）"""
     
-    def __init__(self):
+    def __init__(self, snapshot_file: Optional[str] = TREND_SNAPSHOT_FILE):
         self.api: Optional[API] = None
         self.pool: Optional[AccountsPool] = None
         self.initialized = False
@@ -26,12 +64,74 @@ class TrendScraper:
         self.cached_trends: List[Dict[str, str]] = []
         self.last_update: Optional[datetime] = None
         self.cache_valid_minutes: int = 30  # キャッシュの有効期限（分）
+        # トレンドの内容が最後に変わった日時と内容のハッシュ（変化がなければ利用側は処理を省略できる）
+        self.changed_at: Optional[datetime] = None
+        self.content_hash: Optional[str] = None
         
         # バックグラウンド更新
         self.is_background_running = False
         self.background_thread: Optional[threading.Thread] = None
         self.update_interval_minutes: int = 30  # 更新間隔（分）
         self.executor = ThreadPoolExecutor(max_workers=1)
+
+        # HTTPでの取得（ブラウザを起動しない）
+        self.http_fetcher = TrendHttpFetcher()
+        fetch_mode = os.getenv("TREND_FETCH_MODE", "auto").strip().lower()
+        self.fetch_mode = fetch_mode if fetch_mode in TREND_FETCH_MODES else "auto"
+        # 直近の取得の方法・所要時間（取得時間の比較用）
+        self.last_refresh: Optional[Dict[str, Any]] = None
+
+        # 実行中の取得（同時に来た取得要求はこの結果を共有する、スレッドをまたいで使うためconcurrent.futures）
+        self._refresh_lock = threading.Lock()
+        self._inflight: Optional[Future] = None
+        self._revalidate_tasks = set()
+        self.refresh_stats = {"refreshes": 0, "coalesced": 0, "stale_served": 0}
+
+        # 前回保存したトレンドを読み込む（再起動直後もすぐに実データを返せるように）
+        self.snapshot_file = snapshot_file or None
+        self.from_snapshot = False
+        self._snapshot_lock = threading.Lock()
+        self._load_snapshot()
+
+    def _load_snapshot(self):
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            trends = data.get("trends") or []
+            if not trends:
+                return
+            self.cached_trends = trends
+            self.last_update = datetime.fromisoformat(data["last_update"])
+            self.changed_at = datetime.fromisoformat(data["changed_at"]) if data.get("changed_at") else self.last_update
+            self.content_hash = data.get("content_hash") or trends_digest(trends)
+            self.from_snapshot = True
+            age_minutes = int((datetime.now() - self.last_update).total_seconds() / 60)
+            print(f"[トレンド取得] 保存済みのトレンドを読み込みました（{len(trends)}件、{age_minutes}分前のデータ）")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[トレンド取得] 保存済みのトレンドの読み込みに失敗しました（空で開始します）: {str(e)}")
+
+    def _save_snapshot(self):
+        if not self.snapshot_file:
+            return
+        data = {
+            "trends": self.cached_trends,
+            "last_update": self.last_update.isoformat(),
+            "changed_at": self.changed_at.isoformat() if self.changed_at else None,
+            "content_hash": self.content_hash
+        }
+        try:
+            with self._snapshot_lock:
+                directory = os.path.dirname(self.snapshot_file)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{self.snapshot_file}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.snapshot_file)
+        except OSError as e:
+            print(f"[トレンド取得] トレンドの保存に失敗しました: {str(e)}")
     
     def _check_login_state_sync(self, page) -> bool:
         """同期モードでログイン状態を確認"""
@@ -742,27 +842,72 @@ class TrendScraper:
             if cache_age_minutes < self.cache_valid_minutes:
                 print(f"[トレンド取得] キャッシュから取得（{len(self.cached_trends)}件、{int(cache_age_minutes)}分前のデータ）")
                 return self.cached_trends[:limit]
+            if cache_age_minutes < TREND_SNAPSHOT_MAX_AGE_HOURS * 60:
+                # 期限切れでも前回のデータをすぐに返し、更新は1件だけバックグラウンドで行う
+                self.refresh_stats["stale_served"] += 1
+                print(f"[トレンド取得] 前回のトレンドを返し、裏で更新します（{len(self.cached_trends)}件、{int(cache_age_minutes)}分前のデータ）")
+                self._revalidate_in_background()
+                return self.cached_trends[:limit]
         
         # use_cache=False（手動更新）の場合はブラウザを表示しながらスクレイピング。
         # use_cache=True（バックグラウンド）ではヘッドレスで実行し、成功時のみキャッシュを更新。
-        print("[トレンド取得] twittrend.jpから新規取得を開始..." + ("(ヘッドレス)" if use_cache else "(ブラウザ表示)"))
-        headless = use_cache
-        trends = await self._fetch_trends(limit, x_username, x_password, headless=headless)
-        
-        if trends:
-            # 成功した場合のみキャッシュを更新
-            self.cached_trends = trends
-            self.last_update = datetime.now()
-        else:
-            print("[警告] トレンド取得に失敗したため、キャッシュを更新しません")
-            # 失敗時はキャッシュを返す（無ければ空配列）
-            return self.cached_trends[:limit] if self.cached_trends else []
-        
+        trends = await self._refresh_trends(headless=use_cache)
         return trends[:limit]
+
+    async def _refresh_trends(self, headless: bool = True) -> List[Dict[str, str]]:
+        """
+        トレンドを取得してキャッシュを更新（同時に呼ばれた場合は実行中の1回の取得の結果を共有する）
+
+        Returns:
+            更新後のキャッシュ（取得に失敗した場合は前回のキャッシュ）
+        """
+        with self._refresh_lock:
+            future = self._inflight
+            leader = future is None
+            if leader:
+                future = self._inflight = Future()
+        if not leader:
+            self.refresh_stats["coalesced"] += 1
+            print("[トレンド取得] 実行中の取得の結果を待ちます")
+            return await asyncio.wrap_future(future)
+
+        try:
+            self.refresh_stats["refreshes"] += 1
+            print("[トレンド取得] twittrend.jpから新規取得を開始..." + ("(ヘッドレス)" if headless else "(ブラウザ表示)"))
+            trends = await self._fetch_trends(TREND_FETCH_LIMIT, headless=headless)
+            if self.cached_trends and (self.last_refresh or {}).get("method") == "fallback":
+                # 取得に失敗した場合は、実データのキャッシュを固定のフォールバックデータで置き換えない
+                print("[警告] トレンド取得に失敗したため、キャッシュを更新しません")
+            elif trends:
+                self._store_trends(trends)
+            result = list(self.cached_trends)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            # 待っている呼び出し側には通常の例外として伝える（キャンセルを波及させない）
+            future.set_exception(e if isinstance(e, Exception) else Exception("トレンド取得が中断されました"))
+            raise
+        finally:
+            with self._refresh_lock:
+                self._inflight = None
+
+    def _revalidate_in_background(self):
+        """実行中の取得がなければ、待たずにバックグラウンドで更新を始める"""
+        if self._inflight is not None or self._revalidate_tasks:
+            return
+        task = asyncio.ensure_future(self._revalidate())
+        self._revalidate_tasks.add(task)
+        task.add_done_callback(self._revalidate_tasks.discard)
+
+    async def _revalidate(self):
+        try:
+            await self._refresh_trends(headless=True)
+        except Exception as e:
+            print(f"[トレンド更新エラー] {str(e)}")
     
     async def _fetch_trends(self, limit: int = 50, x_username: Optional[str] = None, x_password: Optional[str] = None, headless: bool = True) -> List[Dict[str, str]]:
         """
-        twittrend.jpからトレンドを取得（Playwrightスクレイピング）
+        twittrend.jpからトレンドを取得（HTTP取得、取得できなければPlaywrightスクレイピング）
         
         Args:
             limit: 取得するトレンドの数
@@ -773,6 +918,35 @@ class TrendScraper:
         Returns:
             トレンドのリスト
         """
+        with span("trend_refresh", mode=self.fetch_mode) as refresh_span:
+            trends = await self._fetch_trends_steps(limit, x_username, x_password, headless, refresh_span)
+            refresh_span["count"] = len(trends)
+        self.last_refresh = {
+            "method": refresh_span.get("method"),
+            "duration_ms": refresh_span["duration_ms"],
+            "count": len(trends),
+            "at": refresh_span["ended_at"]
+        }
+        print(f"[トレンド取得] {refresh_span.get('method')}で{len(trends)}件を取得しました ({refresh_span['duration_ms']}ms)")
+        return trends
+
+    async def _fetch_trends_steps(self, limit: int, x_username: Optional[str], x_password: Optional[str], headless: bool, refresh_span: Dict) -> List[Dict[str, str]]:
+        if self.fetch_mode != "browser":
+            try:
+                trends = await self.http_fetcher.fetch(limit)
+                if trends:
+                    refresh_span["method"] = "http"
+                    return trends
+                print("[トレンド取得] HTTPで取得したページにトレンド表がありませんでした")
+            except Exception as e:
+                print(f"[トレンド取得] HTTPでの取得に失敗しました: {str(e)}")
+            if self.fetch_mode == "http":
+                refresh_span["method"] = "fallback"
+                return self._get_fallback_trends(limit)
+            print("[トレンド取得] ブラウザで取得します")
+
+        refresh_span["method"] = "browser"
+
         try:
             # Playwrightでtwittrend.jpからスクレイピング
             if sys.platform == 'win32':
@@ -792,10 +966,12 @@ class TrendScraper:
                 return trends
             
             # フォールバックデータを使用
+            refresh_span["method"] = "fallback"
             return self._get_fallback_trends(limit)
             
         except Exception as e:
             print(f"[エラー] トレンド取得: {str(e)}")
+            refresh_span["method"] = "fallback"
             return self._get_fallback_trends(limit)
     
     def _scrape_trends_sync(self, limit: int, x_username: Optional[str] = None, x_password: Optional[str] = None, headless: bool = True) -> List[Dict[str, str]]:
@@ -821,6 +997,7 @@ class TrendScraper:
                     locale='ja-JP',
                     viewport={'width': 1920, 'height': 1080}
                 )
+                resource_blocker.install_sync(context)
                 page = context.new_page()
 
                 if not headless:
@@ -832,93 +1009,33 @@ class TrendScraper:
                         print(f"[警告] ブラウザの前面表示に失敗: {str(e)}")
 
                 # twittrend.jpからトレンドを取得（ログイン不要）
-                trending_url = "https://twittrend.jp/compare/result/23424856/1/"
-                page.goto(trending_url, wait_until="networkidle", timeout=60000)
+                trending_url = TREND_URL
+                page.goto(trending_url, wait_until="domcontentloaded", timeout=60000)
                 if not headless:
                     page.wait_for_timeout(2000)
-                page.wait_for_timeout(5000)  # ページ読み込み待機
+                try:
+                    page.wait_for_selector(TREND_LINK_SELECTOR, timeout=15000)
+                except SyncTimeoutError:
+                    print("[トレンドスクレイピング] トレンド表の表示待機がタイムアウトしました（取得できた分で続行）")
 
-                # テーブルからトレンドを抽出
-                # テーブル構造: <table>内の<tr>要素からトレンドを取得
+                # テーブルの行とリンクを1回のevaluateでまとめて取得して抽出（行ごとに要素を問い合わせない）
                 trends = []
                 try:
-                    # テーブル行を取得（日本列のトレンド）
-                    rows = page.query_selector_all('table tr')
-                    print(f"[トレンドスクレイピング] テーブル行数: {len(rows)}")
-                    
-                    for row in rows[1:]:  # ヘッダー行をスキップ
-                        try:
-                            # 日本列（最初の列）のセルを取得
-                            cells = row.query_selector_all('td')
-                            if len(cells) >= 1:
-                                # 最初のセル（日本列）からトレンドを抽出
-                                cell_text = cells[0].inner_text().strip()
-                                
-                                # リンクからトレンドキーワードを取得
-                                link = cells[0].query_selector('a[href*="twitter.com/search"]')
-                                if link:
-                                    link_text = link.inner_text().strip()
-                                    # ハッシュタグや余分な文字を除去
-                                    keyword = link_text.replace('#', '').strip()
-                                    
-                                    # ツイート数を取得（あれば）
-                                    tweet_count = None
-                                    tweet_count_text = cell_text
-                                    if '件のツイート' in tweet_count_text:
-                                        import re
-                                        match = re.search(r'(\d+(?:,\d+)*)\s*件のツイート', tweet_count_text)
-                                        if match:
-                                            tweet_count_str = match.group(1).replace(',', '')
-                                            try:
-                                                tweet_count = int(tweet_count_str)
-                                            except:
-                                                pass
-                                    
-                                    if keyword and keyword not in [t['keyword'] for t in trends]:
-                                        trends.append({
-                                            "keyword": keyword,
-                                            "tweet_count": tweet_count
-                                        })
-                                        print(f"[トレンドスクレイピング] トレンドを発見: {keyword} (ツイート数: {tweet_count})")
-                                        
-                                        if len(trends) >= limit:
-                                            break
-                        except Exception as e:
-                            print(f"[警告] 行の処理中にエラー: {str(e)}")
-                            continue
-                    
-                    # テーブルから取得できない場合は、リンクから直接取得
-                    if len(trends) < limit:
-                        links = page.query_selector_all('a[href*="twitter.com/search"]')
-                        for link in links:
-                            try:
-                                keyword = link.inner_text().strip()
-                                keyword = keyword.replace('#', '').strip()
-                                
-                                # スキップするテキストを除外
-                                if not keyword or len(keyword) > 100:
-                                    continue
-                                if keyword in ['ツイート', 'Tweet', '検索', 'Search']:
-                                    continue
-                                
-                                if keyword and keyword not in [t['keyword'] for t in trends]:
-                                    trends.append({
-                                        "keyword": keyword,
-                                        "tweet_count": None
-                                    })
-                                    print(f"[トレンドスクレイピング] リンクからトレンドを発見: {keyword}")
-                                    
-                                    if len(trends) >= limit:
-                                        break
-                            except Exception:
-                                continue
-                
+                    with span("trend_extract", method="browser") as extract_span:
+                        extracted = page.evaluate(EXTRACT_TRENDS_JS)
+                        trends = build_trends(extracted["rows"], extracted["links"], limit)
+                        extract_span["rows"] = len(extracted["rows"])
+                        extract_span["count"] = len(trends)
+                    print(f"[トレンドスクレイピング] テーブル行数: {len(extracted['rows']) + 1}")
+                    print(f"[トレンドスクレイピング] トレンドを発見: {', '.join(t['keyword'] for t in trends)}")
                 except Exception as e:
                     print(f"[警告] テーブルからの取得に失敗: {str(e)}")
                     import traceback
                     print(traceback.format_exc())
 
                 print(f"[トレンドスクレイピング] 完了: {len(trends)}件のトレンドを取得")
+                block_stats = resource_blocker.stats()
+                print(f"[トレンドスクレイピング] ブロックしたリクエスト: 累計{block_stats['blocked_requests']}件 (削減量の推定 {block_stats['bytes_saved_estimate'] // 1024}KB)")
 
                 browser.close()
         except Exception as e:
@@ -939,93 +1056,35 @@ class TrendScraper:
                     locale='ja-JP',
                     viewport={'width': 1920, 'height': 1080}
                 )
+                await resource_blocker.install(context)
                 page = await context.new_page()
 
                 # twittrend.jpからトレンドを取得（ログイン不要）
-                trending_url = "https://twittrend.jp/compare/result/23424856/1/"
-                await page.goto(trending_url, wait_until="networkidle", timeout=60000)
-                await page.wait_for_timeout(5000)  # ページ読み込み待機
+                trending_url = TREND_URL
+                await page.goto(trending_url, wait_until="domcontentloaded", timeout=60000)
+                try:
+                    await page.wait_for_selector(TREND_LINK_SELECTOR, timeout=15000)
+                except AsyncTimeoutError:
+                    print("[トレンドスクレイピング] トレンド表の表示待機がタイムアウトしました（取得できた分で続行）")
 
-                # テーブルからトレンドを抽出
+                # テーブルの行とリンクを1回のevaluateでまとめて取得して抽出（行ごとに要素を問い合わせない）
                 trends = []
                 try:
-                    # テーブル行を取得（日本列のトレンド）
-                    rows = await page.query_selector_all('table tr')
-                    print(f"[トレンドスクレイピング] テーブル行数: {len(rows)}")
-                    
-                    for row in rows[1:]:  # ヘッダー行をスキップ
-                        try:
-                            # 日本列（最初の列）のセルを取得
-                            cells = await row.query_selector_all('td')
-                            if len(cells) >= 1:
-                                # 最初のセル（日本列）からトレンドを抽出
-                                cell_text = (await cells[0].inner_text()).strip()
-                                
-                                # リンクからトレンドキーワードを取得
-                                link = await cells[0].query_selector('a[href*="twitter.com/search"]')
-                                if link:
-                                    link_text = (await link.inner_text()).strip()
-                                    # ハッシュタグや余分な文字を除去
-                                    keyword = link_text.replace('#', '').strip()
-                                    
-                                    # ツイート数を取得（あれば）
-                                    tweet_count = None
-                                    tweet_count_text = cell_text
-                                    if '件のツイート' in tweet_count_text:
-                                        import re
-                                        match = re.search(r'(\d+(?:,\d+)*)\s*件のツイート', tweet_count_text)
-                                        if match:
-                                            tweet_count_str = match.group(1).replace(',', '')
-                                            try:
-                                                tweet_count = int(tweet_count_str)
-                                            except:
-                                                pass
-                                    
-                                    if keyword and keyword not in [t['keyword'] for t in trends]:
-                                        trends.append({
-                                            "keyword": keyword,
-                                            "tweet_count": tweet_count
-                                        })
-                                        print(f"[トレンドスクレイピング] トレンドを発見: {keyword} (ツイート数: {tweet_count})")
-                                        
-                                        if len(trends) >= limit:
-                                            break
-                        except Exception as e:
-                            print(f"[警告] 行の処理中にエラー: {str(e)}")
-                            continue
-                    
-                    # テーブルから取得できない場合は、リンクから直接取得
-                    if len(trends) < limit:
-                        links = await page.query_selector_all('a[href*="twitter.com/search"]')
-                        for link in links:
-                            try:
-                                keyword = (await link.inner_text()).strip()
-                                keyword = keyword.replace('#', '').strip()
-                                
-                                # スキップするテキストを除外
-                                if not keyword or len(keyword) > 100:
-                                    continue
-                                if keyword in ['ツイート', 'Tweet', '検索', 'Search']:
-                                    continue
-                                
-                                if keyword and keyword not in [t['keyword'] for t in trends]:
-                                    trends.append({
-                                        "keyword": keyword,
-                                        "tweet_count": None
-                                    })
-                                    print(f"[トレンドスクレイピング] リンクからトレンドを発見: {keyword}")
-                                    
-                                    if len(trends) >= limit:
-                                        break
-                            except Exception:
-                                continue
-                
+                    with span("trend_extract", method="browser") as extract_span:
+                        extracted = await page.evaluate(EXTRACT_TRENDS_JS)
+                        trends = build_trends(extracted["rows"], extracted["links"], limit)
+                        extract_span["rows"] = len(extracted["rows"])
+                        extract_span["count"] = len(trends)
+                    print(f"[トレンドスクレイピング] テーブル行数: {len(extracted['rows']) + 1}")
+                    print(f"[トレンドスクレイピング] トレンドを発見: {', '.join(t['keyword'] for t in trends)}")
                 except Exception as e:
                     print(f"[警告] テーブルからの取得に失敗: {str(e)}")
                     import traceback
                     print(traceback.format_exc())
 
                 print(f"[トレンドスクレイピング] 完了: {len(trends)}件のトレンドを取得")
+                block_stats = resource_blocker.stats()
+                print(f"[トレンドスクレイピング] ブロックしたリクエスト: 累計{block_stats['blocked_requests']}件 (削減量の推定 {block_stats['bytes_saved_estimate'] // 1024}KB)")
 
                 await browser.close()
         except Exception as e:
@@ -1081,6 +1140,7 @@ class TrendScraper:
             asyncio.set_event_loop(loop)
             try:
                 loop.run_until_complete(self._update_trends_cache())
+                loop.run_until_complete(self.http_fetcher.close())
             finally:
                 loop.close()
         
@@ -1109,6 +1169,7 @@ class TrendScraper:
             asyncio.set_event_loop(loop)
             try:
                 loop.run_until_complete(self._update_trends_cache())
+                loop.run_until_complete(self.http_fetcher.close())
             finally:
                 loop.close()
         
@@ -1119,13 +1180,29 @@ class TrendScraper:
         """トレンドを取得してキャッシュに保存"""
         try:
             print("[トレンド更新] バックグラウンドでトレンドを更新中...")
-            trends = await self._fetch_trends(limit=50)
-            self.cached_trends = trends
-            self.last_update = datetime.now()
-            print(f"[トレンド更新] キャッシュを更新しました（{len(trends)}件）")
+            await self._refresh_trends(headless=True)
         except Exception as e:
             print(f"[トレンド更新エラー] {str(e)}")
     
+    def _store_trends(self, trends: List[Dict[str, str]]):
+        """取得したトレンドをキャッシュに保存（内容が変わっていなければ差し替えず、取得日時だけ更新）"""
+        self.last_update = datetime.now()
+        self.from_snapshot = False
+        digest = trends_digest(trends)
+        if digest == self.content_hash:
+            print(f"[トレンド更新] トレンドに変化はありません（{len(trends)}件、最終変更: {self.changed_at.strftime('%H:%M:%S')}）")
+        else:
+            self.cached_trends = trends
+            self.content_hash = digest
+            self.changed_at = self.last_update
+            print(f"[トレンド更新] キャッシュを更新しました（{len(trends)}件）")
+        if (self.last_refresh or {}).get("method") != "fallback":
+            self._save_snapshot()
+
+    async def close(self):
+        """現在のイベントループで使っているHTTPセッションを閉じる"""
+        await self.http_fetcher.close()
+
     def stop_background_update(self):
         """バックグラウンド更新を停止"""
         self.is_background_running = False
@@ -1137,6 +1214,15 @@ class TrendScraper:
         return {
             "cached_count": len(self.cached_trends),
             "last_update": self.last_update.isoformat() if self.last_update else None,
+            "age_seconds": int((datetime.now() - self.last_update).total_seconds()) if self.last_update else None,
+            "from_snapshot": self.from_snapshot,
+            "refreshing": self._inflight is not None,
+            "refresh_stats": dict(self.refresh_stats),
             "is_background_running": self.is_background_running,
-            "update_interval_minutes": self.update_interval_minutes
+            "update_interval_minutes": self.update_interval_minutes,
+            "fetch_mode": self.fetch_mode,
+            "last_refresh": self.last_refresh,
+            "changed_at": self.changed_at.isoformat() if self.changed_at else None,
+            "content_hash": self.content_hash,
+            "http": self.http_fetcher.stats
         }
@@ -0,0 +1,66 @@
+"""
+セッションストア（ローカルキャッシュ + 共有バックエンド）
+
+検証結果をプロセス内のLRU/TTLキャッシュに保持し、未知のIDだけ共有バックエンド（既定ではSQLiteのuser_data）に問い合わせる。
+無効なIDも短時間キャッシュして、同じIDでの連続アクセスがバックエンドに届かないようにする。
+バックエンドは全uvicornワーカーで共有されるため、どのワーカーで発行したセッションも他のワーカーで有効になる。
+"""
+import uuid
+from typing import Callable, Dict, Optional
+
+from cache import TTLCache
+
+
+class SessionStore:
+    def __init__(
+        self,
+        exists_backend: Callable[[str], bool],
+        create_backend: Callable[[str], None],
+        max_entries: int = 10000,
+        ttl_seconds: float = 3600,
+        negative_ttl_seconds: float = 60
+    ):
+        """
+        Args:
+            exists_backend: セッションIDが共有バックエンドに存在するか返す関数
+            create_backend: 新しいセッションIDを共有バックエンドに登録する関数
+            max_entries: ローカルキャッシュの最大件数（超えた分は最も古く使われたものから破棄）
+            ttl_seconds: 有効なセッションをバックエンドに再確認するまでの秒数
+            negative_ttl_seconds: 無効なセッションIDを記憶しておく秒数
+        """
+        self.exists_backend = exists_backend
+        self.create_backend = create_backend
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+
+    def create(self) -> str:
+        """新しいセッションを発行してバックエンドに登録"""
+        session_id = str(uuid.uuid4())
+        self.create_backend(session_id)
+        self._cache.set(session_id, True)
+        return session_id
+
+    def lookup(self, session_id: str) -> Optional[bool]:
+        """キャッシュのみで判定（True: 有効, False: 無効, None: 未確認）"""
+        return self._cache.get(session_id)
+
+    def validate(self, session_id: str) -> bool:
+        """セッションIDが有効か判定（キャッシュになければバックエンドに問い合わせ、結果をキャッシュ）"""
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            return cached
+
+        exists = self.exists_backend(session_id)
+        if exists:
+            self._cache.set(session_id, True)
+        else:
+            self._cache.set(session_id, False, ttl_seconds=self.negative_ttl_seconds)
+        return exists
+
+    def invalidate(self, session_id: str):
+        """ローカルキャッシュからセッションを削除（次回はバックエンドで再確認）"""
+        self._cache.delete(session_id)
+
+    def stats(self) -> Dict:
+        """キャッシュ情報を取得"""
+        return self._cache.stats()
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """一時ファイルのデータベース（テストごとに作り直す）"""
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "user_data.db"))
+    database._settings_cache.clear()
+    yield database
+    database.close_db()
+    database._settings_cache.clear()
@@ -0,0 +1,85 @@
+import asyncio
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from services import note_service
+from services.note_service import NoteService, NoteTimeouts
+
+
+class FakeEditor:
+    """contenteditableのエディタ（貼り付けをdelay秒後に反映する）"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.text = ""
+        self.pastes = 0
+
+    async def get_attribute(self, name):
+        return "true" if name == "contenteditable" else None
+
+    async def evaluate(self, script, arg=None):
+        if script == note_service._READ_TEXT_JS:
+            return self.text
+        if script == note_service._PASTE_BODY_JS:
+            self.pastes += 1
+            asyncio.get_running_loop().call_later(self.delay, self._apply, arg)
+            return True
+        if script == note_service._REPLACE_BODY_JS:
+            self.text = arg
+        return None
+
+    def _apply(self, text):
+        self.text += text
+
+    async def element_handle(self, timeout=None):
+        return self
+
+    async def owner_frame(self):
+        return FakeFrame()
+
+
+class FakeFrame:
+    async def wait_for_function(self, script, arg=None, timeout=None):
+        element, minimum = arg
+        deadline = asyncio.get_running_loop().time() + timeout / 1000
+        while note_service._count_visible_chars(element.text) < minimum:
+            if asyncio.get_running_loop().time() > deadline:
+                raise PlaywrightTimeoutError("timeout")
+            await asyncio.sleep(0.01)
+
+
+class FakeKeyboard:
+    def __init__(self, editor):
+        self.editor = editor
+
+    async def press(self, key):
+        if key == "Delete":
+            self.editor.text = ""
+
+
+class FakePage:
+    def __init__(self, editor):
+        self.keyboard = FakeKeyboard(editor)
+
+
+def _insert(monkeypatch, editor, body_timeout_ms):
+    monkeypatch.setenv("NOTE_STATE_PERSIST", "false")
+    monkeypatch.delenv("NOTE_BODY_INSERT", raising=False)
+    service = NoteService("user@example.com", "pw", timeouts=NoteTimeouts(body=body_timeout_ms))
+    service.page = FakePage(editor)
+    return asyncio.run(service._insert_body(editor, "一行目\n\n二行目" * 20))
+
+
+def test_waits_for_a_paste_applied_asynchronously(monkeypatch):
+    editor = FakeEditor(delay=0.1)
+    assert _insert(monkeypatch, editor, body_timeout_ms=2000) == "paste"
+    # 反映を待ってから判定するので、次の方法で本文が二重に入らない
+    assert editor.text == "一行目\n\n二行目" * 20
+    assert editor.pastes == 1
+
+
+def test_falls_back_when_paste_is_not_applied_in_time(monkeypatch):
+    monkeypatch.setattr(note_service, "BODY_INSERT_STRATEGIES", ("paste", "dom"))
+    editor = FakeEditor(delay=60)
+    assert _insert(monkeypatch, editor, body_timeout_ms=50) == "dom"
+    assert editor.text == "一行目\n\n二行目" * 20
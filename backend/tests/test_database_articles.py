@@ -0,0 +1,77 @@
+import pytest
+
+SESSION = "11111111-2222-3333-4444-555555555555"
+
+
+def _seed(db, count=5):
+    db.init_db()
+    for i in range(1, count + 1):
+        db.add_user_article(SESSION, {
+            "title": f"記事{i}",
+            "content": "本文" * 200,
+            "theme": "AI" if i % 2 else "旅行",
+            "trend_keyword": "東京" if i == 3 else None,
+            "posted": i == 5,
+            "posted_at": "2024-01-01T00:00:00" if i == 5 else None,
+            "llm_provider": "openai"
+        })
+
+
+def test_cursor_pagination_walks_all_articles(db):
+    _seed(db)
+    ids = []
+    after_id = None
+    pages = 0
+    while True:
+        articles, after_id = db.list_user_articles(SESSION, limit=2, after_id=after_id)
+        ids.extend(a["id"] for a in articles)
+        pages += 1
+        if after_id is None:
+            break
+    assert ids == [1, 2, 3, 4, 5]
+    assert pages == 3
+
+    articles, next_after_id = db.list_user_articles(SESSION, limit=5)
+    assert len(articles) == 5 and next_after_id is None
+    articles, next_after_id = db.list_user_articles(SESSION)
+    assert len(articles) == 5 and next_after_id is None
+
+
+def test_full_articles_keep_extra_fields(db):
+    _seed(db, count=1)
+    articles, _ = db.list_user_articles(SESSION)
+    assert articles[0]["llm_provider"] == "openai"
+    assert articles[0] == db.get_user_article(SESSION, 1)
+
+
+def test_projection_returns_only_requested_fields(db):
+    _seed(db)
+    articles, next_after_id = db.list_user_articles(SESSION, limit=2, fields=["title", "excerpt"])
+    assert articles == [
+        {"title": "記事1", "excerpt": ("本文" * 100)},
+        {"title": "記事2", "excerpt": ("本文" * 100)},
+    ]
+    # idを返さなくてもカーソルは計算される
+    assert next_after_id == 2
+
+    articles, _ = db.list_user_articles(SESSION, fields=["id", "posted"], posted=True)
+    assert articles == [{"id": 5, "posted": True}]
+
+    with pytest.raises(ValueError):
+        db.list_user_articles(SESSION, fields=["title", "password"])
+
+
+def test_filters(db):
+    _seed(db)
+    assert [a["id"] for a in db.list_user_articles(SESSION, theme="AI")[0]] == [1, 3, 5]
+    assert [a["id"] for a in db.list_user_articles(SESSION, trend_keyword="東京")[0]] == [3]
+    assert [a["id"] for a in db.list_user_articles(SESSION, posted=False)[0]] == [1, 2, 3, 4]
+    assert [a["id"] for a in db.list_user_articles(SESSION, theme="AI", limit=1, after_id=1)[0]] == [3]
+    assert db.list_user_articles("other-session")[0] == []
+
+
+def test_article_ids_are_not_reused_after_delete(db):
+    _seed(db, count=2)
+    db.delete_user_article(SESSION, 2)
+    assert db.add_user_article(SESSION, {"title": "新しい記事"})["id"] == 3
+    assert db.add_user_article("other-session", {"title": "別セッション"})["id"] == 1
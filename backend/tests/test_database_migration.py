@@ -0,0 +1,75 @@
+import json
+import sqlite3
+
+
+def _create_legacy_db(path, session_id, articles, schedules):
+    """JSONカラムに記事・スケジュールを保存していた旧スキーマのデータベースを作る"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE user_data (
+            session_id TEXT PRIMARY KEY,
+            settings TEXT,
+            prompt_settings TEXT,
+            articles TEXT,
+            schedules TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute(
+        "INSERT INTO user_data (session_id, settings, prompt_settings, articles, schedules) VALUES (?, ?, ?, ?, ?)",
+        (session_id, json.dumps({"note_id": "me"}), json.dumps({"tone": "明るい"}), json.dumps(articles), json.dumps(schedules))
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_migration_keeps_unique_ids_and_renumbers_only_duplicates(db):
+    _create_legacy_db(db.DB_FILE, "s1", [
+        {"id": 1, "title": "a", "content": "A"},
+        {"id": 1, "title": "b", "content": "B"},
+        {"id": 2, "title": "c", "content": "C"},
+    ], [])
+    db.init_db()
+
+    articles = {a["title"]: a["id"] for a in db.get_user_articles("s1")}
+    assert articles == {"a": 1, "b": 3, "c": 2}
+
+
+def test_migration_renumbers_non_int_ids_after_max(db):
+    _create_legacy_db(db.DB_FILE, "s1", [
+        {"id": 5, "title": "a"},
+        {"id": "x", "title": "b"},
+        {"title": "c"},
+        {"id": True, "title": "d"},
+    ], [])
+    db.init_db()
+
+    articles = {a["title"]: a["id"] for a in db.get_user_articles("s1")}
+    assert articles == {"a": 5, "b": 6, "c": 7, "d": 8}
+
+
+def test_migration_preserves_schedule_references_and_fields(db):
+    _create_legacy_db(db.DB_FILE, "s1", [
+        {"id": 1, "title": "a", "content": "A", "theme": "t", "posted": True, "posted_at": "2024-01-01", "note_url": "u"},
+        {"id": 2, "title": "b", "content": "B"},
+    ], [
+        {"schedule_id": "sch1", "status": "active", "article_id": 2},
+        {"status": "active"},
+    ])
+    db.init_db()
+
+    article = db.get_user_article("s1", 1)
+    assert article == {
+        "id": 1, "title": "a", "content": "A", "theme": "t",
+        "posted": True, "posted_at": "2024-01-01", "note_url": "u"
+    }
+    schedules = db.get_user_schedules("s1")
+    assert schedules == [{"schedule_id": "sch1", "status": "active", "article_id": 2}]
+    assert db.get_user_article("s1", schedules[0]["article_id"])["title"] == "b"
+    assert db.get_user_settings("s1") == {"note_id": "me"}
+
+    # 移行後のJSONカラムは空になり、次の採番は既存の最大IDの次から
+    assert db.add_user_article("s1", {"title": "new"})["id"] == 3
+    db.init_db()
+    assert len(db.get_user_articles("s1")) == 3
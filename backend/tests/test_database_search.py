@@ -0,0 +1,156 @@
+import sqlite3
+
+SESSION = "11111111-2222-3333-4444-555555555555"
+OTHER_SESSION = "99999999-2222-3333-4444-555555555555"
+
+
+def _seed(db):
+    db.init_db()
+    db.add_user_article(SESSION, {"title": "東京の天気", "content": "今日は晴れ"})
+    db.add_user_article(SESSION, {"title": "大阪旅行", "content": "東京から大阪へ移動した。東京タワーにも寄った"})
+    db.add_user_article(SESSION, {"title": "AI入門", "content": "Pythonで学ぶ機械学習"})
+    db.add_user_article(OTHER_SESSION, {"title": "東京", "content": "東京の天気"})
+
+
+def _ids(results):
+    return [r["id"] for r in results]
+
+
+def test_search_ranks_title_match_first(db):
+    _seed(db)
+    results = db.search_user_articles(SESSION, "東京の天気")
+    assert _ids(results) == [1]
+    assert results[0]["score"] > 0
+
+    results = db.search_user_articles(SESSION, "東京タワー")
+    assert _ids(results) == [2]
+    assert "[東京タワー]" in results[0]["snippet"]
+
+
+def test_short_terms_are_indexed_and_ranked(db):
+    _seed(db)
+    # 2文字の語: タイトルに含む記事が本文だけの記事より上位
+    results = db.search_user_articles(SESSION, "東京")
+    assert _ids(results) == [1, 2]
+    assert all(r["score"] is not None for r in results)
+    assert results[0]["score"] >= results[1]["score"]
+
+    # 1文字の語・英字の短い語・語の組み合わせ
+    assert _ids(db.search_user_articles(SESSION, "阪")) == [2]
+    assert _ids(db.search_user_articles(SESSION, "py")) == [3]
+    assert _ids(db.search_user_articles(SESSION, "AI 機械学習")) == [3]
+    assert _ids(db.search_user_articles(SESSION, "東京 大阪")) == [2]
+    assert db.search_user_articles(SESSION, "京都") == []
+
+
+def test_short_term_search_uses_fts_index(db):
+    _seed(db)
+    conn = db.get_connection()
+    plan = conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT a.article_id FROM articles_bigram
+        CROSS JOIN articles a ON a.rowid = articles_bigram.rowid
+        WHERE articles_bigram MATCH ? AND a.session_id = ?
+    """, ('"東京"', SESSION)).fetchall()
+    assert "VIRTUAL TABLE INDEX" in plan[0][3]
+
+
+def test_search_is_scoped_to_session(db):
+    _seed(db)
+    assert _ids(db.search_user_articles(OTHER_SESSION, "東京")) == [1]
+    assert _ids(db.search_user_articles(OTHER_SESSION, "東京の天気")) == [1]
+    assert db.search_user_articles(OTHER_SESSION, "大阪") == []
+    assert db.search_user_articles(OTHER_SESSION, "東京タワー") == []
+
+
+def test_search_index_follows_updates_and_deletes(db):
+    _seed(db)
+    db.update_user_article(SESSION, 1, {"title": "京都の天気"})
+    assert _ids(db.search_user_articles(SESSION, "京都")) == [1]
+    assert _ids(db.search_user_articles(SESSION, "東京")) == [2]
+
+    db.delete_user_article(SESSION, 2)
+    assert db.search_user_articles(SESSION, "東京") == []
+    assert db.search_user_articles(SESSION, "東京タワー") == []
+
+    db.save_user_data(SESSION, {"settings": {}, "prompt_settings": {}, "articles": [{"id": 7, "title": "名古屋"}]})
+    assert _ids(db.search_user_articles(SESSION, "名古")) == [7]
+    assert db.search_user_articles(SESSION, "京都") == []
+
+    db.rebuild_search_index()
+    assert _ids(db.search_user_articles(SESSION, "名古屋")) == [7]
+    assert _ids(db.search_user_articles(SESSION, "屋")) == [7]
+
+
+def test_search_without_indexable_terms(db):
+    _seed(db)
+    assert db.search_user_articles(SESSION, "   ") == []
+    assert db.search_user_articles(SESSION, "!!") == []
+
+
+def test_old_search_index_is_rebuilt_with_session_column(db):
+    db.init_db()
+    db.add_user_article(SESSION, {"title": "東京の天気", "content": "晴れ"})
+    db.close_db()
+
+    # session_idを含まない旧インデックスに戻す
+    conn = sqlite3.connect(db.DB_FILE)
+    for trigger in ("articles_fts_ai", "articles_fts_ad", "articles_fts_au"):
+        conn.execute(f"DROP TRIGGER {trigger}")
+    conn.execute("DROP TABLE articles_fts")
+    conn.execute("DROP TABLE articles_bigram")
+    conn.execute("CREATE VIRTUAL TABLE articles_fts USING fts5(title, content, content='articles', content_rowid='rowid', tokenize='trigram')")
+    conn.execute("INSERT INTO articles_fts (articles_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+    assert _ids(db.search_user_articles(SESSION, "東京の天気")) == [1]
+    assert _ids(db.search_user_articles(SESSION, "東京")) == [1]
+
+
+def test_writes_from_other_connections_do_not_need_app_functions(db):
+    _seed(db)
+    db.close_db()
+
+    # アプリがSQL関数を登録していないコネクション（sqlite3 CLIや保守スクリプト）からも書き込める
+    conn = sqlite3.connect(db.DB_FILE)
+    conn.execute("INSERT INTO articles (session_id, article_id, title, content) VALUES (?, 4, '福岡', '博多')", (SESSION,))
+    conn.execute("UPDATE articles SET title = '京都の天気' WHERE session_id = ? AND article_id = 1", (SESSION,))
+    conn.execute("DELETE FROM articles WHERE session_id = ? AND article_id = 3", (SESSION,))
+    conn.commit()
+    conn.close()
+
+    # trigramはトリガーで追従し、2文字ずつの索引は古い内容を返さない
+    assert _ids(db.search_user_articles(SESSION, "京都の天気")) == [1]
+    assert _ids(db.search_user_articles(SESSION, "東京")) == [2]
+    assert db.search_user_articles(SESSION, "py") == []
+
+    db.rebuild_search_index()
+    assert _ids(db.search_user_articles(SESSION, "福岡")) == [4]
+    assert _ids(db.search_user_articles(SESSION, "京都")) == [1]
+
+
+def test_index_with_function_based_triggers_is_rebuilt(db):
+    _seed(db)
+    db.close_db()
+
+    # 以前のトリガー（アプリのSQL関数 fts_bigrams を呼ぶ）を残したデータベース
+    conn = sqlite3.connect(db.DB_FILE)
+    conn.execute("DROP TRIGGER articles_fts_ai")
+    conn.execute("""
+        CREATE TRIGGER articles_fts_ai AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_bigram (rowid, session_id, title, content)
+            VALUES (new.rowid, new.session_id, fts_bigrams(new.title), fts_bigrams(new.content));
+        END
+    """)
+    conn.commit()
+    conn.close()
+
+    db.init_db()
+    conn = sqlite3.connect(db.DB_FILE)
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE sql LIKE '%fts_bigrams%'").fetchone()[0] == 0
+    conn.close()
+    db.add_user_article(SESSION, {"title": "札幌", "content": "雪"})
+    assert _ids(db.search_user_articles(SESSION, "札幌")) == [4]
+    assert _ids(db.search_user_articles(SESSION, "東京")) == [1, 2]
@@ -0,0 +1,83 @@
+import pytest
+
+SESSION = "11111111-2222-3333-4444-555555555555"
+
+
+class _StaleRow:
+    def __init__(self, row):
+        self._row = row
+
+    def fetchone(self):
+        return self._row
+
+
+class _UpdateDuringRead:
+    """設定を読み込んだ直後（キャッシュに入れる前）に別の更新が入るコネクション"""
+
+    def __init__(self, db, real_get_connection):
+        self.db = db
+        self.real_get_connection = real_get_connection
+        self.raced = False
+
+    def execute(self, sql, params=()):
+        cursor = self.real_get_connection().execute(sql, params)
+        if sql.startswith("SELECT settings") and not self.raced:
+            self.raced = True
+            row = cursor.fetchone()
+            self.db.update_user_settings(SESSION, {"note_id": "new"})
+            return _StaleRow(row)
+        return cursor
+
+    def cursor(self):
+        return self.real_get_connection().cursor()
+
+
+def test_settings_are_cached_and_invalidated_on_update(db):
+    db.init_db()
+    db.update_user_settings(SESSION, {"note_id": "old"})
+    assert db.get_user_settings(SESSION) == {"note_id": "old"}
+    assert (SESSION, "settings") in db._settings_cache
+
+    # 呼び出し側で変更してもキャッシュは壊れない
+    db.get_user_settings(SESSION)["note_id"] = "changed"
+    assert db.get_user_settings(SESSION) == {"note_id": "old"}
+
+    db.update_user_settings(SESSION, {"note_id": "new"})
+    assert (SESSION, "settings") not in db._settings_cache
+    assert db.get_user_settings(SESSION) == {"note_id": "new"}
+
+
+def test_read_racing_with_update_is_not_cached(db, monkeypatch):
+    db.init_db()
+    db.update_user_settings(SESSION, {"note_id": "old"})
+    connection = _UpdateDuringRead(db, db.get_connection)
+    monkeypatch.setattr(db, "get_connection", lambda: connection)
+
+    # 更新前に読んだ値は返ってよいが、キャッシュに残してはいけない
+    assert db.get_user_settings(SESSION) == {"note_id": "old"}
+    assert (SESSION, "settings") not in db._settings_cache
+    assert db.get_user_settings(SESSION) == {"note_id": "new"}
+    assert db._settings_reads == {}
+
+
+def test_read_bookkeeping_does_not_grow_with_sessions(db):
+    db.init_db()
+    for i in range(50):
+        session_id = f"session-{i}"
+        db.update_user_settings(session_id, {"note_id": str(i)})
+        assert db.get_user_settings(session_id) == {"note_id": str(i)}
+        assert db.get_user_prompt_settings(session_id)
+    assert db._settings_reads == {}
+
+
+def test_failed_read_releases_bookkeeping(db, monkeypatch):
+    db.init_db()
+
+    class _Broken:
+        def execute(self, sql, params=()):
+            raise RuntimeError("読み込み失敗")
+
+    monkeypatch.setattr(db, "get_connection", lambda: _Broken())
+    with pytest.raises(RuntimeError):
+        db.get_user_settings(SESSION)
+    assert db._settings_reads == {}
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from services import note_service
+from services.note_service import DraftCheckpoint, NoteService, _draft_key_of_response
+
+
+class FakePage:
+    def __init__(self, url):
+        self.url = url
+
+    def is_closed(self):
+        return False
+
+
+class FakeResponse:
+    def __init__(self, url, body=None):
+        self.url = url
+        self.body = body
+
+    async def json(self):
+        if self.body is None:
+            raise ValueError("not json")
+        return self.body
+
+
+def _service(monkeypatch, url):
+    monkeypatch.setenv("NOTE_STATE_PERSIST", "false")
+    service = NoteService("user@example.com", "pw")
+    service.page = FakePage(url)
+    calls = []
+
+    async def open_editor():
+        calls.append(("open_editor",))
+        raise Exception("停止")
+
+    async def goto(url, **kwargs):
+        calls.append(("goto", url))
+        raise Exception("停止")
+
+    async def noop(*args, **kwargs):
+        return None
+
+    async def healthy():
+        return True
+
+    monkeypatch.setattr(service, "_open_editor", open_editor)
+    monkeypatch.setattr(service, "_goto", goto)
+    monkeypatch.setattr(service, "_capture", noop)
+    monkeypatch.setattr(service, "_is_healthy", healthy)
+    return service, calls
+
+
+def _attempt(service, checkpoint):
+    with pytest.raises(Exception):
+        asyncio.run(service.post_draft("タイトル", "本文", checkpoint=checkpoint))
+
+
+def test_retry_before_save_opens_a_new_editor(monkeypatch):
+    service, calls = _service(monkeypatch, "https://editor.note.com/notes/new")
+    checkpoint = DraftCheckpoint()
+    _attempt(service, checkpoint)
+    assert calls == [("open_editor",)]
+    # /notes/new のままのURLは下書きのURLとして記録しない
+    assert checkpoint.editor_url is None
+
+
+def test_retry_after_save_attempt_reopens_the_draft_by_key(monkeypatch):
+    monkeypatch.setattr(note_service, "NOTE_EDITOR_URL_TEMPLATE", "https://editor.note.com/notes/{key}/edit")
+    service, calls = _service(monkeypatch, "https://editor.note.com/notes/new")
+    checkpoint = DraftCheckpoint()
+    checkpoint.bind("タイトル", "本文")
+    checkpoint.advance("body_filled")
+    checkpoint.save_attempted = True
+    checkpoint.draft_key = "n0123456789ab"
+    _attempt(service, checkpoint)
+    assert calls == [("goto", "https://editor.note.com/notes/n0123456789ab/edit")]
+
+
+def test_retry_after_save_attempt_without_key_refuses_a_new_editor(monkeypatch):
+    service, calls = _service(monkeypatch, "https://editor.note.com/notes/new")
+    checkpoint = DraftCheckpoint()
+    checkpoint.bind("タイトル", "本文")
+    checkpoint.save_attempted = True
+    with pytest.raises(Exception, match="再開できません"):
+        asyncio.run(service.post_draft("タイトル", "本文", checkpoint=checkpoint))
+    assert calls == []
+
+
+def test_failure_records_the_draft_editor_url(monkeypatch):
+    service, calls = _service(monkeypatch, "https://editor.note.com/notes/n0123456789ab/edit")
+    checkpoint = DraftCheckpoint()
+    _attempt(service, checkpoint)
+    assert checkpoint.editor_url == "https://editor.note.com/notes/n0123456789ab/edit"
+
+    # 次の試行は同じ下書きに戻る（ページが別のURLにいても新しいエディタは開かない）
+    service.page.url = "https://note.com/"
+    _attempt(service, checkpoint)
+    assert calls[-1] == ("goto", "https://editor.note.com/notes/n0123456789ab/edit")
+
+
+def test_draft_key_of_response():
+    assert asyncio.run(_draft_key_of_response(FakeResponse("https://note.com/api/v1/text_notes/1/draft_save", {"data": {"key": "nabc123def"}}))) == "nabc123def"
+    assert asyncio.run(_draft_key_of_response(FakeResponse("http://127.0.0.1/api/v1/text_notes/n0123456789ab/draft_save"))) == "n0123456789ab"
+    assert asyncio.run(_draft_key_of_response(FakeResponse("https://note.com/api/v1/notes/123/draft_save?id=1"))) is None
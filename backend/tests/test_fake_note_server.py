@@ -0,0 +1,79 @@
+import asyncio
+
+import aiohttp
+
+from benchmarks.fake_note_server import FakeNoteConfig, FakeNoteServer, start_server, server_url
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _login(session, base_url, password="pw"):
+    return await session.post(f"{base_url}/login", data={"email": "bench@example.com", "password": password})
+
+
+def _client():
+    # 疑似サーバーは127.0.0.1で動くため、IPアドレスのCookieも受け付ける
+    return aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+
+
+def test_login_editor_and_save_flow():
+    async def scenario():
+        server = FakeNoteServer(FakeNoteConfig(password="pw"))
+        runner = await start_server(server)
+        base_url = server_url(runner)
+        try:
+            async with _client() as session:
+                response = await _login(session, base_url, password="wrong")
+                assert response.url.path == "/login"
+                assert "正しくありません" in await response.text()
+
+                response = await _login(session, base_url)
+                assert response.url.path == "/"
+                assert 'href="/mypage/notes/new"' in await response.text()
+
+                # /mypage/notes/new は下書きを作って記事ごとのエディタへリダイレクトする
+                response = await session.get(f"{base_url}/mypage/notes/new")
+                path = response.url.path
+                assert path.startswith("/editor/notes/n") and path.endswith("/edit")
+                html = await response.text()
+                # NoteServiceのセレクターが対象にする要素
+                assert '<textarea id="title" placeholder="記事タイトル">' in html
+                assert 'class="ProseMirror" contenteditable="true"' in html
+                assert ">下書き保存</button>" in html
+
+                key = path.split("/")[3]
+                response = await session.post(f"{base_url}/api/v1/text_notes/{key}/draft_save", json={"name": "タイトル", "body": "本文"})
+                assert response.status == 200
+                assert (await session.get(f"{base_url}{path}")).status == 200
+        finally:
+            await runner.cleanup()
+        return server
+
+    server = _run(scenario())
+    stats = server.get_stats()
+    assert stats["logins"] == 1
+    assert stats["drafts"] == 1 and stats["saved_drafts"] == 1
+    assert next(iter(server.drafts.values()))["name"] == "タイトル"
+
+
+def test_injected_save_failure():
+    async def scenario():
+        server = FakeNoteServer(FakeNoteConfig(fail_rates={"save": 1.0}, seed=1))
+        runner = await start_server(server)
+        base_url = server_url(runner)
+        try:
+            async with _client() as session:
+                await _login(session, base_url)
+                response = await session.get(f"{base_url}/mypage/notes/new")
+                key = response.url.path.split("/")[3]
+                response = await session.post(f"{base_url}/api/v1/text_notes/{key}/draft_save", json={})
+                assert response.status == 500
+        finally:
+            await runner.cleanup()
+        return server
+
+    stats = _run(scenario()).get_stats()
+    assert stats["injected_errors"] == 1
+    assert stats["saved_drafts"] == 0
@@ -0,0 +1,47 @@
+import asyncio
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from metrics import registry
+from services.note_service import NoteService
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module("main")
+    return TestClient(main.app)
+
+
+class FakePage:
+    url = "about:blank"
+
+    async def goto(self, url, wait_until=None, timeout=None):
+        self.url = url
+
+
+def test_metrics_require_a_session(client):
+    assert client.get("/api/metrics").status_code == 401
+    assert client.get("/api/metrics", headers={"X-Session-ID": "unknown"}).status_code == 401
+
+    session_id = client.post("/api/auth/login", json={"password": "note123"}).json()["session_id"]
+    response = client.get("/api/metrics", headers={"X-Session-ID": session_id})
+    assert response.status_code == 200
+    assert "stages" in response.json()
+
+
+def test_navigation_spans_do_not_export_urls(monkeypatch):
+    monkeypatch.setenv("NOTE_STATE_PERSIST", "false")
+    registry.reset()
+    service = NoteService("user@example.com", "pw")
+    service.page = FakePage()
+    editor_url = "https://editor.note.com/notes/n0123456789ab/edit"
+    asyncio.run(service._goto(editor_url, label="エディタ再表示"))
+    asyncio.run(service._goto("https://note.com/"))
+
+    spans = registry.snapshot()["recent_spans"]
+    assert [s["label"] for s in spans] == ["エディタ再表示", "ページ遷移"]
+    assert all("url" not in s for s in spans)
+    assert "n0123456789ab" not in repr(spans)
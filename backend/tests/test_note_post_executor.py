@@ -0,0 +1,161 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from services import note_post_executor
+from services.note_post_executor import NotePostExecutor
+
+
+class FakePool:
+    """NoteSessionPoolの代わり（leaseでFakeServiceを貸し出す）"""
+
+    def __init__(self, login_error=None):
+        self.login_error = login_error
+        self.max_browsers = None
+        self.leases = 0
+
+    @asynccontextmanager
+    async def lease(self, note_id, note_password):
+        if self.login_error is not None:
+            raise Exception(self.login_error)
+        self.leases += 1
+        yield FakeService(note_id)
+
+
+class FakeService:
+    def __init__(self, note_id):
+        self.note_id = note_id
+
+    async def post_drafts(self, articles, on_result=None):
+        results = []
+        for article in articles:
+            if article.get("fail_browser"):
+                raise Exception("ブラウザが終了しました")
+            result = {"article_id": article["id"], "success": True, "url": f"https://note.com/{article['id']}"}
+            results.append(result)
+            if on_result is not None:
+                await on_result(result)
+        return results
+
+
+def test_post_drafts_reports_every_article_when_login_fails():
+    async def scenario():
+        executor = NotePostExecutor(FakePool(login_error="ログインに失敗しました"), max_browsers=1)
+        received = []
+
+        async def on_result(item):
+            received.append(item)
+
+        results = await executor.post_drafts("user", "pw", [{"id": 1}, {"id": 2}, {"id": 3}], on_result=on_result)
+        return executor, results, received
+
+    executor, results, received = asyncio.run(scenario())
+    expected = [{"article_id": i, "success": False, "error": "ログインに失敗しました"} for i in (1, 2, 3)]
+    assert results == expected
+    assert received == expected
+    assert executor.get_info()["failed"] == 1
+
+
+def test_post_drafts_reports_remaining_articles_after_browser_failure():
+    async def scenario():
+        executor = NotePostExecutor(FakePool(), max_browsers=1)
+        return await executor.post_drafts("user", "pw", [{"id": 1}, {"id": 2, "fail_browser": True}, {"id": 3}])
+
+    results = asyncio.run(scenario())
+    assert results[0] == {"article_id": 1, "success": True, "url": "https://note.com/1"}
+    assert results[1:] == [
+        {"article_id": 2, "success": False, "error": "ブラウザが終了しました"},
+        {"article_id": 3, "success": False, "error": "ブラウザが終了しました"},
+    ]
+
+
+def test_same_account_runs_in_submission_order():
+    async def scenario():
+        executor = NotePostExecutor(FakePool(), max_browsers=4)
+        order = []
+
+        def job(label, delay):
+            async def run(service):
+                order.append(("start", label))
+                await asyncio.sleep(delay)
+                order.append(("end", label))
+                return label
+            return run
+
+        # 先に受け付けた投稿ほど時間がかかっても、同じアカウントでは順番どおり1件ずつ実行する
+        tasks = [
+            asyncio.ensure_future(executor.run("a", "pw", job(label, delay)))
+            for label, delay in (("a1", 0.03), ("a2", 0.01), ("a3", 0))
+        ]
+        results = await asyncio.gather(*tasks)
+        return executor, order, results
+
+    executor, order, results = asyncio.run(scenario())
+    assert results == ["a1", "a2", "a3"]
+    assert order == [("start", "a1"), ("end", "a1"), ("start", "a2"), ("end", "a2"), ("start", "a3"), ("end", "a3")]
+    assert executor.get_info()["accounts_pending"] == 0
+    assert executor._account_locks == {}
+
+
+def test_different_accounts_share_the_global_browser_cap():
+    async def scenario():
+        pool = FakePool()
+        executor = NotePostExecutor(pool, max_browsers=2)
+        running = 0
+        peak = 0
+        release = asyncio.Event()
+        snapshots = []
+
+        async def job(service):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await release.wait()
+            running -= 1
+            return service.note_id
+
+        tasks = [asyncio.ensure_future(executor.run(f"user{i}", "pw", job)) for i in range(5)]
+        for _ in range(5):
+            await asyncio.sleep(0)
+        snapshots.append(executor.get_info())
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return pool, executor, peak, snapshots[0], results
+
+    pool, executor, peak, info, results = asyncio.run(scenario())
+    assert pool.max_browsers == 2
+    assert peak == 2
+    assert info["active_browsers"] == 2
+    assert info["waiting_for_browser"] == 3
+    assert info["queue_depth"] == 3
+    assert results == [f"user{i}" for i in range(5)]
+    assert executor.get_info()["completed"] == 5
+
+
+def test_default_max_browsers_from_memory(monkeypatch):
+    monkeypatch.delenv("NOTE_MAX_BROWSERS", raising=False)
+    monkeypatch.delenv("NOTE_BROWSER_MEMORY_MB", raising=False)
+    monkeypatch.setattr(note_post_executor.os, "cpu_count", lambda: 8)
+
+    # (4096 - 512) // 350 = 10 だがCPUコア数で頭打ち
+    monkeypatch.setattr(note_post_executor, "_total_memory_mb", lambda: 4096)
+    assert note_post_executor.default_max_browsers() == 8
+
+    monkeypatch.setattr(note_post_executor, "_total_memory_mb", lambda: 1536)
+    assert note_post_executor.default_max_browsers() == 2
+
+    # メモリが少なくても最低1
+    monkeypatch.setattr(note_post_executor, "_total_memory_mb", lambda: 256)
+    assert note_post_executor.default_max_browsers() == 1
+
+    monkeypatch.setenv("NOTE_BROWSER_MEMORY_MB", "1000")
+    monkeypatch.setattr(note_post_executor, "_total_memory_mb", lambda: 4096)
+    assert note_post_executor.default_max_browsers() == 3
+
+    # メモリ量が分からなければCPUコア数
+    monkeypatch.setattr(note_post_executor, "_total_memory_mb", lambda: None)
+    assert note_post_executor.default_max_browsers() == 8
+
+    monkeypatch.setenv("NOTE_MAX_BROWSERS", "0")
+    assert note_post_executor.default_max_browsers() == 1
+    monkeypatch.setenv("NOTE_MAX_BROWSERS", "5")
+    assert note_post_executor.default_max_browsers() == 5
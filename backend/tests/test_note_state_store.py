@@ -0,0 +1,95 @@
+import os
+import stat
+
+import pytest
+from cryptography.fernet import Fernet
+
+from services.note_state_store import NoteStateStore
+
+STATE = {"cookies": [{"name": "_note_session", "value": "secret", "domain": ".note.com"}], "origins": []}
+
+posix_only = pytest.mark.skipif(os.name != "posix", reason="ファイルの権限はPOSIXのみ")
+
+
+def _mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_round_trip_is_encrypted(tmp_path):
+    store = NoteStateStore(str(tmp_path / "state"), key=Fernet.generate_key())
+    store.save("user@example.com", STATE)
+
+    files = os.listdir(tmp_path / "state")
+    assert len(files) == 1 and files[0].endswith(".state")
+    # ファイル名・中身にメールアドレスやCookieを平文で残さない
+    assert "user@example.com" not in files[0]
+    raw = (tmp_path / "state" / files[0]).read_bytes()
+    assert b"secret" not in raw and b"_note_session" not in raw
+
+    assert store.load("user@example.com") == STATE
+    assert store.load("other@example.com") is None
+    store.delete("user@example.com")
+    assert store.load("user@example.com") is None
+
+
+def test_state_written_with_another_key_is_discarded(tmp_path):
+    directory = str(tmp_path / "state")
+    NoteStateStore(directory, key=Fernet.generate_key()).save("user@example.com", STATE)
+
+    store = NoteStateStore(directory, key=Fernet.generate_key())
+    assert store.load("user@example.com") is None
+    assert os.listdir(directory) == []
+
+
+def test_corrupt_state_is_discarded(tmp_path):
+    store = NoteStateStore(str(tmp_path / "state"), key=Fernet.generate_key())
+    store.save("user@example.com", STATE)
+    with open(store._path("user@example.com"), "wb") as f:
+        f.write(b"not a fernet token")
+    assert store.load("user@example.com") is None
+    assert not os.path.exists(store._path("user@example.com"))
+
+
+@posix_only
+def test_key_file_is_created_outside_the_directory_with_private_permissions(tmp_path):
+    key_path = tmp_path / "keys" / "note_state.key"
+    store = NoteStateStore(str(tmp_path / "state"), key_path=str(key_path))
+    store.save("user@example.com", STATE)
+
+    assert key_path.exists()
+    assert _mode(key_path) == 0o600
+    assert _mode(tmp_path / "keys") == 0o700
+    assert _mode(store._path("user@example.com")) == 0o600
+    assert os.listdir(tmp_path / "state") == [os.path.basename(store._path("user@example.com"))]
+
+    # 同じキーファイルを使えば別のインスタンスでも復号できる
+    assert NoteStateStore(str(tmp_path / "state"), key_path=str(key_path)).load("user@example.com") == STATE
+
+
+@posix_only
+def test_readable_key_file_is_restricted(tmp_path):
+    key_path = tmp_path / "note_state.key"
+    key_path.write_bytes(Fernet.generate_key())
+    os.chmod(key_path, 0o644)
+    NoteStateStore(str(tmp_path / "state"), key_path=str(key_path))
+    assert _mode(key_path) == 0o600
+
+
+def test_legacy_key_in_the_directory_is_moved_out(tmp_path, capsys):
+    directory = tmp_path / "state"
+    key = Fernet.generate_key()
+    NoteStateStore(str(directory), key=key).save("user@example.com", STATE)
+    (directory / ".key").write_bytes(key)
+
+    key_path = tmp_path / "note_state.key"
+    store = NoteStateStore(str(directory), key_path=str(key_path))
+    assert not (directory / ".key").exists()
+    assert key_path.read_bytes() == key
+    assert store.load("user@example.com") == STATE
+    assert "移動しました" in capsys.readouterr().out
+
+
+def test_warns_when_key_file_is_inside_the_directory(tmp_path, capsys):
+    directory = tmp_path / "state"
+    NoteStateStore(str(directory), key_path=str(directory / "inside.key"))
+    assert "警告" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+from services.trend_fetcher import build_trends, parse_trends_html, trends_digest
+
+
+def _page(rows, extra=""):
+    body = "".join(f"<tr>{row}</tr>" for row in rows)
+    return f"""<html><body>
+<table class="table"><tr><th>日本</th><th>東京</th></tr>{body}</table>
+{extra}
+</body></html>"""
+
+
+def _link(keyword):
+    return f'<a href="https://twitter.com/search?q={keyword}">{keyword}</a>'
+
+
+def test_parses_first_cell_keyword_and_tweet_count():
+    html = _page([
+        f"<td>1. {_link('#東京')}<br>12,345件のツイート</td><td>{_link('大阪')}</td>",
+        f"<td>2. <span>{_link('AI  入門')}</span></td><td>-</td>",
+    ])
+    assert parse_trends_html(html, 10) == [
+        {"keyword": "東京", "tweet_count": 12345},
+        {"keyword": "AI 入門", "tweet_count": None},
+        # 表の最初の列で足りない分はページ内の検索リンクから補う
+        {"keyword": "大阪", "tweet_count": None},
+    ]
+
+
+def test_skips_header_duplicates_and_non_search_links():
+    html = _page([
+        f"<td>{_link('東京')}<br>100件のツイート</td>",
+        f"<td>{_link('#東京')}<br>200件のツイート</td>",
+        '<td><a href="https://example.com/">広告</a></td>',
+        f"<td>{_link('名古屋')}</td>",
+    ], extra=f"{_link('ツイート')}{_link('x' * 101)}{_link('札幌')}")
+    assert parse_trends_html(html, 10) == [
+        {"keyword": "東京", "tweet_count": 100},
+        {"keyword": "名古屋", "tweet_count": None},
+        {"keyword": "札幌", "tweet_count": None},
+    ]
+
+
+def test_respects_limit():
+    html = _page([f"<td>{_link(f'語{i}')}</td>" for i in range(10)])
+    assert [t["keyword"] for t in parse_trends_html(html, 3)] == ["語0", "語1", "語2"]
+
+
+def test_page_without_table_returns_links_or_nothing():
+    assert parse_trends_html("<html><body><p>メンテナンス中</p></body></html>", 10) == []
+    html = f"<html><body><div>{_link('東京')}{_link('検索')}</div></body></html>"
+    assert parse_trends_html(html, 10) == [{"keyword": "東京", "tweet_count": None}]
+
+
+def test_build_trends_matches_browser_rows():
+    # ブラウザ取得（EXTRACT_TRENDS_JS）の結果も同じ規則で組み立てる
+    rows = [{"cell_text": "1. 東京\n1,000件のツイート", "link_text": "#東京"}, None, {"cell_text": "-", "link_text": None}]
+    assert build_trends(rows, ["東京", "大阪"], 5) == [
+        {"keyword": "東京", "tweet_count": 1000},
+        {"keyword": "大阪", "tweet_count": None},
+    ]
+
+
+def test_trends_digest_changes_only_with_content():
+    trends = [{"keyword": "東京", "tweet_count": 1}]
+    assert trends_digest(trends) == trends_digest([{"tweet_count": 1, "keyword": "東京"}])
+    assert trends_digest(trends) != trends_digest([{"keyword": "東京", "tweet_count": 2}])
@@ -0,0 +1,136 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.trend_scraper import TrendScraper
+
+TRENDS = [{"keyword": "東京", "tweet_count": 100}, {"keyword": "大阪", "tweet_count": None}]
+
+
+class FakeFetch:
+    """_fetch_trendsの代わり（releaseされるまで完了しない取得を数える）"""
+
+    def __init__(self, scraper, result=TRENDS, error=None):
+        self.scraper = scraper
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self, limit, headless=True):
+        self.calls += 1
+        self.started.set()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        self.scraper.last_refresh = {"method": "http"}
+        return list(self.result)
+
+
+def _scraper():
+    return TrendScraper(snapshot_file=None)
+
+
+def test_concurrent_refreshes_share_one_fetch():
+    async def scenario():
+        scraper = _scraper()
+        fetch = scraper._fetch_trends = FakeFetch(scraper)
+        callers = [asyncio.ensure_future(scraper.get_trends(limit=10)) for _ in range(5)]
+        await fetch.started.wait()
+        await asyncio.sleep(0)
+        assert scraper.get_cache_info()["refreshing"] is True
+        fetch.release.set()
+        results = await asyncio.gather(*callers)
+        return scraper, fetch, results
+
+    scraper, fetch, results = asyncio.run(scenario())
+    assert fetch.calls == 1
+    assert results == [TRENDS] * 5
+    assert scraper.refresh_stats["refreshes"] == 1
+    assert scraper.refresh_stats["coalesced"] == 4
+    assert scraper._inflight is None
+    assert scraper.cached_trends == TRENDS
+
+
+def test_leader_exception_reaches_every_waiter():
+    async def scenario():
+        scraper = _scraper()
+        fetch = scraper._fetch_trends = FakeFetch(scraper, error=RuntimeError("取得失敗"))
+        callers = [asyncio.ensure_future(scraper._refresh_trends()) for _ in range(3)]
+        await fetch.started.wait()
+        await asyncio.sleep(0)
+        fetch.release.set()
+        return scraper, fetch, await asyncio.gather(*callers, return_exceptions=True)
+
+    scraper, fetch, results = asyncio.run(scenario())
+    assert fetch.calls == 1
+    assert len(results) == 3
+    assert all(isinstance(r, RuntimeError) and str(r) == "取得失敗" for r in results)
+    assert scraper._inflight is None
+
+    # 失敗の後は次の呼び出しで取得し直す
+    async def retry():
+        fetch = scraper._fetch_trends = FakeFetch(scraper)
+        fetch.release.set()
+        return await scraper._refresh_trends(), fetch
+
+    trends, fetch = asyncio.run(retry())
+    assert trends == TRENDS and fetch.calls == 1
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        scraper = _scraper()
+        fetch = scraper._fetch_trends = FakeFetch(scraper)
+        leader = asyncio.ensure_future(scraper._refresh_trends())
+        await fetch.started.wait()
+        waiter = asyncio.ensure_future(scraper._refresh_trends())
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(Exception, match="中断"):
+            await waiter
+        return scraper
+
+    scraper = asyncio.run(scenario())
+    assert scraper._inflight is None
+
+
+def test_stale_hit_returns_immediately_and_revalidates_once():
+    async def scenario():
+        scraper = _scraper()
+        scraper.cached_trends = [{"keyword": "古い", "tweet_count": 1}]
+        scraper.content_hash = "old"
+        scraper.last_update = datetime.now() - timedelta(minutes=scraper.cache_valid_minutes + 5)
+        fetch = scraper._fetch_trends = FakeFetch(scraper)
+
+        # 取得が終わらなくても、期限切れのキャッシュをすぐに返す
+        stale = [await asyncio.wait_for(scraper.get_trends(limit=10), timeout=1) for _ in range(3)]
+        await fetch.started.wait()
+        assert fetch.calls == 1
+        assert len(scraper._revalidate_tasks) == 1
+
+        fetch.release.set()
+        await asyncio.gather(*scraper._revalidate_tasks)
+        return scraper, fetch, stale
+
+    scraper, fetch, stale = asyncio.run(scenario())
+    assert stale == [[{"keyword": "古い", "tweet_count": 1}]] * 3
+    assert fetch.calls == 1
+    assert scraper.refresh_stats["stale_served"] == 3
+    assert scraper.cached_trends == TRENDS
+    assert scraper._inflight is None and not scraper._revalidate_tasks
+
+
+def test_fresh_cache_does_not_fetch():
+    async def scenario():
+        scraper = _scraper()
+        scraper.cached_trends = TRENDS
+        scraper.last_update = datetime.now()
+        fetch = scraper._fetch_trends = FakeFetch(scraper)
+        return await scraper.get_trends(limit=1), fetch
+
+    trends, fetch = asyncio.run(scenario())
+    assert trends == TRENDS[:1]
+    assert fetch.calls == 0
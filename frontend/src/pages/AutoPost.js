@@ -17,7 +17,7 @@ function AutoPost({ onLogout }) {
 
   const loadArticles = async () => {
     try {
-      const data = await getArticles();
+      const data = await getArticles({ fields: 'id,title' });
       setArticles(data.articles || []);
     } catch (err) {
       console.error('記事の取得に失敗しました:', err);
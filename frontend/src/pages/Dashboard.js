@@ -1,12 +1,19 @@
 import React, { useState, useEffect } from 'react';
 import Navbar from '../components/Navbar';
-import { getArticles, postDraft, deleteArticle } from '../services/api';
+import { getArticles, getArticle, postDraft, deleteArticle } from '../services/api';
 import './Dashboard.css';
 
+// 一覧では本文を取得せず、抜粋のみを表示する（全文は展開時に取得）
+const LIST_FIELDS = 'id,title,excerpt,theme,trend_keyword,posted,posted_at';
+const PAGE_SIZE = 50;
+
 function Dashboard({ onLogout }) {
   const [articles, setArticles] = useState([]);
+  const [nextAfterId, setNextAfterId] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [expandedArticles, setExpandedArticles] = useState({});
+  const [fullContents, setFullContents] = useState({});
   const [postingArticles, setPostingArticles] = useState({});
 
   useEffect(() => {
@@ -15,8 +22,9 @@ function Dashboard({ onLogout }) {
 
   const loadArticles = async () => {
     try {
-      const data = await getArticles();
+      const data = await getArticles({ fields: LIST_FIELDS, limit: PAGE_SIZE });
       setArticles(data.articles || []);
+      setNextAfterId(data.next_after_id ?? null);
     } catch (err) {
       console.error('記事の取得に失敗しました:', err);
     } finally {
@@ -24,11 +32,36 @@ function Dashboard({ onLogout }) {
     }
   };
 
-  const toggleExpand = (articleId) => {
+  const loadMoreArticles = async () => {
+    if (nextAfterId === null) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      const data = await getArticles({ fields: LIST_FIELDS, limit: PAGE_SIZE, after_id: nextAfterId });
+      setArticles(prev => [...prev, ...(data.articles || [])]);
+      setNextAfterId(data.next_after_id ?? null);
+    } catch (err) {
+      console.error('記事の取得に失敗しました:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const toggleExpand = async (articleId) => {
+    const willExpand = !expandedArticles[articleId];
     setExpandedArticles(prev => ({
       ...prev,
-      [articleId]: !prev[articleId]
+      [articleId]: willExpand
     }));
+    if (willExpand && fullContents[articleId] === undefined) {
+      try {
+        const data = await getArticle(articleId);
+        setFullContents(prev => ({ ...prev, [articleId]: data.article?.content || '' }));
+      } catch (err) {
+        console.error('記事本文の取得に失敗しました:', err);
+      }
+    }
   };
 
   const handlePost = async (articleId) => {
@@ -98,7 +131,8 @@ function Dashboard({ onLogout }) {
                 const isExpanded = expandedArticles[article.id];
                 const isPosting = postingArticles[article.id];
                 const cleanedTitle = cleanTitle(article.title);
-                const cleanedContent = cleanContent(article.content);
+                const cleanedExcerpt = cleanContent(article.excerpt || '');
+                const fullContent = fullContents[article.id];
                 
                 return (
                   <div key={article.id} className={`article-item ${article.posted ? 'article-posted' : ''}`}>
@@ -120,11 +154,13 @@ function Dashboard({ onLogout }) {
                     <div className="article-content">
                       {isExpanded ? (
                         <div className="article-full">
-                          <pre className="article-text">{cleanedContent}</pre>
+                          <pre className="article-text">
+                            {fullContent === undefined ? '読み込み中...' : cleanContent(fullContent)}
+                          </pre>
                         </div>
                       ) : (
                         <p className="article-preview">
-                          {cleanedContent.substring(0, 200)}...
+                          {cleanedExcerpt}...
                         </p>
                       )}
                     </div>
@@ -154,6 +190,15 @@ function Dashboard({ onLogout }) {
                   </div>
                 );
               })}
+              {nextAfterId !== null && (
+                <button
+                  onClick={loadMoreArticles}
+                  className="btn btn-secondary"
+                  disabled={loadingMore}
+                >
+                  {loadingMore ? '読み込み中...' : 'さらに読み込む'}
+                </button>
+              )}
             </div>
           )}
         </div>
@@ -144,8 +144,14 @@ export const generateManualArticle = async (article) => {
 };
 
 // 記事
-export const getArticles = async () => {
-  const response = await api.get('/api/articles');
+// params: { limit, after_id, fields, theme, trend_keyword, posted }
+export const getArticles = async (params = {}) => {
+  const response = await api.get('/api/articles', { params });
+  return response.data;
+};
+
+export const searchArticles = async (q, params = {}) => {
+  const response = await api.get('/api/articles/search', { params: { q, ...params } });
   return response.data;
 };
 
@@ -161,6 +167,12 @@ export const postDraft = async (articleId, scheduledTime = null) => {
   return response.data;
 };
 
+// 複数記事の一括下書き投稿
+export const postDraftsBatch = async (articleIds) => {
+  const response = await api.post('/api/articles/post-batch', { article_ids: articleIds });
+  return response.data;
+};
+
 // X投稿用本文生成
 export const generateXPost = async (articleId, llmProvider = 'openai') => {
   const response = await api.post(`/api/articles/${articleId}/x-post`, null, {